@@ -1,7 +1,7 @@
 """Claude agent for InfoEx payload construction"""
 
 import json
-from typing import Dict, List, Any, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 import anthropic
 import structlog
 from datetime import datetime
@@ -14,8 +14,20 @@ from app.models import (
     PayloadStatus
 )
 from app.agent.constants import infoex_constants
-from app.agent.prompts import build_system_prompt
+from app.agent.prompts import JSON_BLOCK_INSTRUCTIONS, PromptRenderer
+from app.agent.context_window import ConversationWindow, estimate_tokens
+from app.agent.extraction import parse_json_blocks, route_documents
+from app.agent.tools import (
+    TARGET_KEY,
+    TOOL_USE_INSTRUCTIONS,
+    build_extraction_tools,
+    extract_tool_inputs,
+    load_template_files,
+    response_text as join_response_text
+)
 from app.agent.knowledge_base import get_knowledge_base
+from app.agent.scheduler import claude_scheduler
+from app.services.normalizer import payload_normalizer
 
 logger = structlog.get_logger()
 
@@ -25,16 +37,85 @@ class ClaudeAgent:
     
     def __init__(self):
         """Initialize Claude client and load templates"""
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
         self.knowledge_base = get_knowledge_base()
         self.templates = self.knowledge_base.payloads  # Use knowledge base templates
+        self.use_tools = settings.claude_extraction_mode == "tools"
+        self.extraction_tools = (
+            build_extraction_tools(load_template_files(), cache=settings.claude_prompt_caching)
+            if self.use_tools else []
+        )
+        # The tool definitions are sent with every request and count against the context
+        self.tools_tokens = estimate_tokens(json.dumps(self.extraction_tools)) if self.extraction_tools else 0
+        self.prompt_renderer = PromptRenderer(
+            infoex_constants,
+            max_entries=settings.prompt_cache_size,
+            extra_instructions=TOOL_USE_INSTRUCTIONS if self.use_tools else JSON_BLOCK_INSTRUCTIONS
+        )
+        self.conversation_window = ConversationWindow(
+            token_budget=settings.claude_context_token_budget,
+            summary_max_tokens=settings.history_summary_max_tokens,
+            max_messages=settings.max_conversation_length
+        )
     
-    def process_message(
-        self, 
+    async def close(self):
+        """Close the async Claude client"""
+        await self.async_client.close()
+    
+    async def aprocess_message(
+        self,
         session: Session,
         message: str
     ) -> Tuple[str, Session]:
-        """Process a user message and return Claude's response"""
+        """Process a user message without blocking the event loop"""
+        request = self._prepare_turn(session, message)
+        
+        try:
+            # Call Claude through the async client so other requests keep running
+            async with claude_scheduler.slot(session.session_id, self._estimate_request_tokens(request)) as ticket:
+                response = await self.async_client.messages.create(**request)
+                ticket.record_usage(self._usage_tokens(response))
+            return self._complete_turn(session, message, response)
+            
+        except Exception as e:
+            logger.error("claude_processing_error", 
+                        session_id=session.session_id,
+                        error=str(e))
+            raise
+    
+    async def astream_message(
+        self,
+        session: Session,
+        message: str
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """Stream Claude's response text as it is generated
+        
+        Yields ("token", text) for each text delta, then a final
+        ("response", response_text) with the reply aprocess_message would have
+        returned. The session is updated in place (history and payloads) before
+        the final event, exactly as aprocess_message would have done.
+        """
+        request = self._prepare_turn(session, message)
+        
+        try:
+            async with claude_scheduler.slot(session.session_id, self._estimate_request_tokens(request)) as ticket:
+                async with self.async_client.messages.stream(**request) as stream:
+                    async for text in stream.text_stream:
+                        yield "token", text
+                    response = await stream.get_final_message()
+                ticket.record_usage(self._usage_tokens(response))
+            
+            response_text, _ = self._complete_turn(session, message, response)
+            yield "response", response_text
+            
+        except Exception as e:
+            logger.error("claude_stream_error",
+                        session_id=session.session_id,
+                        error=str(e))
+            raise
+    
+    def _prepare_turn(self, session: Session, message: str) -> Dict[str, Any]:
+        """Record the user message and build the Claude request arguments"""
         
         # Add user message to history
         user_msg = ConversationMessage(
@@ -44,56 +125,116 @@ class ClaudeAgent:
         )
         session.conversation_history.append(user_msg)
         
-        # Build messages for Claude
-        messages = self._build_claude_messages(session)
+        knowledge_context = self._build_knowledge_context(session)
+        
+        # Build messages for Claude within what's left of the token budget
+        reserved_tokens = (
+            estimate_tokens(self.prompt_renderer.instructions())
+            + estimate_tokens(knowledge_context)
+            + estimate_tokens(self.prompt_renderer.request_context(session.request_values))
+            + self.tools_tokens
+        )
+        messages = self._build_claude_messages(session, reserved_tokens)
         
-        # Get system prompt with request values
-        system_prompt = build_system_prompt(
+        # Get system prompt: cacheable instructions and knowledge, then request values
+        system_prompt = self.prompt_renderer.system_blocks(
             session.request_values,
-            infoex_constants
+            knowledge_context=knowledge_context,
+            cache=settings.claude_prompt_caching,
+            conversation_summary=session.history_summary
         )
         
-        try:
-            # Call Claude
-            response = self.client.messages.create(
-                model=settings.claude_model,
-                max_tokens=settings.claude_max_tokens,
-                temperature=settings.claude_temperature,
-                system=system_prompt,
-                messages=messages
-            )
-            
-            # Extract response text
-            response_text = response.content[0].text
-            
-            # Add Claude's response to history
-            assistant_msg = ConversationMessage(
-                role="assistant",
-                content=response_text,
-                timestamp=datetime.utcnow()
+        request = {
+            "model": settings.claude_model,
+            "max_tokens": settings.claude_max_tokens,
+            "temperature": settings.claude_temperature,
+            "system": system_prompt,
+            "messages": messages
+        }
+        if self.extraction_tools:
+            request["tools"] = self.extraction_tools
+        return request
+    
+    def _estimate_request_tokens(self, request: Dict[str, Any]) -> int:
+        """Rough upper bound on the tokens a Claude request will use"""
+        system_text = "".join(block["text"] for block in request["system"])
+        message_text = "".join(
+            message["content"] if isinstance(message["content"], str) else json.dumps(message["content"])
+            for message in request["messages"]
+        )
+        return (
+            estimate_tokens(system_text)
+            + estimate_tokens(message_text)
+            + (self.tools_tokens if "tools" in request else 0)
+            + request["max_tokens"]
+        )
+    
+    def _usage_tokens(self, response: Any) -> Optional[int]:
+        """Input plus output tokens reported by Claude, if available"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        return (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+    
+    def _complete_turn(
+        self,
+        session: Session,
+        message: str,
+        response: Any
+    ) -> Tuple[str, Session]:
+        """Record Claude's response and update payloads from it"""
+        
+        # Extract response text and any structured tool calls
+        response_text = join_response_text(response.content)
+        tool_inputs = extract_tool_inputs(response.content) if self.use_tools else {}
+        
+        history_text = response_text
+        if tool_inputs:
+            # Keep a note of what was recorded so later turns know about it
+            recorded = "\n".join(
+                f"[Recorded {obs_type}: {', '.join(sorted(set().union(*inputs) - {TARGET_KEY}))}]"
+                for obs_type, inputs in tool_inputs.items()
             )
-            session.conversation_history.append(assistant_msg)
-            
-            # Update payloads based on conversation
-            session = self._update_payloads_from_conversation(session, message, response_text)
-            
-            # Update session timestamp
-            session.last_updated = datetime.utcnow()
-            
-            logger.info("claude_response_processed",
-                       session_id=session.session_id,
-                       message_length=len(message),
-                       response_length=len(response_text))
-            
-            return response_text, session
-            
-        except Exception as e:
-            logger.error("claude_processing_error", 
-                        session_id=session.session_id,
-                        error=str(e))
-            raise
+            history_text = f"{response_text}\n\n{recorded}" if response_text else recorded
+            if not response_text:
+                response_text = f"Recorded data for: {', '.join(tool_inputs)}"
+        
+        # Add Claude's response to history
+        assistant_msg = ConversationMessage(
+            role="assistant",
+            content=history_text,
+            timestamp=datetime.utcnow()
+        )
+        session.conversation_history.append(assistant_msg)
+        
+        # Update payloads based on conversation
+        session = self._update_payloads_from_conversation(
+            session,
+            message,
+            response_text,
+            tool_inputs=tool_inputs or None
+        )
+        
+        # Update session timestamp
+        session.last_updated = datetime.utcnow()
+        
+        usage = getattr(response, "usage", None)
+        logger.info("claude_response_processed",
+                   session_id=session.session_id,
+                   message_length=len(message),
+                   response_length=len(response_text),
+                   input_tokens=getattr(usage, "input_tokens", None),
+                   output_tokens=getattr(usage, "output_tokens", None),
+                   cache_read_tokens=getattr(usage, "cache_read_input_tokens", None) or 0,
+                   cache_write_tokens=getattr(usage, "cache_creation_input_tokens", None) or 0)
+        
+        return response_text, session
     
-    def _build_claude_messages(self, session: Session) -> List[Dict[str, str]]:
+    def _build_claude_messages(
+        self,
+        session: Session,
+        reserved_tokens: int = 0
+    ) -> List[Dict[str, str]]:
         """Build message history for Claude"""
         messages = []
         
@@ -113,9 +254,9 @@ class ClaudeAgent:
                 "content": "I understand the context. I'll process your request based on this information."
             })
         
-        # Include conversation history (limited to avoid token limits)
-        history_limit = settings.max_conversation_length
-        relevant_history = session.conversation_history[-history_limit:]
+        # Include as much recent history as the token budget allows; older
+        # turns are folded into the session's rolling summary
+        relevant_history = self.conversation_window.fit(session, reserved_tokens)
         
         for msg in relevant_history:
             if msg.role in ["user", "assistant"]:
@@ -136,36 +277,45 @@ class ClaudeAgent:
             if messages and messages[-1]["role"] == "assistant":
                 messages[-1]["content"] += status_text
         
-        # Inject relevant knowledge for active observation types
-        if session.payloads:
-            knowledge_text = "\n\n[REFERENCE KNOWLEDGE]\n"
-            for obs_type in session.payloads:
-                context = self.knowledge_base.format_for_claude_context(obs_type)
-                knowledge_text += f"\n{context}\n"
-            
-            # Add as system context at beginning of conversation
-            if messages:
-                messages.insert(0, {
-                    "role": "user", 
-                    "content": f"[SYSTEM CONTEXT]{knowledge_text}\n[END CONTEXT]"
-                })
-                messages.insert(1, {
-                    "role": "assistant",
-                    "content": "I understand the InfoEx payload requirements. I'll help ensure accurate submission."
-                })
-        
         return messages
     
+    def _build_knowledge_context(self, session: Session) -> str:
+        """Build reference knowledge for the session's active observation types
+        
+        Types are emitted in a fixed order so the same set of active types always
+        renders to the same text and keeps hitting the prompt cache.
+        """
+        if not session.payloads:
+            return ""
+        
+        known_order = infoex_constants.get_all_observation_types()
+        active_types = sorted(
+            {payload.observation_type for payload in session.payloads.values()},
+            key=lambda t: (known_order.index(t) if t in known_order else len(known_order), t)
+        )
+        
+        knowledge_text = "[REFERENCE KNOWLEDGE]\n"
+        for obs_type in active_types:
+            context = self.knowledge_base.format_for_claude_context(obs_type)
+            knowledge_text += f"\n{context}\n"
+        
+        return knowledge_text + "[END REFERENCE KNOWLEDGE]"
+    
     def _update_payloads_from_conversation(
         self, 
         session: Session,
         user_message: str,
-        claude_response: str
+        claude_response: str,
+        tool_inputs: Optional[Dict[str, List[Dict[str, Any]]]] = None
     ) -> Session:
-        """Extract and update payload data from conversation"""
+        """Extract and update payload data from conversation
         
-        # This is a simplified version - in production, you'd want more sophisticated
-        # extraction logic, possibly using Claude itself to extract structured data
+        Structured data is gathered once per response: tool_inputs holds
+        record_<type> tool arguments by observation type; without them the
+        response's JSON blocks are parsed a single time and each object routed
+        to its type. Each object updates exactly one payload, and several
+        objects of one type (e.g. an array of avalanches) fill separate payloads.
+        """
         
         # Look for observation types mentioned
         mentioned_types = self._detect_observation_types(user_message, claude_response)
@@ -185,22 +335,6 @@ class ClaudeAgent:
                 mentioned_types = [obs_type]  # Focus only on the explicitly requested type
                 break
         
-        # Initialize payloads for mentioned types
-        for obs_type in mentioned_types:
-            if obs_type not in session.payloads:
-                session.payloads[obs_type] = PayloadStatus(
-                    observation_type=obs_type,
-                    status="incomplete",
-                    missing_fields=infoex_constants.get_required_fields(obs_type),
-                    data={
-                        "obDate": session.request_values.date,
-                        "locationUUIDs": session.request_values.location_uuids,
-                        "operationUUID": session.request_values.operation_id,
-                        "state": "IN_REVIEW"
-                    }
-                )
-        
-        # Extract data from conversation
         # First check if Claude is ready to submit a specific type
         submission_type = None
         if "ready for" in claude_response.lower() and "submission" in claude_response.lower():
@@ -215,23 +349,62 @@ class ClaudeAgent:
                         mentioned_types.append(obs_type)
                     break
         
+        # Parse structured data once for all observation types
+        if tool_inputs is not None:
+            documents = tool_inputs
+        else:
+            active_types = [p.observation_type for p in session.payloads.values()]
+            documents = route_documents(
+                parse_json_blocks(claude_response),
+                payload_normalizer,
+                known_types=infoex_constants.get_all_observation_types(),
+                preferred_types=[t for t in [submission_type] if t] + mentioned_types + active_types,
+                default_type=submission_type or (mentioned_types[0] if len(mentioned_types) == 1 else None)
+            )
+        
+        # Types with structured data are always active
+        for obs_type in documents:
+            if obs_type not in mentioned_types:
+                mentioned_types.append(obs_type)
+        
+        # Initialize payloads for mentioned types
+        for obs_type in mentioned_types:
+            if not self._payload_keys(session, obs_type):
+                self._new_payload(session, obs_type)
+        
+        # Route each document to its own payload
+        updated = {}
+        for obs_type, docs in documents.items():
+            for key, doc in self._assign_payloads(session, obs_type, docs):
+                if tool_inputs is not None:
+                    doc = self._apply_value_conversions(obs_type, dict(doc))
+                session.payloads[key].data.update(doc)
+                updated.setdefault(key, []).extend(doc.keys())
+        
+        # Without structured data, basic extraction only applies to the newest
+        # open payload of each type (one message describes one observation)
+        fallback_keys = set()
+        if not documents:
+            for obs_type in {payload.observation_type for payload in session.payloads.values()}:
+                open_keys = self._open_payload_keys(session, obs_type)
+                if open_keys:
+                    fallback_keys.add(open_keys[-1])
+        
         # Update payloads based on conversation
-        for obs_type, payload in session.payloads.items():
+        for key, payload in session.payloads.items():
             if payload.status != "submitted":
+                obs_type = payload.observation_type
+                
                 # Only extract data for the specific submission type if identified
-                if submission_type and obs_type != submission_type:
+                if submission_type and obs_type != submission_type and key not in updated:
                     continue
-                    
-                # Update data based on conversation
-                extracted_data = self._extract_data_for_type(
-                    obs_type, 
-                    user_message,
-                    session.conversation_history,
-                    claude_response
-                )
                 
-                # Merge extracted data
-                payload.data.update(extracted_data)
+                extracted_fields = updated.get(key, [])
+                if key in fallback_keys:
+                    # No structured data in this turn; fall back to basic extraction
+                    extracted_data = self._extract_data_for_type(obs_type, user_message)
+                    payload.data.update(extracted_data)
+                    extracted_fields = list(extracted_data.keys())
                 
                 # Ensure base fields are present
                 if "obDate" not in payload.data:
@@ -251,7 +424,8 @@ class ClaudeAgent:
                 # Log extracted vs required for debugging
                 logger.info("payload_field_check",
                            observation_type=obs_type,
-                           extracted_fields=list(extracted_data.keys()),
+                           payload_key=key,
+                           extracted_fields=extracted_fields,
                            all_fields=list(payload.data.keys()),
                            required_fields=list(required),
                            missing_fields=list(missing))
@@ -261,6 +435,7 @@ class ClaudeAgent:
                 
                 logger.info("payload_status_updated",
                            observation_type=obs_type,
+                           payload_key=key,
                            status=payload.status,
                            required_fields=list(required),
                            present_fields=list(present),
@@ -268,6 +443,81 @@ class ClaudeAgent:
         
         return session
     
+    def _payload_keys(self, session: Session, obs_type: str) -> List[str]:
+        """Session payload keys holding observations of a type, oldest first"""
+        return [
+            key for key, payload in session.payloads.items()
+            if payload.observation_type == obs_type
+        ]
+    
+    def _open_payload_keys(self, session: Session, obs_type: str) -> List[str]:
+        """Keys of a type's payloads not yet submitted, oldest first"""
+        return [
+            key for key in self._payload_keys(session, obs_type)
+            if session.payloads[key].status != "submitted"
+        ]
+    
+    def _new_payload(self, session: Session, obs_type: str) -> str:
+        """Start a new payload for an observation type and return its key
+        
+        The first payload of a type is keyed by the type itself; further ones
+        (e.g. a second avalanche) get "<type>#<n>" keys.
+        """
+        sequence = len(self._payload_keys(session, obs_type)) + 1
+        key = obs_type if sequence == 1 else f"{obs_type}#{sequence}"
+        while key in session.payloads:
+            sequence += 1
+            key = f"{obs_type}#{sequence}"
+        
+        session.payloads[key] = PayloadStatus(
+            observation_type=obs_type,
+            status="incomplete",
+            missing_fields=infoex_constants.get_required_fields(obs_type),
+            data={
+                "obDate": session.request_values.date,
+                "locationUUIDs": session.request_values.location_uuids,
+                "operationUUID": session.request_values.operation_id,
+                "state": "IN_REVIEW"
+            }
+        )
+        return key
+    
+    def _assign_payloads(
+        self,
+        session: Session,
+        obs_type: str,
+        docs: List[Dict[str, Any]]
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """Pair documents of a type with the payload keys they update
+        
+        A document naming an open (not yet submitted) payload of the type in
+        its payload_key goes to that payload. The other documents fill the
+        remaining open payloads in order, and only those left over start new
+        payloads. The payload_key is removed from the documents.
+        """
+        open_keys = self._open_payload_keys(session, obs_type)
+        targets = []
+        for doc in docs:
+            doc = dict(doc)
+            target = doc.pop(TARGET_KEY, None)
+            if target is not None and target not in open_keys:
+                logger.warning("unknown_payload_target",
+                              observation_type=obs_type,
+                              payload_key=target)
+                target = None
+            targets.append((target, doc))
+        
+        free_keys = [
+            key for key in open_keys
+            if key not in {target for target, _ in targets}
+        ]
+        assigned = []
+        for target, doc in targets:
+            if target is None:
+                target = free_keys.pop(0) if free_keys else self._new_payload(session, obs_type)
+            assigned.append((target, doc))
+        return assigned
+    
     def _detect_observation_types(
         self, 
         user_message: str, 
@@ -297,94 +547,14 @@ class ClaudeAgent:
     def _extract_data_for_type(
         self,
         obs_type: str,
-        current_message: str,
-        conversation_history: List[ConversationMessage],
-        claude_response: str = None
+        current_message: str
     ) -> Dict[str, Any]:
-        """Extract relevant data for observation type from conversation"""
+        """Extract basic data for observation type from the user's message
         
+        Used when Claude's response carries no structured payload data.
+        """
         import re
-        import json
-        
-        # First, check if Claude generated a JSON payload in the response
-        if claude_response:
-            # Look for JSON block in Claude's response
-            json_match = re.search(r'```json\s*\n(.*?)\n```', claude_response, re.DOTALL)
-            if json_match:
-                try:
-                    json_data = json.loads(json_match.group(1))
-                    
-                    # Field mapping corrections for common mistakes
-                    field_mappings = {
-                        # Common date field mappings
-                        "observationDateTime": "obDate",
-                        "observationDate": "obDate",
-                        "date": "obDate",
-                        
-                        # Common field name variations
-                        "operation_id": "operationUUID",
-                        "location_uuids": "locationUUIDs",
-                        "operationId": "operationUUID",
-                        
-                        # avalanche_summary specific
-                        "avalanches_observed": "avalanchesObserved",
-                        "percent_area_observed": "percentAreaObserved",
-                        "percentArea": "percentAreaObserved",
-                        
-                        # avalanche_observation specific
-                        "observation_time": "obTime",
-                        "number": "num",
-                        "avalanche_type": "character",
-                        "type": "character",
-                        "min_size": "sizeMin",
-                        "max_size": "sizeMax",
-                        "depth_average": "depthAvg",
-                        "depth_min": "depthMin",
-                        "depth_max": "depthMax",
-                        
-                        # field_summary specific
-                        "start_time": "obStartTime",
-                        "end_time": "obEndTime",
-                        "temperature_high": "tempHigh",
-                        "temperature_low": "tempLow",
-                        "wind_speed": "windSpeed",
-                        "wind_direction": "windDirection",
-                        "sky_condition": "sky",
-                        "precipitation": "precip",
-                        "new_snow_24h": "hn24",
-                        "snow_height": "hs",
-                        
-                        # hazard_assessment specific
-                        "assessment_time": "obTime",
-                        "type": "assessmentType",
-                        "problems": "avalancheProblems",
-                        "ratings": "hazardRatings",
-                        
-                        # terrain_observation specific
-                        "ates": "atesRating",
-                        "terrain": "terrainFeature",
-                        "mindset": "strategicMindset",
-                        "percent_observed": "percentAreaObserved"
-                    }
-                    
-                    # Apply field mappings
-                    corrected_data = {}
-                    for key, value in json_data.items():
-                        # Check if this field needs to be renamed
-                        correct_key = field_mappings.get(key, key)
-                        corrected_data[correct_key] = value
-                    
-                    # Apply observation-type specific value conversions
-                    corrected_data = self._apply_value_conversions(obs_type, corrected_data)
-                    
-                    logger.info("extracted_json_from_claude", 
-                               observation_type=obs_type,
-                               fields=list(corrected_data.keys()))
-                    return corrected_data
-                except json.JSONDecodeError:
-                    logger.warning("failed_to_parse_claude_json", observation_type=obs_type)
-        
-        # Fallback to basic extraction
+        
         extracted = {}
         
         # Example extractions for specific types
@@ -414,147 +584,7 @@ class ClaudeAgent:
     
     def _apply_value_conversions(self, obs_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Apply observation-type specific value conversions"""
-        
-        # avalanche_summary conversions
-        if obs_type == "avalanche_summary":
-            # Convert boolean/yes/no to proper enum
-            if "avalanchesObserved" in data:
-                val = data["avalanchesObserved"]
-                if isinstance(val, bool) or str(val).lower() in ["yes", "true", "1"]:
-                    data["avalanchesObserved"] = "New avalanches"
-                elif str(val).lower() in ["no", "false", "0"]:
-                    data["avalanchesObserved"] = "No new avalanches"
-                elif str(val).lower() in ["sluffing", "pinwheeling"]:
-                    data["avalanchesObserved"] = "Sluffing/Pinwheeling only"
-            
-            # Ensure percentAreaObserved is numeric
-            if "percentAreaObserved" in data and isinstance(data["percentAreaObserved"], str):
-                try:
-                    data["percentAreaObserved"] = float(data["percentAreaObserved"])
-                except:
-                    pass
-        
-        # avalanche_observation conversions
-        elif obs_type == "avalanche_observation":
-            # Convert trigger descriptions to codes
-            trigger_mappings = {
-                "natural": "Na", "skier": "Sa", "skier triggered": "Sa",
-                "snowmobile": "Ma", "explosive": "Xa", "cornice": "Nc",
-                "unknown": "U", "vehicle": "Va"
-            }
-            if "trigger" in data and data["trigger"].lower() in trigger_mappings:
-                data["trigger"] = trigger_mappings[data["trigger"].lower()]
-            
-            # Convert character codes to full names
-            character_mappings = {
-                "L": "LOOSE_DRY_AVALANCHE", "WL": "LOOSE_WET_AVALANCHE",
-                "SS": "STORM_SLAB", "WS": "WIND_SLAB", "PS": "PERSISTENT_SLAB",
-                "DPS": "DEEP_PERSISTENT_SLAB", "WS2": "WET_SLAB",
-                "G": "GLIDE", "C": "CORNICE", "U": "UNKNOWN",
-                "storm slab": "STORM_SLAB", "wind slab": "WIND_SLAB",
-                "wet slab": "WET_SLAB", "persistent slab": "PERSISTENT_SLAB", 
-                "deep persistent": "DEEP_PERSISTENT_SLAB", "cornice": "CORNICE",
-                "glide": "GLIDE", "loose dry": "LOOSE_DRY_AVALANCHE",
-                "loose wet": "LOOSE_WET_AVALANCHE"
-            }
-            if "character" in data:
-                char_val = str(data["character"]).lower()
-                # First try lowercase lookup
-                if char_val in character_mappings:
-                    data["character"] = character_mappings[char_val]
-                # Then try uppercase code lookup
-                elif char_val.upper() in character_mappings:
-                    data["character"] = character_mappings[char_val.upper()]
-                # Finally try to match by checking if it already has the right format
-                elif char_val.upper().replace(" ", "_") in ["LOOSE_DRY_AVALANCHE", "LOOSE_WET_AVALANCHE",
-                                                             "STORM_SLAB", "WIND_SLAB", "PERSISTENT_SLAB",
-                                                             "DEEP_PERSISTENT_SLAB", "WET_SLAB", "GLIDE",
-                                                             "CORNICE", "UNKNOWN"]:
-                    data["character"] = char_val.upper().replace(" ", "_")
-            
-            # Ensure size is string
-            if "size" in data:
-                data["size"] = str(data["size"])
-            
-            # Ensure aspects are arrays
-            if "aspectFrom" in data and isinstance(data["aspectFrom"], list):
-                data["aspectFrom"] = data["aspectFrom"][0] if data["aspectFrom"] else "N"
-            if "aspectTo" in data and isinstance(data["aspectTo"], list):
-                data["aspectTo"] = data["aspectTo"][-1] if data["aspectTo"] else "N"
-        
-        # field_summary conversions
-        elif obs_type == "field_summary":
-            # Wind speed mappings
-            wind_mappings = {
-                "calm": "C", "light": "L", "moderate": "M",
-                "strong": "S", "extreme": "X", "variable": "V"
-            }
-            for field in ["windSpeed", "amWindSpeed", "pmWindSpeed"]:
-                if field in data and isinstance(data[field], str):
-                    wind_val = data[field].lower()
-                    if wind_val in wind_mappings:
-                        data[field] = wind_mappings[wind_val]
-            
-            # Sky condition mappings
-            sky_mappings = {
-                "clear": "CLR", "few": "FEW", "scattered": "SCT",
-                "broken": "BKN", "overcast": "OVC", "obscured": "X"
-            }
-            for field in ["sky", "amSky", "pmSky"]:
-                if field in data and isinstance(data[field], str):
-                    sky_val = data[field].lower()
-                    if sky_val in sky_mappings:
-                        data[field] = sky_mappings[sky_val]
-            
-            # Precipitation mappings
-            if "precip" in data:
-                precip_val = str(data["precip"]).lower()
-                if "no" in precip_val or "nil" in precip_val:
-                    data["precip"] = "NIL"
-                elif "light snow" in precip_val:
-                    data["precip"] = "S1"
-                elif "moderate snow" in precip_val:
-                    data["precip"] = "S2"
-                elif "heavy snow" in precip_val:
-                    data["precip"] = "S3"
-                elif "rain" in precip_val:
-                    data["precip"] = "R"
-        
-        # terrain_observation conversions
-        elif obs_type == "terrain_observation":
-            # ATES rating normalization
-            if "atesRating" in data:
-                ates_val = str(data["atesRating"]).title()
-                if ates_val in ["Simple", "Challenging", "Complex"]:
-                    data["atesRating"] = ates_val
-            
-            # Strategic mindset normalization
-            mindset_mappings = {
-                "assessment": "Assessment", "stepping out": "Stepping Out",
-                "status quo": "Status Quo", "stepping back": "Stepping Back",
-                "maintenance": "Maintenance", "entrenchment": "Entrenchment",
-                "open season": "Open Season", "spring diurnal": "Spring Diurnal"
-            }
-            if "strategicMindset" in data and data["strategicMindset"].lower() in mindset_mappings:
-                data["strategicMindset"] = mindset_mappings[data["strategicMindset"].lower()]
-        
-        # Common conversions for all types
-        # Ensure locationUUIDs is always an array
-        if "locationUUIDs" in data and not isinstance(data["locationUUIDs"], list):
-            data["locationUUIDs"] = [data["locationUUIDs"]]
-        
-        # Ensure numeric values are proper type
-        numeric_fields = ["tempHigh", "tempLow", "elevationMin", "elevationMax",
-                         "hs", "hn24", "hst", "percentAreaObserved", "sizeMin", "sizeMax",
-                         "depthMin", "depthMax", "depthAvg", "width", "length"]
-        for field in numeric_fields:
-            if field in data and isinstance(data[field], str):
-                try:
-                    data[field] = float(data[field])
-                except:
-                    pass
-        
-        return data
+        return payload_normalizer.normalize_values(obs_type, data)
     
     def get_template_for_type(self, observation_type: str) -> Optional[Dict[str, Any]]:
         """Get AURORA_IDEAL template for observation type"""
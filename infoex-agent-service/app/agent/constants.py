@@ -21,6 +21,10 @@ class InfoExConstants:
         
         self.constants_file = Path(constants_file)
         self.constants: Dict[str, Any] = {}
+        # Bumped on every (re)load so cached renderings can detect stale data
+        self.version = 0
+        self._prompt_section: Optional[str] = None
+        self._prompt_section_version = -1
         self.load_constants()
     
     def load_constants(self) -> None:
@@ -28,7 +32,9 @@ class InfoExConstants:
         try:
             with open(self.constants_file, 'r') as f:
                 self.constants = json.load(f)
+            self.version += 1
             logger.info("infoex_constants_loaded", 
+                       version=self.version,
                        path=str(self.constants_file),
                        keys=list(self.constants.keys())[:10])
         except FileNotFoundError:
@@ -116,7 +122,14 @@ class InfoExConstants:
         return required_fields.get(observation_type, [])
     
     def format_for_prompt(self) -> str:
-        """Format constants for inclusion in Claude's prompt"""
+        """Format constants for inclusion in Claude's prompt (rendered once per version)"""
+        if self._prompt_section_version != self.version:
+            self._prompt_section = self._render_prompt_section()
+            self._prompt_section_version = self.version
+        return self._prompt_section
+    
+    def _render_prompt_section(self) -> str:
+        """Render the constants section of Claude's prompt"""
         formatted = "Valid InfoEx Constants:\n\n"
         
         # Key constants to include
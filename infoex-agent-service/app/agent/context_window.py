@@ -0,0 +1,151 @@
+"""Token-budgeted conversation windowing for Claude requests"""
+
+import re
+from typing import List
+import structlog
+
+from app.models import ConversationMessage, Session
+
+logger = structlog.get_logger()
+
+# Rough characters-per-token ratio for English text with Claude's tokenizer.
+# Good enough for budgeting; the exact count comes back in response usage.
+CHARS_PER_TOKEN = 4
+
+# Per-message overhead for role markers and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Max characters kept from a single message when it is folded into the summary
+SUMMARY_LINE_CHARS = 300
+
+SUMMARY_HEADER = "Earlier in this conversation (summarized):"
+
+_JSON_BLOCK = re.compile(r"```json\s*\n.*?\n```", re.DOTALL)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text"""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: ConversationMessage) -> int:
+    """Estimate the tokens a history message costs in a request"""
+    return estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize_message(message: ConversationMessage) -> str:
+    """Compact a history message into a single summary line
+
+    JSON payload blocks are dropped: the data they carried already lives in
+    the session payloads, whose status is sent with every request.
+    """
+    text = _JSON_BLOCK.sub("[payload JSON]", message.content)
+    text = " ".join(text.split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 3] + "..."
+    speaker = "Guide" if message.role == "user" else "Agent"
+    return f"- {speaker}: {text}"
+
+
+class ConversationWindow:
+    """Selects the history that fits a token budget
+
+    Messages that no longer fit are folded, oldest first, into a rolling
+    summary stored on the session. Folding only ever moves forward, so the
+    window's start is stable between turns until the budget is exceeded again.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        summary_max_tokens: int,
+        max_messages: int
+    ):
+        """Initialize with the input token budget and summary size limit"""
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.max_messages = max_messages
+
+    def fit(self, session: Session, reserved_tokens: int) -> List[ConversationMessage]:
+        """Return the history messages to send, folding older ones into the summary
+
+        reserved_tokens is what the system prompt and knowledge context already
+        use of the budget. The newest message is always included.
+        """
+        history = session.conversation_history
+        start = min(session.summarized_message_count, len(history))
+
+        # Hard cap on message count regardless of size
+        if self.max_messages and len(history) - start > self.max_messages:
+            start = len(history) - self.max_messages
+
+        available = (
+            self.token_budget
+            - reserved_tokens
+            - min(estimate_tokens(session.history_summary), self.summary_max_tokens)
+        )
+
+        # Walk back from the newest message while the budget allows
+        window_start = len(history)
+        used = 0
+        for index in range(len(history) - 1, start - 1, -1):
+            cost = estimate_message_tokens(history[index])
+            if used + cost > available and window_start < len(history):
+                break
+            used += cost
+            window_start = index
+
+        # Claude requires the conversation to open with a user turn
+        while window_start < len(history) - 1 and history[window_start].role != "user":
+            window_start += 1
+
+        if window_start > session.summarized_message_count:
+            self._fold(session, window_start)
+
+        window = history[window_start:]
+
+        logger.debug("conversation_window_built",
+                    session_id=session.session_id,
+                    messages=len(window),
+                    summarized=session.summarized_message_count,
+                    history_tokens=used,
+                    reserved_tokens=reserved_tokens)
+
+        return window
+
+    def _fold(self, session: Session, end: int) -> None:
+        """Fold history[summarized_message_count:end] into the rolling summary"""
+        history = session.conversation_history
+        start = session.summarized_message_count
+
+        lines = session.history_summary.splitlines()
+        if lines and lines[0] == SUMMARY_HEADER:
+            lines = lines[1:]
+        lines.extend(
+            summarize_message(msg)
+            for msg in history[start:end]
+            if msg.role in ["user", "assistant"]
+        )
+
+        # Keep the summary bounded by dropping its oldest lines
+        budget = self.summary_max_tokens - estimate_tokens(SUMMARY_HEADER)
+        kept: List[str] = []
+        total = 0
+        for line in reversed(lines):
+            cost = estimate_tokens(line) + 1
+            if total + cost > budget:
+                break
+            kept.append(line)
+            total += cost
+        kept.reverse()
+
+        session.history_summary = "\n".join([SUMMARY_HEADER] + kept) if kept else ""
+        session.summarized_message_count = end
+
+        logger.info("conversation_history_folded",
+                   session_id=session.session_id,
+                   folded_messages=end - start,
+                   summarized_total=end,
+                   summary_lines=len(kept))
@@ -0,0 +1,99 @@
+"""Single-pass extraction of observation payloads from Claude responses
+
+A response is parsed once into a multi-document result: every ```json block
+is decoded a single time and each object in it is routed to its observation
+type. Arrays yield one document per element, so several avalanches in one
+message become several avalanche_observation documents. An object may name
+the session payload it updates with a payload_key field (e.g.
+"avalanche_observation#2"); the key is kept on the routed document.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+import structlog
+
+from app.agent.tools import TARGET_KEY
+from app.services.normalizer import PayloadNormalizer
+
+logger = structlog.get_logger()
+
+_JSON_BLOCK = re.compile(r"```json\s*\n(.*?)\n```", re.DOTALL)
+
+# Keys an object may use to name its own observation type
+TYPE_KEYS = ("observation_type", "observationType")
+
+# Wrapper keys holding a list of observations
+COLLECTION_KEYS = ("observations", "payloads", "avalanches")
+
+
+def parse_json_blocks(text: str) -> List[Any]:
+    """Decode every ```json block in text, skipping blocks that fail to parse"""
+    documents = []
+    for match in _JSON_BLOCK.finditer(text or ""):
+        try:
+            documents.append(json.loads(match.group(1)))
+        except json.JSONDecodeError:
+            logger.warning("failed_to_parse_claude_json",
+                          snippet=match.group(1)[:100])
+    return documents
+
+
+def route_documents(
+    documents: Iterable[Any],
+    normalizer: PayloadNormalizer,
+    known_types: Iterable[str],
+    preferred_types: Iterable[str] = (),
+    default_type: Optional[str] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Route decoded JSON documents to observation types
+
+    An object is assigned, in order of precedence, to the type named by its
+    observation_type key, by an enclosing {"<type>": ...} wrapper, by its
+    template field signature, or to default_type. Objects are normalized for
+    their type, keeping any payload_key as is. Objects that match nothing are
+    dropped and logged.
+    """
+    known = set(known_types)
+    preferred = list(preferred_types)
+    routed: Dict[str, List[Dict[str, Any]]] = {}
+
+    def add(obj: Dict[str, Any], obs_type: Optional[str]) -> None:
+        obj = dict(obj)
+        target = obj.pop(TARGET_KEY, None)
+        for key in TYPE_KEYS:
+            tagged = obj.pop(key, None)
+            if tagged in known:
+                obs_type = tagged
+        if obs_type is None:
+            obs_type = normalizer.classify(obj, preferred) or default_type
+        if obs_type is None:
+            logger.warning("unrouted_json_object", fields=list(obj.keys()))
+            return
+        document = normalizer.normalize(obs_type, obj)
+        if isinstance(target, str) and target:
+            document[TARGET_KEY] = target
+        routed.setdefault(obs_type, []).append(document)
+
+    def visit(node: Any, obs_type: Optional[str]) -> None:
+        if isinstance(node, list):
+            for item in node:
+                visit(item, obs_type)
+        elif isinstance(node, dict):
+            type_keys = [key for key in node if key in known]
+            if type_keys and len(type_keys) == len(node):
+                # {"avalanche_observation": [...], "field_summary": {...}}
+                for key in type_keys:
+                    visit(node[key], key)
+            elif len(node) == 1 and next(iter(node)) in COLLECTION_KEYS:
+                visit(next(iter(node.values())), obs_type)
+            else:
+                add(node, obs_type)
+
+    for document in documents:
+        visit(document, None)
+
+    if routed:
+        logger.info("json_documents_routed",
+                   documents={obs_type: len(docs) for obs_type, docs in routed.items()})
+    return routed
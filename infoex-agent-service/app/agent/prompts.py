@@ -1,5 +1,8 @@
 """System prompts for Claude agent"""
 
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
 SYSTEM_PROMPT = """You are an InfoEx API submission specialist for Aurora Backcountry.
 Your role is to parse, validate, and format data from n8n into accurate InfoEx API payloads.
 
@@ -99,16 +102,6 @@ When processing:
 - Use the parameters from request_values as they represent the current submission context
 - The request_values.date is the report submission date (today's date for the guide)
 
-When generating JSON payloads:
-- ALWAYS use the exact field names from InfoEx API (e.g., obDate, not observationDateTime)
-- Reference the AURORA_IDEAL payload structure for correct field names
-- Map natural language inputs to proper enum values
-- For avalanche_summary specifically:
-  - avalanchesObserved must be one of: "New avalanches", "No new avalanches", "Sluffing/Pinwheeling only"
-  - percentAreaObserved must be numeric (not string)
-  - Use obDate for the date field
-  - Include operationUUID, locationUUIDs, and state fields
-
 Your responses should be clear and action-oriented:
 - "Parsed successfully, ready to submit to [endpoint]"
 - "Need clarification: [specific missing field]"
@@ -137,21 +130,169 @@ avalanche_summary: Successfully submitted to InfoEx
 This clear format helps the n8n agent understand both the submission ID and state.
 
 {constants_section}
+"""
 
-Current submission parameters:
+# Payload output for CLAUDE_EXTRACTION_MODE=json_block; in tools mode the
+# record tools' instructions take its place.
+JSON_BLOCK_INSTRUCTIONS = """When generating JSON payloads:
+- Put payload data in ```json code blocks, one object per observation (e.g. one per individual avalanche)
+- ALWAYS use the exact field names from InfoEx API (e.g., obDate, not observationDateTime)
+- Reference the AURORA_IDEAL payload structure for correct field names
+- Map natural language inputs to proper enum values
+- To add to or correct an observation already in the payload status, include its key as "payload_key" (e.g. "avalanche_observation#2"); leave it out for a new observation
+- For avalanche_summary specifically:
+  - avalanchesObserved must be one of: "New avalanches", "No new avalanches", "Sluffing/Pinwheeling only"
+  - percentAreaObserved must be numeric (not string)
+  - Use obDate for the date field
+  - Include operationUUID, locationUUIDs, and state fields
+"""
+
+# Per-request parameters. Kept out of SYSTEM_PROMPT so the instructions and
+# constants stay byte-identical across sessions and can be prompt-cached.
+REQUEST_CONTEXT_PROMPT = """Current submission parameters:
 - Operation ID: {operation_id}
 - Location UUIDs: {location_uuids}
 - Zone: {zone_name}
 - Report Date: {date} (This is the submission date for all observations in this report)
 """
 
+# Marks the end of a prefix Anthropic should cache between requests
+CACHE_CONTROL = {"type": "ephemeral"}
+
 
-def build_system_prompt(request_values, constants_formatter) -> str:
-    """Build the system prompt with request values and constants"""
+def build_instructions_prompt(constants_formatter) -> str:
+    """Build the static instructions with the constants section"""
     return SYSTEM_PROMPT.format(
-        constants_section=constants_formatter.format_for_prompt(),
+        constants_section=constants_formatter.format_for_prompt()
+    )
+
+
+def build_request_context(request_values) -> str:
+    """Build the per-request parameters section"""
+    return REQUEST_CONTEXT_PROMPT.format(
         operation_id=request_values.operation_id,
         location_uuids=", ".join(request_values.location_uuids),
         zone_name=request_values.zone_name,
         date=request_values.date
     )
+
+
+def _assemble_system_blocks(
+    instructions: str,
+    knowledge_context: str,
+    request_context: str,
+    cache: bool,
+    conversation_summary: str = ""
+) -> List[Dict[str, Any]]:
+    """Assemble system prompt content blocks
+    
+    Order matters for prompt caching: instructions and constants first, then the
+    reference knowledge for the active observation types, and only then the
+    per-request values. Everything before a cache_control marker must be
+    byte-identical between requests to hit the cache.
+    """
+    blocks = [{"type": "text", "text": instructions}]
+    if cache:
+        blocks[-1]["cache_control"] = CACHE_CONTROL
+    
+    if knowledge_context:
+        blocks.append({"type": "text", "text": knowledge_context})
+        if cache:
+            blocks[-1]["cache_control"] = CACHE_CONTROL
+    
+    blocks.append({"type": "text", "text": request_context})
+    
+    if conversation_summary:
+        blocks.append({"type": "text", "text": conversation_summary})
+    return blocks
+
+
+class PromptRenderer:
+    """Memoized system prompt rendering
+    
+    The instructions and constants section are rendered once per constants
+    version. Request contexts are kept in a bounded LRU keyed by operation,
+    locations, zone and date. Everything is dropped automatically
+    when the constants are reloaded.
+    """
+    
+    def __init__(
+        self,
+        constants_formatter,
+        max_entries: int = 256,
+        extra_instructions: str = ""
+    ):
+        """Initialize with the constants source, LRU bound and any extra static instructions"""
+        self.constants_formatter = constants_formatter
+        self.max_entries = max_entries
+        self.extra_instructions = extra_instructions
+        self._constants_version: Optional[int] = None
+        self._instructions = ""
+        self._request_contexts: "OrderedDict[Tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def _sync_constants(self) -> None:
+        """Re-render the static section if the constants were reloaded"""
+        version = self.constants_formatter.version
+        if version != self._constants_version:
+            self._instructions = build_instructions_prompt(self.constants_formatter)
+            if self.extra_instructions:
+                self._instructions += "\n" + self.extra_instructions
+            self._request_contexts.clear()
+            self._constants_version = version
+    
+    @staticmethod
+    def _request_key(request_values) -> Tuple:
+        """Cache key for the request-specific part of the prompt"""
+        return (
+            request_values.operation_id,
+            tuple(request_values.location_uuids),
+            request_values.zone_name,
+            request_values.date
+        )
+    
+    def _lookup(self, cache: "OrderedDict[Tuple, str]", key: Tuple, build) -> str:
+        """Get a value from an LRU cache, building and evicting as needed"""
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            self.hits += 1
+            return value
+        
+        self.misses += 1
+        value = build()
+        cache[key] = value
+        if len(cache) > self.max_entries:
+            cache.popitem(last=False)
+        return value
+    
+    def instructions(self) -> str:
+        """Get the rendered instructions and constants section"""
+        self._sync_constants()
+        return self._instructions
+    
+    def request_context(self, request_values) -> str:
+        """Get the rendered request parameters section"""
+        self._sync_constants()
+        return self._lookup(
+            self._request_contexts,
+            self._request_key(request_values),
+            lambda: build_request_context(request_values)
+        )
+    
+    def system_blocks(
+        self,
+        request_values,
+        knowledge_context: str = "",
+        cache: bool = True,
+        conversation_summary: str = ""
+    ) -> List[Dict[str, Any]]:
+        """Get the system prompt as content blocks with a cacheable static prefix"""
+        return _assemble_system_blocks(
+            self.instructions(),
+            knowledge_context,
+            self.request_context(request_values),
+            cache,
+            conversation_summary
+        )
@@ -0,0 +1,265 @@
+"""Claude call scheduling with a concurrency cap, rate budgets and fair queuing"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+
+class ClaudeCapacityError(Exception):
+    """Raised when a Claude call cannot be scheduled within the allowed wait"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClaudeTicket:
+    """An admitted Claude call; report actual usage through record_usage"""
+
+    def __init__(self, scheduler: "ClaudeScheduler", session_id: str, token_entry: List[float], waited: float):
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.token_entry = token_entry
+        self.waited = waited
+
+    def record_usage(self, tokens: Optional[int]) -> None:
+        """Replace the token estimate with the tokens the call actually used"""
+        if tokens is not None:
+            self.token_entry[1] = tokens
+
+
+class _Waiter:
+    """A queued request for a Claude slot"""
+
+    __slots__ = ("future", "session_id", "tokens", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, session_id: str, tokens: int):
+        self.future = future
+        self.session_id = session_id
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class ClaudeScheduler:
+    """Admits Claude calls under a concurrency cap and optional rate budgets
+
+    Waiting calls are queued per session and served round-robin across
+    sessions, so one guide pasting a long report cannot starve everyone else.
+    A call that cannot start within queue_timeout (or finds the queue full)
+    raises ClaudeCapacityError with a Retry-After estimate.
+    """
+
+    TOKEN_WINDOW = 60.0
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        tokens_per_minute: int = 0,
+        requests_per_period: int = 0,
+        period: float = 60.0,
+        queue_timeout: float = 30.0,
+        max_queue_depth: int = 100
+    ):
+        """Initialize limits (0 disables a rate budget)"""
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_period = requests_per_period
+        self.period = period
+        self.queue_timeout = queue_timeout
+        self.max_queue_depth = max_queue_depth
+
+        self._active = 0
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+        self._token_log: Deque[List[float]] = deque()
+        self._request_log: Deque[float] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queue_seen = 0
+        self._total_wait = 0.0
+        self._total_service = 0.0
+        self._completed = 0
+
+    def _prune(self, now: float) -> None:
+        """Drop rate budget entries that have left their windows"""
+        while self._token_log and now - self._token_log[0][0] >= self.TOKEN_WINDOW:
+            self._token_log.popleft()
+        while self._request_log and now - self._request_log[0] >= self.period:
+            self._request_log.popleft()
+
+    def _budget_delay(self, tokens: int, now: float) -> float:
+        """Seconds until a call with this token estimate fits the rate budgets"""
+        self._prune(now)
+        delay = 0.0
+
+        if self.requests_per_period and len(self._request_log) >= self.requests_per_period:
+            delay = max(delay, self._request_log[0] + self.period - now)
+
+        if self.tokens_per_minute and self._token_log:
+            used = sum(entry[1] for entry in self._token_log)
+            # A single call larger than the whole budget only has to wait for an empty window
+            allowed = max(self.tokens_per_minute - tokens, 0)
+            if used > allowed:
+                excess = used - allowed
+                for timestamp, entry_tokens in self._token_log:
+                    excess -= entry_tokens
+                    if excess <= 0:
+                        delay = max(delay, timestamp + self.TOKEN_WINDOW - now)
+                        break
+
+        return delay
+
+    def _admit(self, session_id: str, tokens: int, waited: float, now: float) -> ClaudeTicket:
+        """Take a slot and charge the rate budgets"""
+        self._active += 1
+        self.admitted += 1
+        self._total_wait += waited
+        entry = [now, float(tokens)]
+        self._token_log.append(entry)
+        self._request_log.append(now)
+        return ClaudeTicket(self, session_id, entry, waited)
+
+    def _dispatch(self) -> None:
+        """Admit queued calls round-robin across sessions while capacity allows"""
+        self._timer = None
+        while self._queues and self._active < self.max_concurrency:
+            session_id, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+
+            now = time.monotonic()
+            delay = self._budget_delay(waiter.tokens, now)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+            self._pop_waiter(session_id, queue)
+            waiter.future.set_result(
+                self._admit(session_id, waiter.tokens, now - waiter.enqueued_at, now)
+            )
+
+    def _pop_waiter(self, session_id: str, queue: Deque[_Waiter]) -> None:
+        """Remove the head waiter and rotate its session to the back of the line"""
+        queue.popleft()
+        self._queued -= 1
+        if queue:
+            self._queues.move_to_end(session_id)
+        else:
+            del self._queues[session_id]
+
+    def _release(self, ticket: ClaudeTicket, started: float) -> None:
+        """Free a slot and let the next queued call in"""
+        self._active -= 1
+        self._completed += 1
+        self._total_service += time.monotonic() - started
+        if self._queues and self._timer is None:
+            self._dispatch()
+
+    def _retry_after(self) -> float:
+        """Estimate when a rejected caller should try again"""
+        average_service = self._total_service / self._completed if self._completed else 10.0
+        backlog = (self._queued + self._active) / max(self.max_concurrency, 1)
+        return max(1.0, round(average_service * max(backlog, 1.0), 1))
+
+    async def _acquire(self, session_id: str, tokens: int) -> ClaudeTicket:
+        """Wait for a slot, raising ClaudeCapacityError if none frees up in time"""
+        now = time.monotonic()
+        if (not self._queues
+                and self._active < self.max_concurrency
+                and self._budget_delay(tokens, now) <= 0):
+            return self._admit(session_id, tokens, 0.0, now)
+
+        if self._queued >= self.max_queue_depth:
+            self.rejected += 1
+            logger.warning("claude_queue_full",
+                          session_id=session_id,
+                          queued=self._queued)
+            raise ClaudeCapacityError("Claude request queue is full.", self._retry_after())
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), session_id, tokens)
+        self._queues.setdefault(session_id, deque()).append(waiter)
+        self._queued += 1
+        self.max_queue_seen = max(self.max_queue_seen, self._queued)
+        if self._timer is None:
+            self._dispatch()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                # Admitted at the last moment; keep the slot
+                return waiter.future.result()
+            self.timed_out += 1
+            logger.warning("claude_queue_timeout",
+                          session_id=session_id,
+                          queued=self._queued,
+                          active=self._active)
+            raise ClaudeCapacityError("Timed out waiting for Claude capacity.", self._retry_after())
+        except asyncio.CancelledError:
+            if not self._abandon(waiter):
+                self._release(waiter.future.result(), time.monotonic())
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Withdraw a queued waiter; False if it had already been admitted"""
+        if waiter.future.done():
+            return False
+        waiter.future.cancel()
+        queue = self._queues.get(waiter.session_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[waiter.session_id]
+        return True
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, estimated_tokens: int) -> AsyncIterator[ClaudeTicket]:
+        """Hold a Claude slot for the duration of the block"""
+        ticket = await self._acquire(session_id, estimated_tokens)
+        started = time.monotonic()
+        try:
+            yield ticket
+        finally:
+            self._release(ticket, started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth, utilization and counters"""
+        now = time.monotonic()
+        self._prune(now)
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queued": self._queued,
+            "queued_sessions": len(self._queues),
+            "max_queue_seen": self.max_queue_seen,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "tokens_last_minute": int(sum(entry[1] for entry in self._token_log)),
+            "tokens_per_minute_budget": self.tokens_per_minute,
+            "requests_in_period": len(self._request_log),
+            "requests_per_period_budget": self.requests_per_period,
+            "avg_wait_ms": round(1000 * self._total_wait / self.admitted, 1) if self.admitted else 0.0,
+        }
+
+
+# Create singleton instance
+claude_scheduler = ClaudeScheduler(
+    max_concurrency=settings.claude_max_concurrency,
+    tokens_per_minute=settings.claude_tokens_per_minute,
+    requests_per_period=settings.rate_limit_requests,
+    period=settings.rate_limit_period,
+    queue_timeout=settings.claude_queue_timeout_seconds,
+    max_queue_depth=settings.claude_max_queue_depth
+)
@@ -0,0 +1,152 @@
+"""Claude tool definitions for structured payload extraction
+
+Each observation type gets a `record_<type>` tool whose input schema is
+generated from its AURORA_IDEAL_PAYLOAD template in data/aurora_templates.
+Claude fills the tool arguments with the fields it has extracted, and the
+arguments are used directly as payload data.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+TOOL_NAME_PREFIX = "record_"
+
+# Fields the service fills from request_values; Claude should not supply them
+SERVICE_MANAGED_FIELDS = {"obDate", "locationUUIDs", "operationUUID", "state"}
+
+# Argument (or JSON field) naming the session payload an observation updates
+TARGET_KEY = "payload_key"
+
+TOOL_USE_INSTRUCTIONS = """Recording payload data:
+- Record extracted observation data by calling the matching record_<observation_type> tool
+- Call the tool once per observation (e.g. once per individual avalanche)
+- To add to or correct an observation already recorded, set payload_key to its key from the payload status (e.g. avalanche_observation#2); leave it out for a new observation
+- Include only fields you can fill from the conversation; partial data is fine and can be completed in later turns
+- Do not put payload JSON in your text reply; the tool call is what gets saved
+- Still reply in text, including "Payload validated and ready for <observation type> submission" when complete
+"""
+
+
+def load_template_files(template_dir: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """Load the full template files (payload plus field constraints) by observation type"""
+    if template_dir is None:
+        template_dir = Path(__file__).parent.parent.parent / "data" / "aurora_templates"
+
+    templates = {}
+    for file_path in sorted(Path(template_dir).glob("*.json")):
+        try:
+            with open(file_path, 'r') as f:
+                templates[file_path.stem] = json.load(f)
+        except Exception as e:
+            logger.error("tool_template_load_error",
+                        type=file_path.stem,
+                        error=str(e))
+    return templates
+
+
+def _schema_for_value(value: Any) -> Dict[str, Any]:
+    """Infer a JSON schema from a template example value"""
+    if isinstance(value, bool):
+        return {"type": "boolean"}
+    if isinstance(value, (int, float)):
+        return {"type": "number"}
+    if isinstance(value, str):
+        return {"type": "string"}
+    if isinstance(value, list):
+        schema: Dict[str, Any] = {"type": "array"}
+        if value:
+            schema["items"] = _schema_for_value(value[0])
+        return schema
+    if isinstance(value, dict):
+        return {
+            "type": "object",
+            "properties": {k: _schema_for_value(v) for k, v in value.items() if not k.startswith("_")}
+        }
+    return {}
+
+
+def build_tool_for_type(observation_type: str, template_file: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build the record tool for one observation type"""
+    payload = template_file.get("AURORA_IDEAL_PAYLOAD")
+    if not payload:
+        return None
+
+    properties = {}
+    for field, example in payload.items():
+        if field.startswith("_") or field in SERVICE_MANAGED_FIELDS:
+            continue
+        schema = _schema_for_value(example)
+        constraint = template_file.get(f"_{field}_constraint")
+        if constraint:
+            schema["description"] = constraint
+        properties[field] = schema
+
+    properties[TARGET_KEY] = {
+        "type": "string",
+        "description": (
+            f"Key of the recorded {observation_type} this call updates, as listed "
+            f"in the payload status (e.g. {observation_type}#2). Omit for a new observation."
+        )
+    }
+
+    return {
+        "name": f"{TOOL_NAME_PREFIX}{observation_type}",
+        "description": (
+            f"Record {observation_type} data extracted from the conversation. "
+            f"Use exact InfoEx values. One call per observation."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": properties
+        }
+    }
+
+
+def build_extraction_tools(
+    template_files: Dict[str, Dict[str, Any]],
+    cache: bool = True
+) -> List[Dict[str, Any]]:
+    """Build record tools for every observation type with a template
+
+    With cache enabled the last tool carries a cache_control marker; tools sit
+    ahead of the system prompt, so the whole tool list joins the cached prefix.
+    """
+    tools = []
+    for observation_type, template_file in template_files.items():
+        tool = build_tool_for_type(observation_type, template_file)
+        if tool:
+            tools.append(tool)
+
+    if cache and tools:
+        tools[-1]["cache_control"] = {"type": "ephemeral"}
+
+    logger.info("extraction_tools_built",
+               tools=[tool["name"] for tool in tools])
+    return tools
+
+
+def extract_tool_inputs(content: List[Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Collect record tool calls from a Claude response by observation type"""
+    inputs: Dict[str, List[Dict[str, Any]]] = {}
+    for block in content:
+        if getattr(block, "type", None) != "tool_use":
+            continue
+        name = getattr(block, "name", "")
+        if not name.startswith(TOOL_NAME_PREFIX):
+            continue
+        observation_type = name[len(TOOL_NAME_PREFIX):]
+        if isinstance(block.input, dict):
+            inputs.setdefault(observation_type, []).append(block.input)
+    return inputs
+
+
+def response_text(content: List[Any]) -> str:
+    """Join the text blocks of a Claude response"""
+    return "".join(
+        block.text for block in content
+        if getattr(block, "type", None) == "text"
+    )
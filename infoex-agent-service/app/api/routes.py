@@ -1,7 +1,9 @@
 """API route handlers for InfoEx Claude Agent"""
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, Any, List, Optional
+import json
 import structlog
 
 from app.models import (
@@ -10,13 +12,22 @@ from app.models import (
     SubmissionRequest,
     SubmissionResponse,
     SessionStatus,
+    SessionSummary,
+    SessionListResponse,
     ErrorResponse,
-    HealthCheckResponse
+    HealthCheckResponse,
+    Session,
+    SubmissionJob
 )
-from app.services.session import session_manager
-from app.services.payload import payload_builder
+from app.config import settings
+from app.services.session import session_manager, SessionUnitOfWork, SessionConflictError
 from app.services.infoex import infoex_client
+from app.services.idempotency import idempotency_store, IdempotencyInProgress
+from app.services.archive import session_archiver
+from app.services.submission import submit_payloads, submission_queue
+from app.services.ledger import submission_ledger
 from app.agent.claude_agent import ClaudeAgent
+from app.agent.scheduler import claude_scheduler, ClaudeCapacityError
 from datetime import datetime
 from app import __version__
 
@@ -29,107 +40,208 @@ router = APIRouter()
 claude_agent = ClaudeAgent()
 
 
-@router.post("/api/process-report", response_model=ProcessReportResponse)
-async def process_report(request: ProcessReportRequest):
-    """Process a report message through Claude"""
-    try:
-        # Get or create session
-        session = await session_manager.get_session(request.session_id)
+async def _get_or_create_session(uow: SessionUnitOfWork, request: ProcessReportRequest) -> Session:
+    """Load the request's session, creating it on the first message
+    
+    A new session is stored when the unit of work commits.
+    """
+    # If conversation context provided, add it as metadata
+    metadata = {}
+    if request.conversation_context:
+        metadata["n8n_context"] = request.conversation_context
+    
+    return await uow.get_or_create(request.request_values, metadata)
+
+
+async def _auto_submit_ready_payloads(
+    request: ProcessReportRequest,
+    updated_session: Session,
+    response_text: str
+) -> Optional[List[str]]:
+    """Submit ready payloads when Claude says they are ready
+    
+    Returns the per-type result lines, or None when nothing was submitted.
+    In queued submission mode the payloads are queued as one job instead;
+    the caller must have stored the session first.
+    """
+    # Check if payloads are ready for submission (always auto-submit when ready)
+    # auto_submit flag only controls the state (IN_REVIEW vs SUBMITTED)
+    logger.info("auto_submit_check",
+               session_id=request.session_id,
+               auto_submit=request.auto_submit,
+               response_contains_ready="ready for" in response_text.lower(),
+               response_contains_submission="submission" in response_text.lower(),
+               response_snippet=response_text.lower()[-200:] if len(response_text) > 200 else response_text.lower())
         
-        if not session:
-            # Create new session with request values
-            session = await session_manager.create_session(request.request_values)
-            # Update session ID to match request
-            session.session_id = request.session_id
-            
-            # If conversation context provided, add it as metadata
-            if request.conversation_context:
-                session.metadata["n8n_context"] = request.conversation_context
+    if not ("ready for" in response_text.lower() and "submission" in response_text.lower()):
+        return None
+    
+    # Log payload states for debugging
+    logger.info("checking_payloads_for_submission",
+               session_id=request.session_id,
+               payloads_count=len(updated_session.payloads),
+               payload_states={k: v.status for k, v in updated_session.payloads.items()})
+    
+    # Find which payloads are ready
+    ready_types = []
+    for obs_type, payload in updated_session.payloads.items():
+        if payload.status == "ready":
+            ready_types.append(obs_type)
+    
+    if not ready_types:
+        logger.warning("no_ready_payloads_despite_response",
+                      session_id=request.session_id,
+                      response_contains_ready=("ready for" in response_text.lower()),
+                      payloads_count=len(updated_session.payloads),
+                      payload_details={k: {"status": v.status, "missing": v.missing_fields} 
+                                     for k, v in updated_session.payloads.items()})
+        return None
+    
+    logger.info("submitting_ready_payloads",
+               session_id=request.session_id,
+               ready_types=ready_types)
+    
+    # Queued mode: workers submit and record the outcome on the session
+    if submission_queue.enabled:
+        job = await submission_queue.enqueue(request.session_id, ready_types, request.submission_state)
+        return [f"{obs_type}: Queued for submission to InfoEx (job {job.job_id})" for obs_type in ready_types]
+    
+    # Submit to InfoEx (with optional submission state override)
+    submission_results = []
+    for submission in await submit_payloads(updated_session, ready_types, request.submission_state):
+        obs_type = submission["observation_type"]
+        if "errors" in submission:
+            submission_results.append(f"{obs_type}: Validation errors - {', '.join(submission['errors'])}")
+            continue
+        
+        result = submission["result"]
+        if submission["success"]:
+            # Determine submission state
+            submission_state = request.submission_state or settings.infoex_submission_state
             
-            await session_manager.save_session(session)
+            submission_results.append(
+                f"{obs_type}: Successfully submitted to InfoEx\n"
+                f"  - UUID: {result.get('uuid')}\n"
+                f"  - State: {submission_state}\n"
+                f"  - Response Code: {result.get('status_code', 200)}"
+            )
+        else:
+            error_msg = result.get('error', 'Unknown error')
+            if 'status_code' in result:
+                submission_results.append(f"{obs_type}: Failed - {error_msg} (Response Code: {result['status_code']})")
+            else:
+                submission_results.append(f"{obs_type}: Failed - {error_msg}")
+    
+    return submission_results
+
+
+def _format_submission_results(submission_results: List[str]) -> str:
+    """Format auto-submission results for appending to Claude's response"""
+    return f"\n\nAuto-submission results:\n" + "\n".join(submission_results)
+
+
+def _capacity_exceeded(error: ClaudeCapacityError) -> HTTPException:
+    """429 telling the caller when Claude capacity is likely to be available"""
+    return HTTPException(
+        status_code=429,
+        detail=f"{error} Retry shortly.",
+        headers={"Retry-After": str(int(error.retry_after + 0.999))}
+    )
+
+
+def _session_conflict(error: SessionConflictError) -> HTTPException:
+    """409 for a session that another request updated concurrently"""
+    return HTTPException(
+        status_code=409,
+        detail=f"{error}. Retry the request.",
+        headers={"Retry-After": "1"}
+    )
+
+
+def _session_not_saved(session_id: str) -> HTTPException:
+    """503 for a turn whose session could not be stored"""
+    return HTTPException(
+        status_code=503,
+        detail=f"Session {session_id} could not be saved. Retry the request.",
+        headers={"Retry-After": "1"}
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Encode a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _process_turn(request: ProcessReportRequest) -> str:
+    """Run one Claude turn for the request and return the response text
+    
+    The turn is stored before auto-submission, so a conflict retry never
+    repeats an InfoEx submission; submission statuses are stored after it,
+    merging with any concurrent update. Raises a 503 if either save fails,
+    so the response is never stored for replay without the session.
+    """
+    async with session_manager.unit_of_work(request.session_id, retryable=True) as uow:
+        # Get or create session
+        session = await _get_or_create_session(uow, request)
         
         # Process message with Claude
-        response_text, updated_session = claude_agent.process_message(
+        response_text, updated_session = await claude_agent.aprocess_message(
             session,
             request.message
         )
+        if not await uow.commit():
+            raise _session_not_saved(request.session_id)
         
-        # Save updated session
-        await session_manager.save_session(updated_session)
-        
-        # Check if payloads are ready for submission (always auto-submit when ready)
-        # auto_submit flag only controls the state (IN_REVIEW vs SUBMITTED)
-        logger.info("auto_submit_check",
-                   session_id=request.session_id,
-                   auto_submit=request.auto_submit,
-                   response_contains_ready="ready for" in response_text.lower(),
-                   response_contains_submission="submission" in response_text.lower(),
-                   response_snippet=response_text.lower()[-200:] if len(response_text) > 200 else response_text.lower())
-            
-        if "ready for" in response_text.lower() and "submission" in response_text.lower():
-            # Log payload states for debugging
-            logger.info("checking_payloads_for_submission",
-                       session_id=request.session_id,
-                       payloads_count=len(updated_session.payloads),
-                       payload_states={k: v.status for k, v in updated_session.payloads.items()})
-            
-            # Find which payloads are ready
-            ready_types = []
-            for obs_type, payload in updated_session.payloads.items():
-                if payload.status == "ready":
-                    ready_types.append(obs_type)
-            
-            if ready_types:
-                logger.info("submitting_ready_payloads",
+        submission_results = await _auto_submit_ready_payloads(request, updated_session, response_text)
+        if submission_results:
+            # Append submission results to response
+            response_text += _format_submission_results(submission_results)
+            if not await uow.commit(conflict_policy="merge"):
+                raise _session_not_saved(request.session_id)
+            await session_archiver.enqueue_if_complete(uow.session)
+    
+    return response_text
+
+
+@router.post("/api/process-report", response_model=ProcessReportResponse)
+async def process_report(
+    request: ProcessReportRequest,
+    idempotency_key: Optional[str] = Header(default=None)
+):
+    """Process a report message through Claude
+    
+    Retries of the same request (same Idempotency-Key header or body field)
+    within the idempotency window get the stored response back without
+    calling Claude again. Requests without a key are never deduplicated.
+    """
+    request_key = idempotency_store.request_key(
+        request.session_id,
+        idempotency_key or request.idempotency_key
+    )
+    try:
+        replay = await idempotency_store.begin(request_key)
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail="An identical request is still being processed. Retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    if replay is not None:
+        return ProcessReportResponse(**replay)
+    
+    try:
+        attempts = settings.session_conflict_retries + 1 if settings.session_conflict_policy == "retry" else 1
+        for attempt in range(attempts):
+            try:
+                response_text = await _process_turn(request)
+                break
+            except SessionConflictError:
+                # Run the turn again on the latest session
+                if attempt + 1 == attempts:
+                    raise
+                logger.info("process_report_conflict_retry",
                            session_id=request.session_id,
-                           ready_types=ready_types)
-                
-                # Auto-submit ready payloads
-                submission_results = []
-                for obs_type in ready_types:
-                    # Build payload (with optional submission state override)
-                    payload_data, errors = payload_builder.build_payload(
-                        obs_type, 
-                        updated_session,
-                        request.submission_state
-                    )
-                    
-                    if not errors:
-                        # Submit to InfoEx
-                        success, result = await infoex_client.submit_observation(obs_type, payload_data)
-                        
-                        if success:
-                            # Determine submission state
-                            submission_state = request.submission_state or settings.infoex_submission_state
-                            
-                            submission_results.append(
-                                f"{obs_type}: Successfully submitted to InfoEx\n"
-                                f"  - UUID: {result.get('uuid')}\n"
-                                f"  - State: {submission_state}\n"
-                                f"  - Response Code: {result.get('status_code', 200)}"
-                            )
-                            updated_session.payloads[obs_type].status = "submitted"
-                        else:
-                            error_msg = result.get('error', 'Unknown error')
-                            if 'status_code' in result:
-                                submission_results.append(f"{obs_type}: Failed - {error_msg} (Response Code: {result['status_code']})")
-                            else:
-                                submission_results.append(f"{obs_type}: Failed - {error_msg}")
-                    else:
-                        submission_results.append(f"{obs_type}: Validation errors - {', '.join(errors)}")
-                
-                # Save updated session with submission status
-                await session_manager.save_session(updated_session)
-                
-                # Append submission results to response
-                response_text += f"\n\nAuto-submission results:\n" + "\n".join(submission_results)
-            else:
-                logger.warning("no_ready_payloads_despite_response",
-                              session_id=request.session_id,
-                              response_contains_ready=("ready for" in response_text.lower()),
-                              payloads_count=len(updated_session.payloads),
-                              payload_details={k: {"status": v.status, "missing": v.missing_fields} 
-                                             for k, v in updated_session.payloads.items()})
+                           attempt=attempt + 1)
         
         logger.info("report_processed",
                    session_id=request.session_id,
@@ -137,74 +249,177 @@ async def process_report(request: ProcessReportRequest):
                    response_length=len(response_text),
                    auto_submit=request.auto_submit)
         
-        return ProcessReportResponse(response=response_text)
+        response = ProcessReportResponse(response=response_text)
+        await idempotency_store.complete(request_key, response.model_dump())
+        return response
         
+    except ClaudeCapacityError as e:
+        await idempotency_store.release(request_key)
+        raise _capacity_exceeded(e)
+    except SessionConflictError as e:
+        await idempotency_store.release(request_key)
+        raise _session_conflict(e)
+    except HTTPException:
+        await idempotency_store.release(request_key)
+        raise
     except Exception as e:
+        await idempotency_store.release(request_key)
         logger.error("process_report_error",
                     session_id=request.session_id,
                     error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/api/process-report/stream")
+async def process_report_stream(request: ProcessReportRequest):
+    """Process a report message through Claude, streaming tokens as Server-Sent Events
+    
+    Emits `token` events with text deltas while Claude generates, then a single
+    `result` event with the full response, payload statuses and any
+    auto-submission results. Failures after streaming has started are reported
+    as an `error` event.
+    
+    The first token is awaited before the response starts, so a request that
+    cannot get Claude capacity still receives a plain 429 with Retry-After.
+    """
+    uow = session_manager.unit_of_work(request.session_id)
+    tokens = None
+    try:
+        session = await _get_or_create_session(uow, request)
+        tokens = claude_agent.astream_message(session, request.message)
+        event = await tokens.__anext__()
+    except ClaudeCapacityError as e:
+        await uow.rollback()
+        uow.close()
+        raise _capacity_exceeded(e)
+    except Exception as e:
+        if tokens is not None:
+            await tokens.aclose()
+        await uow.rollback()
+        uow.close()
+        logger.error("process_report_error",
+                    session_id=request.session_id,
+                    error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            # Text deltas, then the agent's final response once the turn is recorded
+            kind, text = event
+            while kind == "token":
+                yield _sse_event("token", {"text": text})
+                kind, text = await tokens.__anext__()
+            response_text = text
+            
+            # Save the turn before submitting, so queued jobs see the ready payloads
+            await uow.commit()
+            
+            submission_results = await _auto_submit_ready_payloads(request, session, response_text)
+            if submission_results:
+                response_text += _format_submission_results(submission_results)
+                await uow.commit(conflict_policy="merge")
+                await session_archiver.enqueue_if_complete(session)
+            
+            logger.info("report_processed",
+                       session_id=request.session_id,
+                       message_length=len(request.message),
+                       response_length=len(response_text),
+                       auto_submit=request.auto_submit,
+                       streamed=True)
+            
+            yield _sse_event("result", {
+                "response": response_text,
+                "payloads": {
+                    obs_type: {
+                        "status": payload.status,
+                        "missing_fields": payload.missing_fields
+                    }
+                    for obs_type, payload in session.payloads.items()
+                },
+                "submissions": submission_results or []
+            })
+            
+        except Exception as e:
+            logger.error("process_report_stream_error",
+                        session_id=request.session_id,
+                        error=str(e))
+            yield _sse_event("error", {"error": str(e)})
+        finally:
+            await tokens.aclose()
+            # No-op after a commit; applies the error policy otherwise
+            await uow.rollback()
+            uow.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/api/submit-to-infoex", response_model=SubmissionResponse)
-async def submit_to_infoex(request: SubmissionRequest):
-    """Submit completed payloads to InfoEx"""
+async def submit_to_infoex(request: SubmissionRequest, response: Response):
+    """Submit completed payloads to InfoEx
+    
+    In queued submission mode the payloads are handed to the background
+    workers instead; the 202 response carries a job_id to poll.
+    """
     try:
-        # Get session
-        session = await session_manager.get_session(request.session_id)
-        
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Build payloads for requested types
-        submissions = []
-        overall_success = True
-        messages = []
-        
-        for obs_type in request.submission_types:
-            if obs_type not in session.payloads:
-                messages.append(f"{obs_type}: Not initialized in session")
-                overall_success = False
-                continue
+        # Submitted statuses are written once when the unit of work commits
+        async with session_manager.unit_of_work(request.session_id) as uow:
+            # Get session
+            session = await uow.load()
             
-            # Build payload (with optional submission state override)
-            payload, errors = payload_builder.build_payload(
-                obs_type, 
-                session,
-                request.submission_state
-            )
+            if not session:
+                raise HTTPException(status_code=404, detail="Session not found")
             
-            if errors:
-                submission = {
-                    "observation_type": obs_type,
-                    "success": False,
-                    "errors": errors
-                }
-                submissions.append(submission)
-                messages.append(f"{obs_type}: Validation errors")
-                overall_success = False
-                continue
+            # Build payloads for requested types
+            submissions = []
+            overall_success = True
+            messages = []
             
-            # Submit to InfoEx
-            success, result = await infoex_client.submit_observation(obs_type, payload)
+            # Expand each requested type to all of its payloads (e.g. several avalanches)
+            payload_keys = []
+            for obs_type in request.submission_types:
+                keys = [
+                    key for key, payload in session.payloads.items()
+                    if key == obs_type or payload.observation_type == obs_type
+                ]
+                if not keys:
+                    messages.append(f"{obs_type}: Not initialized in session")
+                    overall_success = False
+                for key in keys:
+                    if key not in payload_keys:
+                        payload_keys.append(key)
             
-            submission = {
-                "observation_type": obs_type,
-                "success": success,
-                "result": result
-            }
-            submissions.append(submission)
+            if submission_queue.enabled and payload_keys:
+                job = await submission_queue.enqueue(request.session_id, payload_keys, request.submission_state)
+                response.status_code = 202
+                messages.extend(f"{obs_type}: Queued" for obs_type in payload_keys)
+                return SubmissionResponse(
+                    success=overall_success,
+                    message=f"Queued {len(payload_keys)} submissions as job {job.job_id}. Details: " + " | ".join(messages),
+                    submissions=[
+                        {"observation_type": obs_type, "status": "queued"}
+                        for obs_type in payload_keys
+                    ],
+                    job_id=job.job_id
+                )
             
-            if success:
-                messages.append(f"{obs_type}: Submitted (UUID: {result.get('uuid')})")
-                # Update payload status
-                session.payloads[obs_type].status = "submitted"
-            else:
-                messages.append(f"{obs_type}: Failed - {result.get('error', 'Unknown error')}")
-                overall_success = False
+            # Submit to InfoEx (with optional submission state override)
+            for submission in await submit_payloads(session, payload_keys, request.submission_state):
+                obs_type = submission["observation_type"]
+                submissions.append(submission)
+                if "errors" in submission:
+                    messages.append(f"{obs_type}: Validation errors")
+                    overall_success = False
+                elif submission["success"]:
+                    messages.append(f"{obs_type}: Submitted (UUID: {submission['result'].get('uuid')})")
+                else:
+                    messages.append(f"{obs_type}: Failed - {submission['result'].get('error', 'Unknown error')}")
+                    overall_success = False
         
-        # Save updated session
-        await session_manager.save_session(session)
+        await session_archiver.enqueue_if_complete(session)
         
         # Build summary message
         summary = f"Processed {len(submissions)} submissions. "
@@ -225,6 +440,10 @@ async def submit_to_infoex(request: SubmissionRequest):
             submissions=submissions
         )
         
+    except HTTPException:
+        raise
+    except SessionConflictError as e:
+        raise _session_conflict(e)
     except Exception as e:
         logger.error("submission_error",
                     session_id=request.session_id,
@@ -232,11 +451,27 @@ async def submit_to_infoex(request: SubmissionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/api/jobs/{job_id}", response_model=SubmissionJob)
+async def get_submission_job(job_id: str):
+    """Status and results of a queued InfoEx submission"""
+    try:
+        job = await submission_queue.get_job(job_id)
+    except Exception as e:
+        logger.error("get_submission_job_error", job_id=job_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
 @router.get("/api/session/{session_id}/status", response_model=SessionStatus)
 async def get_session_status(session_id: str):
     """Get current session status"""
     try:
-        session = await session_manager.get_session(session_id)
+        # Read-only: the unit of work has nothing to write on exit
+        async with session_manager.unit_of_work(session_id) as uow:
+            session = await uow.load()
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -251,8 +486,8 @@ async def get_session_status(session_id: str):
             elif payload.status == "incomplete":
                 missing_data[obs_type] = payload.missing_fields
         
-        # Get TTL
-        ttl = await session_manager.get_session_ttl(session_id)
+        # TTL comes back with the session read
+        ttl = uow.ttl
         status = "active" if ttl > 0 else "expired"
         
         return SessionStatus(
@@ -287,22 +522,64 @@ async def clear_session(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/api/sessions", response_model=SessionListResponse)
+async def list_sessions(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    zone: Optional[str] = None,
+    operation_id: Optional[str] = None
+):
+    """List active sessions, most recently updated first"""
+    try:
+        page, total = await session_manager.list_sessions(offset, limit, zone=zone, operation_id=operation_id)
+        sessions = await session_manager.get_sessions([session_id for session_id, _ in page])
+        
+        # Sessions that expired since the last cleanup are dropped from the index
+        expired = [session_id for session_id, session in sessions.items() if session is None]
+        if expired:
+            await session_manager.remove_from_index(expired)
+        
+        summaries = [
+            SessionSummary(
+                session_id=session.session_id,
+                zone_name=session.request_values.zone_name,
+                operation_id=session.request_values.operation_id,
+                last_updated=session.last_updated,
+                conversation_length=len(session.conversation_history),
+                payload_statuses={obs_type: payload.status for obs_type, payload in session.payloads.items()}
+            )
+            for session_id, _ in page
+            if (session := sessions[session_id]) is not None
+        ]
+        
+        return SessionListResponse(
+            sessions=summaries,
+            total=total - len(expired),
+            offset=offset,
+            limit=limit
+        )
+        
+    except Exception as e:
+        logger.error("list_sessions_error", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/health", response_model=HealthCheckResponse)
 async def health_check():
     """Health check endpoint"""
     checks = {}
     
-    # Check Redis
+    # Check session storage ("redis" or "memory")
+    backend = session_manager.backend.name
     try:
-        await session_manager.redis.ping()
-        checks["redis"] = True
+        checks[backend] = await session_manager.backend.ping()
     except:
-        checks["redis"] = False
+        checks[backend] = False
     
     # Check Claude
     try:
         # Just verify we have API key
-        checks["claude"] = bool(claude_agent.client.api_key)
+        checks["claude"] = bool(claude_agent.async_client.api_key)
     except:
         checks["claude"] = False
     
@@ -324,6 +601,22 @@ async def health_check():
     )
 
 
+@router.get("/api/metrics")
+async def get_metrics():
+    """Claude queue depth, session cache and utilization for this worker"""
+    return {
+        "claude": claude_scheduler.stats(),
+        "infoex": infoex_client.stats(),
+        "session_store": session_manager.backend.stats(),
+        "session_cache": session_manager.cache.stats(),
+        "session_compression": session_manager.compressor.stats(),
+        "archive": session_archiver.stats(),
+        "submission_queue": await submission_queue.stats(),
+        "submission_ledger": submission_ledger.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
 @router.get("/api/locations")
 async def get_locations():
     """Get available InfoEx locations"""
@@ -16,6 +16,9 @@ class Settings(BaseSettings):
     claude_model: str = Field(default="claude-3-opus-20240229", description="Claude model to use")
     claude_max_tokens: int = Field(default=1024, description="Max tokens for Claude response")
     claude_temperature: float = Field(default=0.3, description="Temperature for Claude responses")
+    prompt_cache_size: int = Field(default=256, description="Max rendered request contexts kept in the in-process LRU")
+    claude_prompt_caching: bool = Field(default=True, description="Mark the static system prompt prefix for Anthropic prompt caching")
+    claude_extraction_mode: str = Field(default="tools", description="Payload extraction: 'tools' (structured tool calls) or 'json_block' (parse ```json in replies)")
     
     # Redis Configuration - Can be set via REDIS_URL or individual components
     redis_url: Optional[str] = Field(default=None, description="Redis connection URL")
@@ -39,6 +42,39 @@ class Settings(BaseSettings):
     # Shared InfoEx Configuration
     operation_uuid: str = Field(..., description="Aurora Backcountry operation UUID")
     
+    # InfoEx HTTP client (one pooled client per worker)
+    infoex_max_connections: int = Field(default=20, description="Max open connections to InfoEx")
+    infoex_max_keepalive_connections: int = Field(default=10, description="Idle connections kept warm for reuse")
+    infoex_keepalive_expiry_seconds: float = Field(default=30.0, description="Close idle connections after this many seconds")
+    infoex_http2: bool = Field(default=False, description="Use HTTP/2 to InfoEx (needs the h2 package)")
+    infoex_connect_timeout_seconds: float = Field(default=5.0, description="Timeout for opening a connection")
+    infoex_pool_timeout_seconds: float = Field(default=10.0, description="Max wait for a free pooled connection")
+    infoex_submit_timeout_seconds: float = Field(default=30.0, description="Timeout for observation submissions")
+    infoex_lookup_timeout_seconds: float = Field(default=10.0, description="Timeout for connection tests and location lookups")
+    infoex_submit_concurrency: int = Field(default=4, description="Max concurrent submissions of one batch (1 submits one at a time)")
+    infoex_retry_max_attempts: int = Field(default=3, description="Attempts per InfoEx call, counting the first (1 disables retries)")
+    infoex_retry_base_delay_seconds: float = Field(default=0.5, description="Backoff before the first retry; doubles per attempt, with jitter")
+    infoex_retry_max_delay_seconds: float = Field(default=5.0, description="Longest wait between attempts, including Retry-After")
+    infoex_breaker_failure_threshold: int = Field(default=5, description="Consecutive failures that open an endpoint's circuit breaker (0 disables)")
+    infoex_breaker_reset_seconds: float = Field(default=30.0, description="How long an open breaker fails fast before a trial call")
+    
+    # Background submission queue
+    submission_mode: str = Field(default="inline", description="InfoEx submissions: 'inline' (inside the request) or 'queued' (background workers)")
+    submission_workers: int = Field(default=2, description="Queue workers per process (queued mode)")
+    submission_max_deliveries: int = Field(default=5, description="Times a job is picked up before it is marked failed")
+    submission_claim_idle_seconds: int = Field(default=120, description="A job not finished this long after delivery is taken over by another worker")
+    submission_job_ttl_seconds: int = Field(default=86400, description="How long job statuses are kept")
+    submission_ledger_ttl_seconds: int = Field(default=172800, description="How long identical content is answered from the submission ledger (0 disables)")
+    submission_ledger_pending_seconds: int = Field(default=120, description="How long a submission in flight holds back identical ones")
+    submission_ledger_wait_seconds: float = Field(default=3.0, description="How long an identical submission waits for one in flight before answering in_progress")
+    
+    @validator("submission_mode")
+    def validate_submission_mode(cls, v):
+        """Ensure submission mode is supported"""
+        if v not in ["inline", "queued"]:
+            raise ValueError("SUBMISSION_MODE must be either 'inline' or 'queued'")
+        return v
+    
     # InfoEx Submission State
     infoex_submission_state: str = Field(default="IN_REVIEW", description="Submission state: IN_REVIEW or SUBMITTED")
     
@@ -49,6 +85,13 @@ class Settings(BaseSettings):
             raise ValueError("INFOEX_SUBMISSION_STATE must be either 'IN_REVIEW' or 'SUBMITTED'")
         return v
     
+    @validator("claude_extraction_mode")
+    def validate_extraction_mode(cls, v):
+        """Ensure extraction mode is supported"""
+        if v not in ["tools", "json_block"]:
+            raise ValueError("CLAUDE_EXTRACTION_MODE must be either 'tools' or 'json_block'")
+        return v
+    
     # Active InfoEx Configuration (set based on environment)
     infoex_api_key: Optional[str] = Field(default=None, description="Active InfoEx API key")
     infoex_operation_uuid: Optional[str] = Field(default=None, description="Active operation UUID")
@@ -60,7 +103,11 @@ class Settings(BaseSettings):
     port: Optional[int] = Field(default=None, description="Port from Render")
     log_level: str = Field(default="INFO", description="Logging level")
     session_ttl_seconds: int = Field(default=3600, description="Session TTL in seconds")
+    session_sliding_ttl: bool = Field(default=True, description="Renew session TTL on every read, so sessions expire after inactivity")
+    session_index_cleanup_interval_seconds: int = Field(default=600, description="Seconds between sweeps of expired sessions from the session index (0 disables)")
     max_conversation_length: int = Field(default=50, description="Max messages in conversation")
+    claude_context_token_budget: int = Field(default=20000, description="Input token budget for system prompt, knowledge and history")
+    history_summary_max_tokens: int = Field(default=1000, description="Max tokens kept in a session's rolling history summary")
     
     # CORS Configuration
     cors_allowed_origins: List[str] = Field(
@@ -69,11 +116,81 @@ class Settings(BaseSettings):
     )
     
     # Rate Limiting
-    rate_limit_requests: int = Field(default=100, description="Rate limit requests")
+    rate_limit_requests: int = Field(default=100, description="Max Claude calls per rate limit period per worker (0 disables)")
     rate_limit_period: int = Field(default=60, description="Rate limit period in seconds")
     
+    # Claude concurrency governor
+    claude_max_concurrency: int = Field(default=8, description="Max in-flight Claude calls per worker")
+    claude_tokens_per_minute: int = Field(default=0, description="Claude input+output token budget per minute per worker (0 disables)")
+    claude_queue_timeout_seconds: float = Field(default=30.0, description="Max wait for a Claude slot before returning 429")
+    claude_max_queue_depth: int = Field(default=100, description="Max queued Claude calls before new ones get 429 immediately")
+    
+    # Idempotent replay of retried requests
+    idempotency_window_seconds: int = Field(default=120, description="How long process-report responses are kept for replay to retries (0 disables)")
+    idempotency_wait_seconds: float = Field(default=30.0, description="Max wait for an identical in-flight request before returning 409")
+    
+    # Session storage backend
+    session_backend: str = Field(default="redis", description="Session storage: 'redis' (shared) or 'memory' (single process)")
+    session_memory_max_sessions: int = Field(default=1000, description="Max sessions held by the memory backend before evicting the least recently used")
+    
     # Redis Session Configuration
     redis_session_prefix: Optional[str] = Field(default="claude", description="Redis key prefix for sessions (default: 'claude')")
+    session_serializer: str = Field(default="orjson", description="Session serializer: 'orjson' (fastest), 'pydantic' or 'json'")
+    
+    session_error_policy: str = Field(default="discard", description="Session changes when a request fails: 'discard' or 'flush'")
+    
+    session_conflict_policy: str = Field(default="merge", description="Concurrent session update: 'merge', 'retry' or 'reject' (409)")
+    session_conflict_retries: int = Field(default=3, description="Merge or retry attempts after a concurrent session update")
+    
+    session_compression: str = Field(default="auto", description="Session value compression: 'auto' (zstd if installed, else zlib), 'zstd', 'zlib' or 'none'")
+    session_compression_threshold: int = Field(default=1024, description="Compress stored session values of at least this many bytes")
+    session_compression_level: int = Field(default=3, description="Compression level")
+    session_cache_max_entries: int = Field(default=256, description="Sessions kept deserialized per worker (0 disables the cache)")
+    session_cache_max_bytes: int = Field(default=32 * 1024 * 1024, description="Approximate memory bound for cached sessions per worker")
+    session_cache_ttl_seconds: float = Field(default=300.0, description="Max age of a cached session before it is re-read")
+    
+    # Session archival to Postgres
+    archive_database_url: Optional[str] = Field(default=None, description="Postgres DSN for archiving sessions to report_capsules (unset disables archival)")
+    archive_transcripts: bool = Field(default=True, description="Store gzipped session transcripts in the archived capsules' metadata")
+    archive_interval_seconds: int = Field(default=60, description="Seconds between archival passes")
+    archive_batch_size: int = Field(default=50, description="Max sessions archived per batch")
+    archive_before_expiry_seconds: int = Field(default=300, description="Archive idle sessions this long before their TTL runs out")
+    archive_completed_ttl_seconds: int = Field(default=300, description="Remaining Redis TTL of a fully submitted session once archived")
+    
+    @validator("session_backend")
+    def validate_session_backend(cls, v):
+        """Ensure session backend is supported"""
+        if v not in ["redis", "memory"]:
+            raise ValueError("SESSION_BACKEND must be either 'redis' or 'memory'")
+        return v
+    
+    @validator("session_compression")
+    def validate_session_compression(cls, v):
+        """Ensure session compression is supported"""
+        if v not in ["auto", "zstd", "zlib", "none"]:
+            raise ValueError("SESSION_COMPRESSION must be 'auto', 'zstd', 'zlib' or 'none'")
+        return v
+    
+    @validator("session_conflict_policy")
+    def validate_session_conflict_policy(cls, v):
+        """Ensure session conflict policy is supported"""
+        if v not in ["merge", "retry", "reject"]:
+            raise ValueError("SESSION_CONFLICT_POLICY must be 'merge', 'retry' or 'reject'")
+        return v
+    
+    @validator("session_error_policy")
+    def validate_session_error_policy(cls, v):
+        """Ensure session error policy is supported"""
+        if v not in ["discard", "flush"]:
+            raise ValueError("SESSION_ERROR_POLICY must be either 'discard' or 'flush'")
+        return v
+    
+    @validator("session_serializer")
+    def validate_session_serializer(cls, v):
+        """Ensure session serializer is supported"""
+        if v not in ["pydantic", "orjson", "json"]:
+            raise ValueError("SESSION_SERIALIZER must be 'pydantic', 'orjson' or 'json'")
+        return v
     
     @validator("cors_allowed_origins", pre=True)
     def parse_cors_origins(cls, v):
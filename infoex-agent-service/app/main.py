@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import asyncio
 import structlog
 import logging
 import sys
@@ -12,8 +13,11 @@ import os
 from typing import Dict, Any
 
 from app.config import settings
-from app.api.routes import router
+from app.api.routes import router, claude_agent
 from app.services.session import session_manager
+from app.services.archive import session_archiver
+from app.services.infoex import infoex_client
+from app.services.submission import submission_queue
 from app import __version__
 
 # Configure structured logging
@@ -45,6 +49,23 @@ logging.basicConfig(
 logger = structlog.get_logger()
 
 
+async def _sweep_session_index(interval: int):
+    """Periodically drop expired sessions from the session index"""
+    while True:
+        await asyncio.sleep(interval)
+        await session_manager.cleanup_expired_sessions()
+
+
+async def _run_archiver(interval: int):
+    """Periodically archive completed and expiring sessions to Postgres"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await session_archiver.run_pass()
+        except Exception as e:
+            logger.error("session_archive_pass_failed", error=str(e))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
@@ -53,25 +74,64 @@ async def lifespan(app: FastAPI):
                version=__version__,
                environment=settings.infoex_environment)
     
-    # Connect to Redis
+    # Connect session storage (Redis unless SESSION_BACKEND=memory)
     try:
         await session_manager.connect()
-        logger.info("redis_connection_established")
+        logger.info("session_backend_connected", backend=session_manager.backend.name)
     except Exception as e:
-        logger.error("redis_connection_failed", error=str(e))
+        logger.error("session_backend_connection_failed",
+                    backend=session_manager.backend.name,
+                    error=str(e))
         raise
     
     # Log configuration
     logger.info("service_configuration",
                infoex_env=settings.infoex_environment,
+               session_backend=settings.session_backend,
+               submission_mode=settings.submission_mode,
                redis_host=settings.redis_host,
                session_ttl=settings.session_ttl_seconds,
                max_conversation=settings.max_conversation_length)
     
+    # One pooled HTTP client for all InfoEx calls
+    await infoex_client.open()
+    
+    # Connect the archive database (optional)
+    try:
+        await session_archiver.connect()
+    except Exception as e:
+        logger.error("archive_database_connection_failed", error=str(e))
+    
+    background_tasks = []
+    if settings.session_index_cleanup_interval_seconds > 0:
+        background_tasks.append(asyncio.create_task(
+            _sweep_session_index(settings.session_index_cleanup_interval_seconds)
+        ))
+    if session_archiver.enabled and settings.archive_interval_seconds > 0:
+        background_tasks.append(asyncio.create_task(
+            _run_archiver(settings.archive_interval_seconds)
+        ))
+    
+    # Background submission workers (SUBMISSION_MODE=queued)
+    await submission_queue.start()
+    
     yield
     
     # Shutdown
     logger.info("shutting_down_infoex_agent_service")
+    # Jobs held by stopped workers stay pending for other workers
+    await submission_queue.stop()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    # Archive what was queued before the pool closes
+    try:
+        await session_archiver.run_pass()
+    except Exception as e:
+        logger.error("session_archive_pass_failed", error=str(e))
+    await session_archiver.disconnect()
+    await claude_agent.close()
+    await infoex_client.close()
     await session_manager.disconnect()
     logger.info("service_shutdown_complete")
 
@@ -103,7 +163,7 @@ async def validation_error_handler(request: Request, exc: RequestValidationError
                   errors=exc.errors())
     
     # Build helpful error response based on the endpoint
-    if request.url.path == "/api/process-report":
+    if request.url.path in ("/api/process-report", "/api/process-report/stream"):
         example_body = {
             "session_id": "your-unique-session-id",
             "message": "Your observation or report text here",
@@ -241,11 +301,15 @@ async def root():
         "environment": settings.infoex_environment,
         "endpoints": {
             "process_report": "/api/process-report",
+            "process_report_stream": "/api/process-report/stream",
             "submit": "/api/submit-to-infoex",
             "session_status": "/api/session/{session_id}/status",
             "clear_session": "/api/session/{session_id}/clear",
+            "sessions": "/api/sessions",
+            "jobs": "/api/jobs/{job_id}",
             "health": "/health",
             "locations": "/api/locations",
+            "metrics": "/api/metrics",
             "docs": "/docs"
         }
     }
@@ -265,17 +329,18 @@ async def not_found_handler(request: Request, exc):
     )
 
 
-# Rate limit handler (if implementing rate limiting)
+# Rate limit handler (Claude capacity exhausted)
 @app.exception_handler(429)
 async def rate_limit_handler(request: Request, exc):
-    """Handle rate limit errors"""
+    """Handle rate limit errors, keeping the Retry-After header"""
     return JSONResponse(
         status_code=429,
         content={
             "error": "Rate limit exceeded",
-            "detail": "Too many requests. Please try again later.",
+            "detail": getattr(exc, "detail", None) or "Too many requests. Please try again later.",
             "code": "RATE_LIMIT_EXCEEDED"
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 
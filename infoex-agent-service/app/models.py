@@ -1,7 +1,7 @@
 """Pydantic models for request/response validation"""
 
 from typing import Dict, List, Optional, Any, Literal
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, PrivateAttr, validator
 from datetime import datetime
 import re
 
@@ -49,6 +49,10 @@ class ProcessReportRequest(BaseModel):
         default=None,
         description="Optional context from n8n conversation (can be JSON string, plain text summary, etc.)"
     )
+    idempotency_key: Optional[str] = Field(
+        default=None,
+        description="Optional key identifying this request across retries (e.g. the n8n execution ID); without one, requests are not deduplicated"
+    )
 
 
 class ProcessReportResponse(BaseModel):
@@ -78,6 +82,25 @@ class SubmissionResponse(BaseModel):
         default_factory=list,
         description="Individual submission results"
     )
+    job_id: Optional[str] = Field(
+        default=None,
+        description="Background job to poll at /api/jobs/{job_id} (queued submission mode)"
+    )
+
+
+class SubmissionJob(BaseModel):
+    """A queued InfoEx submission and its outcome"""
+    job_id: str
+    session_id: str
+    payload_keys: List[str] = Field(..., description="Session payloads to submit")
+    submission_state: Optional[str] = None
+    status: Literal["queued", "running", "completed", "failed"] = "queued"
+    attempts: int = Field(default=0, description="Times a worker picked the job up")
+    success: Optional[bool] = Field(default=None, description="Whether every payload was submitted (once finished)")
+    message: Optional[str] = None
+    submissions: List[Dict[str, Any]] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class SessionStatus(BaseModel):
@@ -94,6 +117,27 @@ class SessionStatus(BaseModel):
     )
     last_updated: datetime
     conversation_length: int = Field(0, description="Number of messages in conversation")
+
+
+class SessionSummary(BaseModel):
+    """One entry of the active-session listing"""
+    session_id: str
+    zone_name: str
+    operation_id: str
+    last_updated: datetime
+    conversation_length: int = Field(0, description="Number of messages in conversation")
+    payload_statuses: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Payload status by observation type"
+    )
+
+
+class SessionListResponse(BaseModel):
+    """Page of active sessions, most recently updated first"""
+    sessions: List[SessionSummary] = Field(default_factory=list)
+    total: int = Field(..., description="Indexed sessions matching the filter")
+    offset: int
+    limit: int
     
     
 class PayloadStatus(BaseModel):
@@ -103,6 +147,8 @@ class PayloadStatus(BaseModel):
     missing_fields: List[str] = Field(default_factory=list)
     validation_errors: List[str] = Field(default_factory=list)
     data: Dict[str, Any] = Field(default_factory=dict)
+    infoex_uuid: Optional[str] = Field(default=None, description="UUID returned by InfoEx on submission")
+    infoex_response: Optional[Dict[str, Any]] = Field(default=None, description="Last InfoEx submission result")
 
 
 class ConversationMessage(BaseModel):
@@ -119,8 +165,18 @@ class Session(BaseModel):
     last_updated: datetime
     request_values: RequestValues
     conversation_history: List[ConversationMessage] = Field(default_factory=list)
+    history_summary: str = Field(default="", description="Rolling summary of history folded out of the context window")
+    summarized_message_count: int = Field(default=0, description="Number of leading history messages covered by history_summary")
     payloads: Dict[str, PayloadStatus] = Field(default_factory=dict)
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    
+    # What is already in storage, so saves write only what changed
+    _stored_session_id: Optional[str] = PrivateAttr(default=None)
+    _stored_version: int = PrivateAttr(default=0)
+    _stored_meta: Optional[bytes] = PrivateAttr(default=None)
+    _stored_history_length: int = PrivateAttr(default=0)
+    _stored_payloads: Dict[str, bytes] = PrivateAttr(default_factory=dict)
+    _stored_as_blob: bool = PrivateAttr(default=False)
 
 
 class ErrorResponse(BaseModel):
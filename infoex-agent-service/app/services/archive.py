@@ -0,0 +1,384 @@
+"""Archival of sessions from Redis into Postgres report_capsules
+
+Redis holds hot session state only. A session is archived when every one
+of its payloads has been submitted, or when it has been idle long enough
+to be close to expiry. Each payload becomes one report_capsules row; the
+conversation transcript is stored gzipped in the metadata of the session's
+first row, so nothing is kept on a worker's local disk. A session without
+payloads gets a single "transcript" row holding only its conversation.
+
+Sessions are queued in the session backend and archived in batches by a
+background pass on every worker; each queued session goes to one worker.
+Idle sessions are queued once, when their last update crosses the expiry
+cutoff; a session updated afterwards crosses it again later. Rows have
+deterministic capsule UUIDs, so archiving a session again updates its rows
+instead of duplicating them.
+"""
+
+import asyncio
+import base64
+import gzip
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+import structlog
+
+from app.config import settings
+from app.models import Session
+from app.services.session import SessionManager, session_manager
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = structlog.get_logger()
+
+# Namespace for capsule and daily report UUIDs derived from session data
+CAPSULE_NAMESPACE = uuid.UUID("6f1c3a52-9d8e-4b7a-a1f0-3c5e2d4b8a91")
+
+# Session payload status -> report_capsules.submission_status
+SUBMISSION_STATUS = {
+    "incomplete": "pending",
+    "ready": "validated",
+    "submitted": "submitted",
+    "error": "error",
+}
+
+# Agent-created capsules have no n8n user
+ARCHIVE_USER = "infoex-agent-service"
+
+# report_type of the row archiving the conversation of a session without payloads
+TRANSCRIPT_REPORT_TYPE = "transcript"
+
+UPSERT_CAPSULE_SQL = """
+INSERT INTO report_capsules (
+    capsule_uuid, parent_report_uuid, report_type, sequence_number, report_date,
+    submitted_at, user_id, user_name, operation_uuid, location_uuids, zone_name,
+    is_complete, missing_required_fields, payload, submission_status,
+    infoex_response, infoex_uuid, validation_errors, retry_count, last_error, metadata
+)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21)
+ON CONFLICT (capsule_uuid) DO UPDATE SET
+    submitted_at = EXCLUDED.submitted_at,
+    is_complete = EXCLUDED.is_complete,
+    missing_required_fields = EXCLUDED.missing_required_fields,
+    payload = EXCLUDED.payload,
+    submission_status = EXCLUDED.submission_status,
+    infoex_response = EXCLUDED.infoex_response,
+    infoex_uuid = EXCLUDED.infoex_uuid,
+    validation_errors = EXCLUDED.validation_errors,
+    retry_count = EXCLUDED.retry_count,
+    last_error = EXCLUDED.last_error,
+    metadata = EXCLUDED.metadata
+"""
+
+
+class SessionArchiver:
+    """Batches sessions out of Redis into report_capsules rows"""
+
+    def __init__(self, manager: SessionManager):
+        """Initialize archiver (disabled until connect succeeds)"""
+        self.manager = manager
+        self.pool = None
+        self.store_transcripts = settings.archive_transcripts
+        self.batch_size = settings.archive_batch_size
+        self.before_expiry = settings.archive_before_expiry_seconds
+        self.completed_ttl = settings.archive_completed_ttl_seconds
+
+        # Metrics
+        self.sessions_archived = 0
+        self.capsules_written = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a database is connected"""
+        return self.pool is not None
+
+    async def connect(self):
+        """Open the Postgres pool when archival is configured"""
+        if not settings.archive_database_url:
+            return
+        if asyncpg is None:
+            logger.warning("asyncpg_unavailable", archival="disabled")
+            return
+        self.pool = await asyncpg.create_pool(settings.archive_database_url, min_size=1, max_size=4)
+        logger.info("archive_database_connected")
+
+    async def disconnect(self):
+        """Close the Postgres pool"""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    def _get_queue_key(self) -> str:
+        """Sorted set of session IDs waiting to be archived"""
+        prefix = settings.redis_session_prefix
+        return f"{prefix}:archive:queue" if prefix else "archive:queue"
+
+    def _get_cutoff_key(self) -> str:
+        """Index score up to which idle sessions have already been queued"""
+        prefix = settings.redis_session_prefix
+        return f"{prefix}:archive:cutoff" if prefix else "archive:cutoff"
+
+    def _get_archived_key(self, session_id: str) -> str:
+        """Session version last archived; expires along with the session"""
+        prefix = settings.redis_session_prefix
+        return f"{prefix}:{session_id}:archived" if prefix else f"{session_id}:archived"
+
+    def is_complete(self, session: Session) -> bool:
+        """Every payload of the session has been submitted"""
+        return bool(session.payloads) and all(
+            payload.status == "submitted" for payload in session.payloads.values()
+        )
+
+    async def enqueue(self, session_ids: List[str]) -> None:
+        """Queue sessions for the next archival pass"""
+        if not self.enabled or not session_ids:
+            return
+        await self.manager.backend.queue_add(self._get_queue_key(), session_ids)
+
+    async def enqueue_if_complete(self, session: Optional[Session]) -> None:
+        """Queue a session once all of its payloads are submitted"""
+        if session is not None and self.is_complete(session):
+            await self.enqueue([session.session_id])
+
+    async def enqueue_expiring(self) -> int:
+        """Queue idle sessions that will expire before the next passes
+
+        Only sessions whose last update crossed the cutoff since the previous
+        pass (of any worker) are queued, not every old index entry.
+        """
+        if not self.enabled:
+            return 0
+        backend = self.manager.backend
+        cutoff = self.manager._index_score(datetime.utcnow()) - self.manager.ttl + self.before_expiry
+        previous = await backend.kv_get(self._get_cutoff_key())
+        session_ids = await backend.index_before(cutoff, float(previous) if previous is not None else None)
+        await self.enqueue(session_ids)
+        await backend.kv_set(self._get_cutoff_key(), repr(cutoff).encode("utf-8"), self.manager.ttl)
+        return len(session_ids)
+
+    def _capsule_rows(self, session: Session, transcript: Optional[str]) -> List[Tuple[Any, ...]]:
+        """report_capsules rows for each payload of a session
+
+        The transcript goes into the first row's metadata; the other rows
+        point at that row. Without payloads, a transcript row is the only row.
+        """
+        values = session.request_values
+        month, day, year = map(int, values.date.split("/"))
+        report_date = datetime(year, month, day).date()
+        parent_uuid = uuid.uuid5(CAPSULE_NAMESPACE, f"{values.operation_id}::{values.date}::{values.zone_name}")
+        user_id = session.metadata.get("user_id", ARCHIVE_USER)
+        user_name = session.metadata.get("user_name", ARCHIVE_USER)
+
+        rows = []
+        sequences: Dict[str, int] = {}
+        transcript_capsule = None
+        for key, payload in session.payloads.items():
+            capsule_uuid = uuid.uuid5(CAPSULE_NAMESPACE, f"{session.session_id}::{key}")
+            sequences[payload.observation_type] = sequences.get(payload.observation_type, 0) + 1
+            response = payload.infoex_response or {}
+            submitted_at = None
+            if response.get("submitted_at"):
+                submitted_at = datetime.fromisoformat(response["submitted_at"]).replace(tzinfo=timezone.utc)
+            # Retries of the last InfoEx call, and its error if it failed
+            retry_count = max(response.get("attempts", 1) - 1, 0)
+            last_error = None
+            if payload.status != "submitted" and response.get("error"):
+                last_error = str(response["error"])
+            metadata = {
+                "session_id": session.session_id,
+                "payload_key": key,
+                "conversation_length": len(session.conversation_history),
+            }
+            if transcript is not None:
+                if transcript_capsule is None:
+                    transcript_capsule = capsule_uuid
+                    metadata["transcript_gzip_base64"] = transcript
+                else:
+                    metadata["transcript_capsule_uuid"] = str(transcript_capsule)
+            rows.append((
+                capsule_uuid,
+                parent_uuid,
+                payload.observation_type,
+                sequences[payload.observation_type],
+                report_date,
+                submitted_at,
+                user_id,
+                user_name,
+                values.operation_id,
+                values.location_uuids,
+                values.zone_name,
+                payload.status in ("ready", "submitted"),
+                payload.missing_fields,
+                orjson.dumps(payload.data).decode("utf-8"),
+                SUBMISSION_STATUS[payload.status],
+                orjson.dumps(payload.infoex_response).decode("utf-8") if payload.infoex_response else None,
+                payload.infoex_uuid,
+                orjson.dumps(payload.validation_errors).decode("utf-8") if payload.validation_errors else None,
+                retry_count,
+                last_error,
+                orjson.dumps(metadata).decode("utf-8"),
+            ))
+
+        if not rows and transcript is not None:
+            # Nothing was recorded, but the conversation is still worth keeping
+            metadata = {
+                "session_id": session.session_id,
+                "conversation_length": len(session.conversation_history),
+                "transcript_gzip_base64": transcript,
+            }
+            rows.append((
+                uuid.uuid5(CAPSULE_NAMESPACE, f"{session.session_id}::{TRANSCRIPT_REPORT_TYPE}"),
+                parent_uuid,
+                TRANSCRIPT_REPORT_TYPE,
+                1,
+                report_date,
+                None,
+                user_id,
+                user_name,
+                values.operation_id,
+                values.location_uuids,
+                values.zone_name,
+                False,
+                [],
+                "{}",
+                SUBMISSION_STATUS["incomplete"],
+                None,
+                None,
+                None,
+                0,
+                None,
+                orjson.dumps(metadata).decode("utf-8"),
+            ))
+        return rows
+
+    def _encode_transcript(self, session: Session) -> str:
+        """The conversation as base64-encoded gzipped JSON"""
+        document = orjson.dumps({
+            "session_id": session.session_id,
+            "created_at": session.created_at,
+            "last_updated": session.last_updated,
+            "request_values": session.request_values.model_dump(),
+            "history_summary": session.history_summary,
+            "conversation_history": [message.model_dump() for message in session.conversation_history],
+        })
+        return base64.b64encode(gzip.compress(document)).decode("ascii")
+
+    async def _write_capsules(self, rows_by_session: Dict[str, List[Tuple[Any, ...]]]) -> List[str]:
+        """Upsert capsule rows; returns the sessions that were written
+
+        The whole batch goes in one transaction. If that fails, each session
+        is written on its own so one bad session does not hold back the rest.
+        """
+        async with self.pool.acquire() as connection:
+            try:
+                async with connection.transaction():
+                    await connection.executemany(
+                        UPSERT_CAPSULE_SQL,
+                        [row for rows in rows_by_session.values() for row in rows]
+                    )
+                return list(rows_by_session)
+            except Exception as e:
+                logger.warning("session_archive_batch_failed", sessions=len(rows_by_session), error=str(e))
+
+            written = []
+            for session_id, rows in rows_by_session.items():
+                try:
+                    async with connection.transaction():
+                        await connection.executemany(UPSERT_CAPSULE_SQL, rows)
+                    written.append(session_id)
+                except Exception as e:
+                    self.failures += 1
+                    logger.error("session_archive_error", session_id=session_id, error=str(e))
+            return written
+
+    async def archive_batch(self) -> int:
+        """Archive up to one batch of queued sessions; returns how many left the queue
+
+        Sessions that fail are queued again, until they are archived or
+        expire; they are not counted, so run_pass leaves them for its next run.
+        """
+        if not self.enabled:
+            return 0
+
+        backend = self.manager.backend
+        session_ids = await backend.queue_pop(self._get_queue_key(), self.batch_size)
+        if not session_ids:
+            return 0
+
+        sessions = await self.manager.get_sessions(session_ids)
+        archived_versions = await backend.kv_get_many(
+            [self._get_archived_key(session_id) for session_id in session_ids]
+        )
+
+        # Skip sessions that expired, or have not changed since they were archived
+        batch = {
+            session_id: session for session_id, archived in zip(session_ids, archived_versions)
+            if (session := sessions[session_id]) is not None
+            and (archived is None or int(archived) != session._stored_version)
+        }
+        if not batch:
+            return len(session_ids)
+
+        rows_by_session = {}
+        for session_id, session in batch.items():
+            try:
+                transcript = None
+                if self.store_transcripts and session.conversation_history:
+                    transcript = await asyncio.to_thread(self._encode_transcript, session)
+                rows_by_session[session_id] = self._capsule_rows(session, transcript)
+            except Exception as e:
+                self.failures += 1
+                logger.error("session_archive_error", session_id=session_id, error=str(e))
+
+        written = await self._write_capsules(rows_by_session) if rows_by_session else []
+        failed = [session_id for session_id in batch if session_id not in written]
+        if failed:
+            await backend.queue_add(self._get_queue_key(), failed)
+
+        # Record what was archived; completed sessions leave hot storage soon after
+        completed_ttl = min(self.completed_ttl, self.manager.ttl)
+        for session_id in written:
+            session = batch[session_id]
+            version = str(session._stored_version).encode("utf-8")
+            if self.is_complete(session):
+                await backend.kv_set(self._get_archived_key(session_id), version, completed_ttl)
+                await backend.expire_session(session_id, completed_ttl)
+            else:
+                await backend.kv_set(self._get_archived_key(session_id), version, self.manager.ttl)
+
+        capsules = sum(len(rows_by_session[session_id]) for session_id in written)
+        self.sessions_archived += len(written)
+        self.capsules_written += capsules
+        logger.info("sessions_archived",
+                   sessions=len(written),
+                   capsules=capsules,
+                   completed=sum(1 for session_id in written if self.is_complete(batch[session_id])))
+        return len(session_ids) - len(failed)
+
+    async def run_pass(self) -> int:
+        """Queue expiring sessions and drain the queue; returns sessions archived"""
+        if not self.enabled:
+            return 0
+        await self.enqueue_expiring()
+        archived = self.sessions_archived
+        while await self.archive_batch() == self.batch_size:
+            pass
+        return self.sessions_archived - archived
+
+    def stats(self) -> Dict[str, Any]:
+        """Archival totals since start"""
+        return {
+            "enabled": self.enabled,
+            "sessions_archived": self.sessions_archived,
+            "capsules_written": self.capsules_written,
+            "failures": self.failures,
+        }
+
+
+# Create singleton instance
+session_archiver = SessionArchiver(session_manager)
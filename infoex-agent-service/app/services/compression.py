@@ -0,0 +1,86 @@
+"""Transparent compression of stored session values
+
+Values at or above a size threshold are compressed and prefixed with a
+format marker. JSON never starts with a NUL byte, so the marker tells
+compressed values apart from plain ones written before compression (or
+below the threshold), which are returned unchanged.
+"""
+
+import zlib
+from typing import Any, Dict
+import structlog
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = structlog.get_logger()
+
+ZLIB_MARKER = b"\x00z"
+ZSTD_MARKER = b"\x00s"
+
+
+class SessionCompressor:
+    """Compresses values on write and decompresses them on read"""
+
+    def __init__(self, algorithm: str = "auto", threshold: int = 1024, level: int = 3):
+        """Initialize codec ('auto' prefers zstd when installed, then zlib)"""
+        if algorithm == "auto":
+            algorithm = "zstd" if zstandard is not None else "zlib"
+        elif algorithm == "zstd" and zstandard is None:
+            logger.warning("zstandard_unavailable", fallback="zlib")
+            algorithm = "zlib"
+
+        self.algorithm = algorithm
+        self.threshold = threshold
+        self.level = level
+        self._zstd_compressor = None
+        self._zstd_decompressor = None
+        if zstandard is not None:
+            # Decompression must work whatever this worker writes with
+            self._zstd_decompressor = zstandard.ZstdDecompressor()
+            if algorithm == "zstd":
+                self._zstd_compressor = zstandard.ZstdCompressor(level=level)
+
+        # Metrics
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a value if it is large enough and compression pays off"""
+        self.bytes_in += len(data)
+        if self.algorithm == "none" or len(data) < self.threshold:
+            self.bytes_out += len(data)
+            return data
+
+        if self.algorithm == "zstd":
+            packed = ZSTD_MARKER + self._zstd_compressor.compress(data)
+        else:
+            packed = ZLIB_MARKER + zlib.compress(data, self.level)
+
+        if len(packed) >= len(data):
+            self.bytes_out += len(data)
+            return data
+        self.bytes_out += len(packed)
+        return packed
+
+    def decompress(self, data: bytes) -> bytes:
+        """Restore a stored value, compressed or not"""
+        if data[:2] == ZLIB_MARKER:
+            return zlib.decompress(data[2:])
+        if data[:2] == ZSTD_MARKER:
+            if self._zstd_decompressor is None:
+                raise RuntimeError("Session value is zstd-compressed but zstandard is not installed")
+            return self._zstd_decompressor.decompress(data[2:])
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals written since start"""
+        return {
+            "algorithm": self.algorithm,
+            "threshold": self.threshold,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else 1.0,
+        }
@@ -0,0 +1,120 @@
+"""Idempotent replay of retried requests"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Optional
+import structlog
+
+from app.config import settings
+from app.services.session import session_manager
+
+logger = structlog.get_logger()
+
+PENDING = "pending"
+COMPLETE = "complete"
+
+
+class IdempotencyInProgress(Exception):
+    """Raised when an identical request is still being processed"""
+
+
+class IdempotencyStore:
+    """Remembers responses so retries within a window are replayed
+
+    The first request for a key claims it with a pending marker. A retry that
+    arrives while the first is still running waits for its result; one that
+    arrives after it finished gets the stored response back. Nothing is
+    re-run, so Claude is not called again and the session is not rewritten.
+    """
+
+    def __init__(self):
+        """Initialize with window settings"""
+        self.window = settings.idempotency_window_seconds
+        self.wait_timeout = settings.idempotency_wait_seconds
+        self.poll_interval = 0.25
+
+    def request_key(self, session_id: str, explicit_key: Optional[str] = None) -> Optional[str]:
+        """Derive the idempotency key for a request, or None to skip deduplication
+
+        Only a key sent by the caller (e.g. the n8n execution ID) marks a
+        retry. Message text cannot: a guide may well answer "yes" or "none"
+        twice in a row, and each of those is a new turn.
+        """
+        if not explicit_key:
+            return None
+        return hashlib.sha256(f"{session_id}\n{explicit_key}".encode("utf-8")).hexdigest()
+
+    def _get_key(self, key: str) -> str:
+        """Generate storage key for an idempotency record"""
+        if settings.redis_session_prefix:
+            return f"{settings.redis_session_prefix}:idempotency:{key}"
+        return f"idempotency:{key}"
+
+    async def begin(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Claim a key, or return the stored response of an earlier attempt
+
+        Returns None when the caller should process the request. Raises
+        IdempotencyInProgress if an earlier attempt is still running after
+        waiting for it.
+        """
+        if not self.window or key is None:
+            return None
+
+        store_key = self._get_key(key)
+        claimed = await session_manager.backend.kv_set(
+            store_key,
+            json.dumps({"status": PENDING}).encode("utf-8"),
+            self.window,
+            only_if_absent=True
+        )
+        if claimed:
+            return None
+
+        # Someone else has this key; wait for their result
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            record = await session_manager.backend.kv_get(store_key)
+            if record is None:
+                # The earlier attempt failed and released the key; try to claim it
+                claimed = await session_manager.backend.kv_set(
+                    store_key,
+                    json.dumps({"status": PENDING}).encode("utf-8"),
+                    self.window,
+                    only_if_absent=True
+                )
+                if claimed:
+                    return None
+                continue
+
+            data = json.loads(record)
+            if data.get("status") == COMPLETE:
+                logger.info("idempotent_replay", key=key)
+                return data.get("response")
+
+            if asyncio.get_running_loop().time() >= deadline:
+                raise IdempotencyInProgress(key)
+            await asyncio.sleep(self.poll_interval)
+
+    async def complete(self, key: Optional[str], response: Dict[str, Any]) -> None:
+        """Store the response for replay to retries within the window"""
+        if not self.window or key is None:
+            return
+        await session_manager.backend.kv_set(
+            self._get_key(key),
+            json.dumps({"status": COMPLETE, "response": response}).encode("utf-8"),
+            self.window
+        )
+
+    async def release(self, key: Optional[str]) -> None:
+        """Drop the claim after a failure so a retry can run the request"""
+        if not self.window or key is None:
+            return
+        try:
+            await session_manager.backend.kv_delete(self._get_key(key))
+        except Exception as e:
+            logger.error("idempotency_release_error", key=key, error=str(e))
+
+
+# Create singleton instance
+idempotency_store = IdempotencyStore()
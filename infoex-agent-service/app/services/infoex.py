@@ -1,12 +1,21 @@
 """InfoEx API client service"""
 
+import asyncio
+import time
 import httpx
 from typing import Dict, Any, List, Optional, Tuple
 import structlog
 from datetime import datetime
 
+try:
+    import h2
+except ImportError:
+    h2 = None
+
 from app.config import settings
 from app.services.payload import payload_builder
+from app.services.ledger import SubmissionInProgress, submission_ledger
+from app.services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
 
 logger = structlog.get_logger()
 
@@ -24,7 +33,179 @@ class InfoExClient:
             "operation": self.operation_uuid,
             "Content-Type": "application/json"
         }
+        self.client: Optional[httpx.AsyncClient] = None
+        self.http2 = settings.infoex_http2
+        
+        # Per-operation timeouts; connection setup and pool waits are shared
+        self.submit_timeout = httpx.Timeout(
+            settings.infoex_submit_timeout_seconds,
+            connect=settings.infoex_connect_timeout_seconds,
+            pool=settings.infoex_pool_timeout_seconds
+        )
+        self.lookup_timeout = httpx.Timeout(
+            settings.infoex_lookup_timeout_seconds,
+            connect=settings.infoex_connect_timeout_seconds,
+            pool=settings.infoex_pool_timeout_seconds
+        )
+        
+        # Retries of safe failures, and a circuit breaker per endpoint
+        self.retry_policy = RetryPolicy(
+            settings.infoex_retry_max_attempts,
+            settings.infoex_retry_base_delay_seconds,
+            settings.infoex_retry_max_delay_seconds
+        )
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        
+        # Metrics
+        self.calls = 0
+        self.retries = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.transport_errors = 0
+    
+    def _build_client(self) -> httpx.AsyncClient:
+        """Create the pooled client shared by every call"""
+        if self.http2 and h2 is None:
+            logger.warning("http2_unavailable", fallback="http/1.1")
+            self.http2 = False
+        
+        return httpx.AsyncClient(
+            headers=self.headers,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=settings.infoex_max_connections,
+                max_keepalive_connections=settings.infoex_max_keepalive_connections,
+                keepalive_expiry=settings.infoex_keepalive_expiry_seconds
+            ),
+            timeout=self.submit_timeout
+        )
+    
+    async def open(self):
+        """Open the pooled HTTP client (called once at startup)"""
+        if self.client is None:
+            self.client = self._build_client()
+            logger.info("infoex_client_opened",
+                       http2=self.http2,
+                       max_connections=settings.infoex_max_connections,
+                       max_keepalive=settings.infoex_max_keepalive_connections)
+    
+    async def close(self):
+        """Close the pooled HTTP client and its connections"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+    
+    async def _request(self, method: str, url: str, timeout: httpx.Timeout, **kwargs) -> httpx.Response:
+        """Send a request over the pooled client
         
+        Opens the client on first use when the app lifespan has not (scripts,
+        tests), so warm connections are reused either way.
+        """
+        if self.client is None:
+            self.client = self._build_client()
+        
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.client.request(method, url, timeout=timeout, **kwargs)
+        except httpx.TransportError:
+            self.transport_errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+    
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        """Circuit breaker of an endpoint, created on first use"""
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                settings.infoex_breaker_failure_threshold,
+                settings.infoex_breaker_reset_seconds
+            )
+        return breaker
+    
+    async def _call(
+        self,
+        method: str,
+        endpoint: str,
+        timeout: httpx.Timeout,
+        idempotent: bool = False,
+        **kwargs
+    ) -> Tuple[httpx.Response, int]:
+        """Call an endpoint through its breaker, retrying safe failures
+        
+        Returns the last response and the number of attempts. Raises
+        CircuitOpenError when the breaker is open, and the last transport
+        error when retries are exhausted or the error is not safe to retry.
+        Only 5xx responses and transport errors count against the breaker.
+        """
+        breaker = self._breaker(endpoint)
+        url = f"{self.base_url}{endpoint}"
+        self.calls += 1
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            breaker.before_call()
+            try:
+                response = await self._request(method, url, timeout, **kwargs)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if not self.retry_policy.should_retry_error(e, idempotent):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                if delay is None:
+                    raise
+                reason = type(e).__name__
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if not self.retry_policy.should_retry_status(response.status_code, idempotent):
+                    return response, attempt
+                delay = self.retry_policy.delay(attempt, RetryPolicy.retry_after(response))
+                if delay is None:
+                    return response, attempt
+                reason = response.status_code
+            
+            self.retries += 1
+            logger.warning("infoex_retry",
+                          endpoint=endpoint,
+                          attempt=attempt,
+                          reason=reason,
+                          delay_seconds=round(delay, 2))
+            await asyncio.sleep(delay)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Request counters, breaker states and connection pool usage"""
+        stats = {
+            "open": self.client is not None,
+            "http2": self.http2,
+            "calls": self.calls,
+            "requests": self.requests,
+            "retries": self.retries,
+            "fast_failures": sum(breaker.rejected for breaker in self.breakers.values()),
+            "breakers": {endpoint: breaker.stats() for endpoint, breaker in self.breakers.items()},
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "transport_errors": self.transport_errors,
+            "max_connections": settings.infoex_max_connections,
+        }
+        # httpx does not expose its pool; read the connections off httpcore when present
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for connection in connections if connection.is_idle())
+        return stats
+    
     async def submit_observation(
         self,
         observation_type: str,
@@ -50,157 +231,207 @@ class InfoExClient:
             logger.error("unknown_observation_type", type=observation_type)
             return False, {"error": error_msg}
         
-        url = f"{self.base_url}{endpoint}"
-        
         # Strip Aurora metadata
         clean_payload = payload_builder.strip_aurora_metadata(payload)
         
         # Ensure state is SUBMITTED for actual submission
         clean_payload["state"] = "SUBMITTED"
         
+        # Identical content already submitted (or in flight) is not posted again
+        ledger_key = submission_ledger.content_key(observation_type, clean_payload)
+        try:
+            recorded = await submission_ledger.begin(ledger_key)
+        except SubmissionInProgress:
+            logger.warning("submission_in_progress", observation_type=observation_type)
+            return False, {
+                "error": "An identical submission is still in progress",
+                "status": "in_progress",
+                "observation_type": observation_type
+            }
+        if recorded is not None:
+            logger.info("submission_deduplicated",
+                       observation_type=observation_type,
+                       uuid=recorded.get("uuid"))
+            return True, {**recorded, "deduplicated": True}
+        
+        success, result = await self._post_observation(observation_type, endpoint, clean_payload)
+        if success:
+            try:
+                await submission_ledger.complete(ledger_key, result)
+            except Exception as e:
+                # The observation is in InfoEx; only deduplication of repeats is lost
+                logger.error("submission_ledger_error",
+                            observation_type=observation_type,
+                            error=str(e))
+        else:
+            await submission_ledger.release(ledger_key)
+        return success, result
+    
+    async def _post_observation(
+        self,
+        observation_type: str,
+        endpoint: str,
+        clean_payload: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """POST a cleaned observation to its endpoint"""
         logger.info("submitting_to_infoex",
                    observation_type=observation_type,
                    endpoint=endpoint,
                    fields=list(clean_payload.keys()),
                    payload=clean_payload)
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url,
-                    headers=self.headers,
-                    json=clean_payload,
-                    timeout=30.0
-                )
+        try:
+            response, attempts = await self._call(
+                "POST",
+                endpoint,
+                self.submit_timeout,
+                json=clean_payload
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
                 
-                if response.status_code == 200:
-                    result = response.json()
+                # Check if response contains a UUID (successful submission)
+                if result.get("uuid"):
+                    logger.info("submission_successful",
+                              observation_type=observation_type,
+                              uuid=result.get("uuid"))
                     
-                    # Check if response contains a UUID (successful submission)
-                    if result.get("uuid"):
-                        logger.info("submission_successful",
-                                  observation_type=observation_type,
-                                  uuid=result.get("uuid"))
-                        
-                        return True, {
-                            "status": "success",
-                            "uuid": result.get("uuid"),
-                            "observation_type": observation_type,
-                            "submitted_at": datetime.utcnow().isoformat(),
-                            "status_code": response.status_code,
-                            "response": result
-                        }
-                    else:
-                        # 200 response but no UUID - likely an error
-                        logger.error("submission_failed_no_uuid",
-                                   observation_type=observation_type,
-                                   response=result)
-                        
-                        return False, {
-                            "status": "error",
-                            "error": "Submission returned no UUID",
-                            "response": result,
-                            "observation_type": observation_type
-                        }
-                
-                else:
-                    error_data = {
-                        "status": "error",
+                    return True, {
+                        "status": "success",
+                        "uuid": result.get("uuid"),
+                        "observation_type": observation_type,
+                        "submitted_at": datetime.utcnow().isoformat(),
                         "status_code": response.status_code,
-                        "observation_type": observation_type
+                        "attempts": attempts,
+                        "response": result
                     }
-                    
-                    try:
-                        error_response = response.json()
-                        error_data["error"] = error_response
-                        
-                        # Extract validation errors if present
-                        if "errors" in error_response:
-                            validation_errors = []
-                            for error in error_response["errors"]:
-                                field = error.get("field", "Unknown")
-                                detail = error.get("errorDetails", error.get("error", "Unknown error"))
-                                validation_errors.append(f"{field}: {detail}")
-                            error_data["validation_errors"] = validation_errors
-                    except:
-                        error_data["error"] = response.text
-                    
-                    logger.error("submission_failed",
+                else:
+                    # 200 response but no UUID - likely an error
+                    logger.error("submission_failed_no_uuid",
                                observation_type=observation_type,
-                               status_code=response.status_code,
-                               error=error_data)
+                               response=result)
                     
-                    return False, error_data
+                    return False, {
+                        "status": "error",
+                        "error": "Submission returned no UUID",
+                        "response": result,
+                        "observation_type": observation_type,
+                        "attempts": attempts
+                    }
+            
+            else:
+                error_data = {
+                    "status": "error",
+                    "status_code": response.status_code,
+                    "observation_type": observation_type,
+                    "attempts": attempts
+                }
+                
+                try:
+                    error_response = response.json()
+                    error_data["error"] = error_response
                     
-            except httpx.TimeoutException:
-                error_msg = "Request timeout"
-                logger.error("submission_timeout", observation_type=observation_type)
-                return False, {"error": error_msg, "status": "timeout"}
+                    # Extract validation errors if present
+                    if "errors" in error_response:
+                        validation_errors = []
+                        for error in error_response["errors"]:
+                            field = error.get("field", "Unknown")
+                            detail = error.get("errorDetails", error.get("error", "Unknown error"))
+                            validation_errors.append(f"{field}: {detail}")
+                        error_data["validation_errors"] = validation_errors
+                except:
+                    error_data["error"] = response.text
                 
-            except Exception as e:
-                error_msg = str(e)
-                logger.error("submission_exception",
+                logger.error("submission_failed",
                            observation_type=observation_type,
-                           error=error_msg)
-                return False, {"error": error_msg, "status": "exception"}
+                           status_code=response.status_code,
+                           error=error_data)
+                
+                return False, error_data
+                
+        except CircuitOpenError as e:
+            logger.warning("submission_circuit_open",
+                          observation_type=observation_type,
+                          endpoint=endpoint,
+                          retry_after=round(e.retry_after, 1))
+            return False, {"error": str(e), "status": "circuit_open", "retry_after": round(e.retry_after, 1)}
+            
+        except httpx.TimeoutException:
+            error_msg = "Request timeout"
+            logger.error("submission_timeout", observation_type=observation_type)
+            return False, {"error": error_msg, "status": "timeout"}
+            
+        except Exception as e:
+            error_msg = str(e)
+            logger.error("submission_exception",
+                       observation_type=observation_type,
+                       error=error_msg)
+            return False, {"error": error_msg, "status": "exception"}
     
     async def submit_multiple(
         self,
-        observations: List[Tuple[str, Dict[str, Any]]]
+        observations: List[Tuple[str, Dict[str, Any]]],
+        concurrency: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Submit multiple observations"""
+        """Submit multiple observations concurrently
+        
+        At most `concurrency` submissions (INFOEX_SUBMIT_CONCURRENCY by
+        default) are in flight at once. Submissions keep the input order and
+        carry their own timing; a failing submission does not stop the rest.
+        """
+        limit = max(concurrency or settings.infoex_submit_concurrency, 1)
+        semaphore = asyncio.Semaphore(limit)
+        
+        async def submit(obs_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    success, result = await self.submit_observation(obs_type, payload)
+                except Exception as e:
+                    success, result = False, {"error": str(e), "status": "exception"}
+                return {
+                    "observation_type": obs_type,
+                    "success": success,
+                    "result": result,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+                }
+        
+        started = time.perf_counter()
+        submissions = await asyncio.gather(*(submit(obs_type, payload) for obs_type, payload in observations))
+        
+        successful = sum(1 for submission in submissions if submission["success"])
         results = {
-            "success": True,
-            "total": len(observations),
-            "successful": 0,
-            "failed": 0,
-            "submissions": []
+            "success": successful == len(submissions),
+            "total": len(submissions),
+            "successful": successful,
+            "failed": len(submissions) - successful,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "submissions": list(submissions)
         }
         
-        for obs_type, payload in observations:
-            success, result = await self.submit_observation(obs_type, payload)
-            
-            submission_result = {
-                "observation_type": obs_type,
-                "success": success,
-                "result": result
-            }
-            
-            if success:
-                results["successful"] += 1
-            else:
-                results["failed"] += 1
-                results["success"] = False
-            
-            results["submissions"].append(submission_result)
-        
         logger.info("batch_submission_complete",
                    total=results["total"],
                    successful=results["successful"],
-                   failed=results["failed"])
+                   failed=results["failed"],
+                   concurrency=limit,
+                   elapsed_ms=results["elapsed_ms"])
         
         return results
     
     async def test_connection(self) -> bool:
         """Test connection to InfoEx API"""
         try:
-            url = f"{self.base_url}/observation/constants/"
+            response, _ = await self._call("GET", "/observation/constants/", self.lookup_timeout, idempotent=True)
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url,
-                    headers=self.headers,
-                    timeout=10.0
-                )
+            if response.status_code == 200:
+                logger.info("infoex_connection_test_successful")
+                return True
+            else:
+                logger.error("infoex_connection_test_failed",
+                           status_code=response.status_code)
+                return False
                 
-                if response.status_code == 200:
-                    logger.info("infoex_connection_test_successful")
-                    return True
-                else:
-                    logger.error("infoex_connection_test_failed",
-                               status_code=response.status_code)
-                    return False
-                    
         except Exception as e:
             logger.error("infoex_connection_test_exception", error=str(e))
             return False
@@ -208,29 +439,28 @@ class InfoExClient:
     async def get_locations(self) -> List[Dict[str, Any]]:
         """Get available locations for the operation"""
         try:
-            url = f"{self.base_url}/location"
             params = {
                 "operationUUID": self.operation_uuid,
                 "type": "OPERATING_ZONE"
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url,
-                    headers=self.headers,
-                    params=params,
-                    timeout=10.0
-                )
+            response, _ = await self._call(
+                "GET",
+                "/location",
+                self.lookup_timeout,
+                idempotent=True,
+                params=params
+            )
+            
+            if response.status_code == 200:
+                locations = response.json()
+                logger.info("locations_retrieved", count=len(locations))
+                return locations
+            else:
+                logger.error("locations_retrieval_failed",
+                           status_code=response.status_code)
+                return []
                 
-                if response.status_code == 200:
-                    locations = response.json()
-                    logger.info("locations_retrieved", count=len(locations))
-                    return locations
-                else:
-                    logger.error("locations_retrieval_failed",
-                               status_code=response.status_code)
-                    return []
-                    
         except Exception as e:
             logger.error("locations_retrieval_exception", error=str(e))
             return []
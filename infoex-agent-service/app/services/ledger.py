@@ -0,0 +1,151 @@
+"""Ledger of InfoEx submissions, keyed by content
+
+InfoEx creates a new record for every POST, so submitting the same payload
+twice (a retried /api/submit-to-infoex, auto-submit racing a manual submit,
+a redelivered queue job) leaves duplicates to clean up by hand. The ledger
+records each successful submission under a hash of what was sent and
+returns the recorded result for identical content instead of posting again.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional
+import orjson
+import structlog
+
+from app.config import settings
+from app.services.session import session_manager
+
+logger = structlog.get_logger()
+
+PENDING = "pending"
+COMPLETE = "complete"
+
+
+class SubmissionInProgress(Exception):
+    """Raised when identical content is still being submitted elsewhere"""
+
+
+class SubmissionLedger:
+    """Content-addressed record of successful InfoEx submissions
+
+    A submission claims its content key with a pending marker. An identical
+    submission arriving meanwhile waits briefly for the first one and is
+    otherwise told it is still in progress. Once the first has succeeded,
+    every identical submission gets its result back without a network
+    call. Failed submissions release the key so they can be retried.
+    """
+
+    def __init__(self):
+        """Initialize with ledger settings"""
+        self.ttl = settings.submission_ledger_ttl_seconds
+        self.pending_ttl = settings.submission_ledger_pending_seconds
+        self.wait_timeout = settings.submission_ledger_wait_seconds
+        self.poll_interval = 0.25
+
+        # Metrics
+        self.recorded = 0
+        self.duplicates = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether entries are kept (scripts without a connected session store skip the ledger)"""
+        return bool(self.ttl) and session_manager.backend.connected
+
+    def content_key(self, observation_type: str, payload: Dict[str, Any]) -> str:
+        """Hash of the observation type, date and cleaned payload
+
+        Keys are sorted, so the same content always hashes the same however
+        the payload dict was built.
+        """
+        canonical = orjson.dumps(
+            {
+                "observation_type": observation_type,
+                "obDate": payload.get("obDate"),
+                "payload": payload,
+            },
+            option=orjson.OPT_SORT_KEYS
+        )
+        return hashlib.sha256(canonical).hexdigest()
+
+    def _get_key(self, key: str) -> str:
+        """Generate storage key for a ledger entry"""
+        if settings.redis_session_prefix:
+            return f"{settings.redis_session_prefix}:ledger:{key}"
+        return f"ledger:{key}"
+
+    async def _claim(self, store_key: str) -> bool:
+        """Set the pending marker if the key is free"""
+        return await session_manager.backend.kv_set(
+            store_key,
+            orjson.dumps({"status": PENDING}),
+            self.pending_ttl,
+            only_if_absent=True
+        )
+
+    async def begin(self, key: str) -> Optional[Dict[str, Any]]:
+        """Claim content for submission, or return the result of an identical one
+
+        Returns None when the caller should submit. Raises
+        SubmissionInProgress if an identical submission is still pending
+        after waiting wait_timeout seconds for it, so a request is never
+        held for the whole pending TTL.
+        """
+        if not self.enabled:
+            return None
+
+        store_key = self._get_key(key)
+        if await self._claim(store_key):
+            return None
+
+        # An identical submission is recorded or in flight; wait briefly for its result
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            record = await session_manager.backend.kv_get(store_key)
+            if record is None:
+                # The other submission failed and released the key
+                if await self._claim(store_key):
+                    return None
+                continue
+
+            data = orjson.loads(record)
+            if data.get("status") == COMPLETE:
+                self.duplicates += 1
+                logger.info("submission_ledger_hit", key=key, uuid=data["result"].get("uuid"))
+                return data["result"]
+
+            if asyncio.get_running_loop().time() >= deadline:
+                raise SubmissionInProgress(key)
+            await asyncio.sleep(self.poll_interval)
+
+    async def complete(self, key: str, result: Dict[str, Any]) -> None:
+        """Record a successful submission's result"""
+        if not self.enabled:
+            return
+        await session_manager.backend.kv_set(
+            self._get_key(key),
+            orjson.dumps({"status": COMPLETE, "result": result}),
+            self.ttl
+        )
+        self.recorded += 1
+
+    async def release(self, key: str) -> None:
+        """Drop the claim after a failed submission so it can be retried"""
+        if not self.enabled:
+            return
+        try:
+            await session_manager.backend.kv_delete(self._get_key(key))
+        except Exception as e:
+            logger.error("submission_ledger_release_error", key=key, error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        """Ledger totals since start"""
+        return {
+            "enabled": self.enabled,
+            "recorded": self.recorded,
+            "duplicates": self.duplicates,
+        }
+
+
+# Create singleton instance
+submission_ledger = SubmissionLedger()
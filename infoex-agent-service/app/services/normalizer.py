@@ -0,0 +1,342 @@
+"""Payload normalization engine
+
+Turns the field names and values Claude (or any other source, such as a
+Postgres backfill) produces into exact InfoEx field names and enum values.
+All lookup tables are compiled once from the InfoEx constants and the
+AURORA_IDEAL templates, so normalizing a payload is a handful of dict
+lookups regardless of how many observation types exist.
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import structlog
+
+from app.agent.constants import InfoExConstants, infoex_constants
+from app.agent.tools import load_template_files
+
+logger = structlog.get_logger()
+
+
+# Field name corrections that apply to every observation type
+COMMON_FIELD_ALIASES = {
+    # Common date field mappings
+    "observationDateTime": "obDate",
+    "observationDate": "obDate",
+    "date": "obDate",
+
+    # Common field name variations
+    "operation_id": "operationUUID",
+    "location_uuids": "locationUUIDs",
+    "operationId": "operationUUID",
+}
+
+# Field name corrections per observation type
+TYPE_FIELD_ALIASES = {
+    "avalanche_summary": {
+        "avalanches_observed": "avalanchesObserved",
+        "percent_area_observed": "percentAreaObserved",
+        "percentArea": "percentAreaObserved",
+    },
+    "avalanche_observation": {
+        "observation_time": "obTime",
+        "number": "num",
+        "avalanche_type": "character",
+        "type": "character",
+        "min_size": "sizeMin",
+        "max_size": "sizeMax",
+        "depth_average": "depthAvg",
+        "depth_min": "depthMin",
+        "depth_max": "depthMax",
+    },
+    "field_summary": {
+        "start_time": "obStartTime",
+        "end_time": "obEndTime",
+        "temperature_high": "tempHigh",
+        "temperature_low": "tempLow",
+        "wind_speed": "windSpeed",
+        "wind_direction": "windDirection",
+        "sky_condition": "sky",
+        "precipitation": "precip",
+        "new_snow_24h": "hn24",
+        "snow_height": "hs",
+    },
+    "hazard_assessment": {
+        "assessment_time": "obTime",
+        "type": "assessmentType",
+        "problems": "avalancheProblems",
+        "ratings": "hazardRatings",
+    },
+    "terrain_observation": {
+        "ates": "atesRating",
+        "terrain": "terrainFeature",
+        "mindset": "strategicMindset",
+        "percent_observed": "percentAreaObserved",
+    },
+}
+
+# Enum fields per observation type and the constant type holding their values
+TYPE_ENUM_FIELDS = {
+    "avalanche_summary": {"avalanchesObserved": "avalanchesObserved"},
+    "avalanche_observation": {"trigger": "trigger", "character": "character"},
+    "field_summary": {
+        "windSpeed": "windSpeed", "amWindSpeed": "windSpeed", "pmWindSpeed": "windSpeed",
+        "sky": "sky", "amSky": "sky", "pmSky": "sky",
+    },
+    "terrain_observation": {"atesRating": "atesRating", "strategicMindset": "strategicMindset"},
+}
+
+# Plain-language aliases for enum values, by constant type (keys lowercase)
+VALUE_ALIASES = {
+    "avalanchesObserved": {
+        "yes": "New avalanches", "true": "New avalanches", "1": "New avalanches",
+        "no": "No new avalanches", "false": "No new avalanches", "0": "No new avalanches",
+        "sluffing": "Sluffing/Pinwheeling only", "pinwheeling": "Sluffing/Pinwheeling only",
+    },
+    "trigger": {
+        "natural": "Na", "skier": "Sa", "skier triggered": "Sa",
+        "snowmobile": "Ma", "explosive": "Xa", "cornice": "Nc",
+        "unknown": "U", "vehicle": "Va",
+    },
+    "character": {
+        "l": "LOOSE_DRY_AVALANCHE", "wl": "LOOSE_WET_AVALANCHE",
+        "ss": "STORM_SLAB", "ws": "WIND_SLAB", "ps": "PERSISTENT_SLAB",
+        "dps": "DEEP_PERSISTENT_SLAB", "ws2": "WET_SLAB",
+        "g": "GLIDE", "c": "CORNICE", "u": "UNKNOWN",
+        "storm slab": "STORM_SLAB", "wind slab": "WIND_SLAB",
+        "wet slab": "WET_SLAB", "persistent slab": "PERSISTENT_SLAB",
+        "deep persistent": "DEEP_PERSISTENT_SLAB", "cornice": "CORNICE",
+        "glide": "GLIDE", "loose dry": "LOOSE_DRY_AVALANCHE",
+        "loose wet": "LOOSE_WET_AVALANCHE",
+    },
+    "windSpeed": {
+        "calm": "C", "light": "L", "moderate": "M",
+        "strong": "S", "extreme": "X", "variable": "V",
+    },
+    "sky": {
+        "clear": "CLR", "few": "FEW", "scattered": "SCT",
+        "broken": "BKN", "overcast": "OVC", "obscured": "X",
+    },
+}
+
+# Precipitation descriptions, checked in order against the lowercased value
+PRECIP_RULES = [
+    (re.compile(r"\b(no|nil|none)\b"), "NIL"),
+    (re.compile(r"\blight snow\b"), "S1"),
+    (re.compile(r"\bmoderate snow\b"), "S2"),
+    (re.compile(r"\bheavy snow\b"), "S3"),
+    (re.compile(r"\brain\b"), "R"),
+]
+PRECIP_FIELDS = {"field_summary": ["precip", "amPrecip", "pmPrecip"]}
+
+# Fields shared by most observation types; they say nothing about which type
+# an untagged payload belongs to
+GENERIC_FIELDS = {"obDate", "obTime", "locationUUIDs", "operationUUID", "state",
+                  "comments", "shareLevel", "usersPresent"}
+
+# Fields that must be numeric for every type (templates add their own)
+NUMERIC_FIELDS = ["tempHigh", "tempLow", "elevationMin", "elevationMax",
+                  "hs", "hn24", "hst", "percentAreaObserved", "sizeMin", "sizeMax",
+                  "depthMin", "depthMax", "depthAvg", "width", "length"]
+
+
+class PayloadNormalizer:
+    """Compiled field and value normalization for InfoEx payloads"""
+
+    def __init__(
+        self,
+        constants: InfoExConstants,
+        template_files: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        """Compile lookup tables from constants and templates"""
+        self.constants = constants
+        if template_files is None:
+            template_files = load_template_files()
+
+        # Field aliases: everything the old flat mapping knew, with the
+        # type-specific entries winning where names collide (e.g. "type")
+        shared = dict(COMMON_FIELD_ALIASES)
+        for aliases in TYPE_FIELD_ALIASES.values():
+            for alias, field in aliases.items():
+                if alias != "type":
+                    shared[alias] = field
+        self._shared_field_aliases = shared
+        self._field_aliases = {
+            obs_type: {**shared, **aliases}
+            for obs_type, aliases in TYPE_FIELD_ALIASES.items()
+        }
+
+        # Enum lookups keyed by lowercase value
+        self._value_tables: Dict[str, Dict[str, str]] = {}
+        for enum_fields in TYPE_ENUM_FIELDS.values():
+            for constant_type in enum_fields.values():
+                if constant_type not in self._value_tables:
+                    self._value_tables[constant_type] = self._compile_value_table(constant_type)
+
+        # Numeric fields: the shared list plus numeric template fields
+        self._numeric_fields: Dict[str, Tuple[str, ...]] = {}
+        for obs_type, template_file in template_files.items():
+            template = template_file.get("AURORA_IDEAL_PAYLOAD") or {}
+            numeric = list(NUMERIC_FIELDS)
+            for field, example in template.items():
+                if isinstance(example, (int, float)) and not isinstance(example, bool) and field not in numeric:
+                    numeric.append(field)
+            self._numeric_fields[obs_type] = tuple(numeric)
+        self._default_numeric_fields = tuple(NUMERIC_FIELDS)
+
+        # Field signatures used to route untagged payloads to a type
+        self._signatures: Dict[str, frozenset] = {}
+        for obs_type, template_file in template_files.items():
+            fields = {k for k in (template_file.get("AURORA_IDEAL_PAYLOAD") or {}) if not k.startswith("_")}
+            fields.update(TYPE_FIELD_ALIASES.get(obs_type, {}).values())
+            fields.update(TYPE_ENUM_FIELDS.get(obs_type, {}))
+            if fields:
+                self._signatures[obs_type] = frozenset(fields - GENERIC_FIELDS)
+        
+        # Per-type converter pipelines
+        self._converters: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        for obs_type in set(TYPE_ENUM_FIELDS) | set(template_files) | set(TYPE_FIELD_ALIASES):
+            self._converters[obs_type] = self._compile_converters(obs_type)
+        self._default_converters = self._compile_converters(None)
+
+        logger.info("payload_normalizer_compiled",
+                   observation_types=sorted(self._converters),
+                   enum_tables=sorted(self._value_tables))
+
+    def _compile_value_table(self, constant_type: str) -> Dict[str, str]:
+        """Build a lowercase lookup from valid values, labels and aliases"""
+        table: Dict[str, str] = {}
+        for value in self.constants.get_valid_values(constant_type):
+            value = str(value)
+            table[value.lower()] = value
+            table[value.lower().replace("_", " ")] = value
+
+        # Human labels, e.g. "Dry Loose" for LOOSE_DRY_AVALANCHE
+        raw = self.constants.constants.get(constant_type)
+        if isinstance(raw, list):
+            for entry in raw:
+                if isinstance(entry, dict) and "value" in entry and "label" in entry:
+                    table.setdefault(str(entry["label"]).lower(), str(entry["value"]))
+
+        table.update(VALUE_ALIASES.get(constant_type, {}))
+        return table
+
+    def _compile_converters(self, obs_type: Optional[str]) -> List[Callable[[Dict[str, Any]], None]]:
+        """Build the ordered list of in-place converters for an observation type"""
+        converters: List[Callable[[Dict[str, Any]], None]] = []
+
+        enum_fields = [
+            (field, self._value_tables[constant_type])
+            for field, constant_type in TYPE_ENUM_FIELDS.get(obs_type, {}).items()
+        ]
+        if enum_fields:
+            def convert_enums(data: Dict[str, Any]) -> None:
+                for field, table in enum_fields:
+                    value = data.get(field)
+                    if value is None:
+                        continue
+                    mapped = table.get(str(value).strip().lower())
+                    if mapped is not None:
+                        data[field] = mapped
+            converters.append(convert_enums)
+
+        precip_fields = PRECIP_FIELDS.get(obs_type, [])
+        if precip_fields:
+            precip_table = self._value_tables.get("precipitation") or self._compile_value_table("precipitation")
+
+            def convert_precip(data: Dict[str, Any]) -> None:
+                for field in precip_fields:
+                    if field not in data:
+                        continue
+                    text = str(data[field]).strip()
+                    exact = precip_table.get(text.lower())
+                    if exact is not None:
+                        data[field] = exact
+                        continue
+                    for pattern, code in PRECIP_RULES:
+                        if pattern.search(text.lower()):
+                            data[field] = code
+                            break
+            converters.append(convert_precip)
+
+        if obs_type == "avalanche_observation":
+            def convert_avalanche_fields(data: Dict[str, Any]) -> None:
+                # Ensure size is string
+                if "size" in data:
+                    data["size"] = str(data["size"])
+                # Aspects are single values, not arrays
+                if "aspectFrom" in data and isinstance(data["aspectFrom"], list):
+                    data["aspectFrom"] = data["aspectFrom"][0] if data["aspectFrom"] else "N"
+                if "aspectTo" in data and isinstance(data["aspectTo"], list):
+                    data["aspectTo"] = data["aspectTo"][-1] if data["aspectTo"] else "N"
+            converters.append(convert_avalanche_fields)
+
+        numeric_fields = self._numeric_fields.get(obs_type, self._default_numeric_fields)
+
+        def convert_common(data: Dict[str, Any]) -> None:
+            # Ensure locationUUIDs is always an array
+            if "locationUUIDs" in data and not isinstance(data["locationUUIDs"], list):
+                data["locationUUIDs"] = [data["locationUUIDs"]]
+            # Ensure numeric values are proper type
+            for field in numeric_fields:
+                value = data.get(field)
+                if isinstance(value, str):
+                    try:
+                        data[field] = float(value)
+                    except ValueError:
+                        pass
+        converters.append(convert_common)
+
+        return converters
+
+    def normalize_keys(self, obs_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of data with field names mapped to InfoEx names"""
+        aliases = self._field_aliases.get(obs_type, self._shared_field_aliases)
+        return {aliases.get(key, key): value for key, value in data.items()}
+
+    def normalize_values(self, obs_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert values to InfoEx enums and types in place, returning data"""
+        for convert in self._converters.get(obs_type, self._default_converters):
+            convert(data)
+        return data
+
+    def normalize(self, obs_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize field names and values, returning a new dict"""
+        return self.normalize_values(obs_type, self.normalize_keys(obs_type, data))
+
+    def classify(
+        self,
+        data: Dict[str, Any],
+        preferred_types: Iterable[str] = ()
+    ) -> Optional[str]:
+        """Guess the observation type of an untagged payload from its fields
+        
+        Returns the type whose template shares the most type-specific fields
+        with data. Ties go to the first matching entry of preferred_types.
+        None means no type-specific field matched.
+        """
+        fields = {self._shared_field_aliases.get(key, key) for key in data}
+        scores = {
+            obs_type: len(fields & signature)
+            for obs_type, signature in self._signatures.items()
+        }
+        best = max(scores.values(), default=0)
+        if best == 0:
+            return None
+        
+        matches = [obs_type for obs_type, score in scores.items() if score == best]
+        for obs_type in preferred_types:
+            if obs_type in matches:
+                return obs_type
+        return matches[0]
+    
+    def normalize_batch(
+        self,
+        items: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Normalize many (observation_type, data) pairs in one pass"""
+        normalize = self.normalize
+        return [normalize(obs_type, data) for obs_type, data in items]
+
+
+# Create singleton instance
+payload_normalizer = PayloadNormalizer(infoex_constants)
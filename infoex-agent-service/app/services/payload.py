@@ -124,12 +124,17 @@ class PayloadBuilder:
         session: Session,
         submission_state: Optional[str] = None
     ) -> Tuple[Optional[Dict[str, Any]], List[str]]:
-        """Build payload for observation type from session data"""
+        """Build payload for observation type from session data
+        
+        observation_type is the session payload key: the type itself, or
+        "<type>#<n>" for additional observations of the same type.
+        """
         
         if observation_type not in session.payloads:
             return None, ["Observation type not initialized in session"]
         
         payload_status = session.payloads[observation_type]
+        observation_type = payload_status.observation_type
         errors = []
         
         # Start with template
@@ -0,0 +1,156 @@
+"""Retry with backoff and per-endpoint circuit breaking for InfoEx calls
+
+Observation submissions are POSTs that InfoEx does not deduplicate, so a
+submission is only retried when it certainly did not reach InfoEx: the
+connection could not be opened, no pooled connection was free, or InfoEx
+answered 429/503. Reads (connection tests, location lookups) are also
+retried on timeouts and other 5xx responses.
+
+Each endpoint has its own breaker. After repeated failures it opens and
+calls fail fast until a cool-down has passed; one trial call then decides
+whether it closes again.
+"""
+
+import random
+import time
+from typing import Any, Dict, Optional
+import httpx
+
+# Failures where the request was never sent, safe to retry for any method
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Responses where InfoEx declined the request without processing it
+DECLINED_STATUS = {429, 503}
+
+# Responses worth retrying when the request is idempotent
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose breaker is open"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"InfoEx unavailable: circuit open for {endpoint}")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """Which failures are retried, and how long to wait before the next attempt"""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        """Initialize policy (max_attempts 1 disables retries)"""
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry_error(self, error: Exception, idempotent: bool) -> bool:
+        """A transport error is retried if the request was not sent, or is safe to resend"""
+        if isinstance(error, UNSENT_ERRORS):
+            return True
+        return idempotent and isinstance(error, httpx.TransportError)
+
+    def should_retry_status(self, status_code: int, idempotent: bool) -> bool:
+        """A response is retried if InfoEx declined it, or it is a transient error of a read"""
+        if status_code in DECLINED_STATUS:
+            return True
+        return idempotent and status_code in TRANSIENT_STATUS
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait after a failed attempt, or None to give up
+
+        Exponential backoff with full jitter, so workers retrying at once do
+        not hit InfoEx in lockstep. A Retry-After from InfoEx is honoured,
+        but one longer than max_delay is not worth waiting for.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is None:
+            return backoff
+        if retry_after > self.max_delay:
+            return None
+        return max(retry_after, backoff)
+
+    @staticmethod
+    def retry_after(response: httpx.Response) -> Optional[float]:
+        """Retry-After header in seconds (HTTP dates are ignored)"""
+        try:
+            return max(float(response.headers["Retry-After"]), 0.0)
+        except (KeyError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one InfoEx endpoint
+
+    closed: calls pass; failure_threshold failures in a row open it.
+    open: calls fail fast with CircuitOpenError for reset_timeout seconds.
+    half_open: one trial call passes; success closes, failure opens again.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int, reset_timeout: float):
+        """Initialize breaker (failure_threshold 0 disables it)"""
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+        # Metrics
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """closed, open or half_open"""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        """Admit a call, or raise CircuitOpenError"""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        retry_after = self.reset_timeout
+        if state == "open":
+            retry_after -= time.monotonic() - self._opened_at
+        raise CircuitOpenError(self.endpoint, retry_after)
+
+    def record_success(self) -> None:
+        """The endpoint answered; close the breaker"""
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """The endpoint failed; open the breaker at the threshold or after a failed trial"""
+        self._failures += 1
+        was_trial = self._trial_in_flight
+        self._trial_in_flight = False
+        if self.failure_threshold and (was_trial or self._failures >= self.failure_threshold):
+            if self._opened_at is None:
+                self.times_opened += 1
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """The call ended without an outcome (cancelled); let another trial through"""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and counters"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
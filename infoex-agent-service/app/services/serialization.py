@@ -0,0 +1,107 @@
+"""Session serializer backends
+
+Sessions are stored as bytes. Each backend turns pydantic models into JSON
+bytes and back without hand-converting datetimes: pydantic parses ISO
+timestamps during validation and emits them when dumping.
+
+A stored session is split into meta, history and payload parts (see
+SessionManager). load_session splices the stored parts into a single JSON
+document so the whole session is validated in one pass.
+"""
+
+import json
+from typing import Dict, Iterable, Optional, Set, Type, TypeVar
+from pydantic import BaseModel
+import structlog
+
+from app.models import Session
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+logger = structlog.get_logger()
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class SessionSerializer:
+    """Pydantic-native backend: pydantic-core encodes and parses JSON directly"""
+
+    name = "pydantic"
+
+    def dumps(self, model: BaseModel, exclude: Optional[Set[str]] = None) -> bytes:
+        """Serialize a model to JSON bytes"""
+        return model.model_dump_json(exclude=exclude).encode("utf-8")
+
+    def loads(self, model_cls: Type[ModelT], data: bytes) -> ModelT:
+        """Validate a model straight from JSON bytes"""
+        return model_cls.model_validate_json(data)
+
+    def encode_key(self, key: str) -> bytes:
+        """Encode a string as a JSON string literal"""
+        return json.dumps(key).encode("utf-8")
+
+    def load_session(
+        self,
+        meta: bytes,
+        history: Iterable[bytes],
+        payloads: Dict[str, bytes]
+    ) -> Session:
+        """Build a Session from its stored meta, history and payload parts"""
+        document = b"".join((
+            meta.rstrip()[:-1],
+            b',"conversation_history":[', b",".join(history),
+            b'],"payloads":{',
+            b",".join(self.encode_key(key) + b":" + value for key, value in payloads.items()),
+            b"}}"
+        ))
+        return self.loads(Session, document)
+
+
+class OrjsonSessionSerializer(SessionSerializer):
+    """orjson encodes and decodes; pydantic validates the decoded objects"""
+
+    name = "orjson"
+
+    def dumps(self, model: BaseModel, exclude: Optional[Set[str]] = None) -> bytes:
+        """Serialize a model to JSON bytes"""
+        return orjson.dumps(model.model_dump(exclude=exclude))
+
+    def loads(self, model_cls: Type[ModelT], data: bytes) -> ModelT:
+        """Decode JSON bytes and validate the result"""
+        return model_cls.model_validate(orjson.loads(data))
+
+    def encode_key(self, key: str) -> bytes:
+        """Encode a string as a JSON string literal"""
+        return orjson.dumps(key)
+
+
+class JsonSessionSerializer(SessionSerializer):
+    """Standard library json, for environments without a faster option"""
+
+    name = "json"
+
+    def dumps(self, model: BaseModel, exclude: Optional[Set[str]] = None) -> bytes:
+        """Serialize a model to JSON bytes"""
+        return json.dumps(model.model_dump(mode="json", exclude=exclude)).encode("utf-8")
+
+    def loads(self, model_cls: Type[ModelT], data: bytes) -> ModelT:
+        """Decode JSON bytes and validate the result"""
+        return model_cls.model_validate(json.loads(data))
+
+
+SERIALIZERS: Dict[str, Type[SessionSerializer]] = {
+    "pydantic": SessionSerializer,
+    "orjson": OrjsonSessionSerializer,
+    "json": JsonSessionSerializer,
+}
+
+
+def get_serializer(name: str) -> SessionSerializer:
+    """Create the configured serializer, falling back to pydantic without orjson"""
+    if name == "orjson" and orjson is None:
+        logger.warning("orjson_unavailable", fallback="pydantic")
+        name = "pydantic"
+    return SERIALIZERS[name]()
@@ -1,64 +1,86 @@
-"""Redis session management service"""
+"""Session management service"""
 
 import json
-import redis.asyncio as redis
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime, timedelta, timezone
+from pydantic import ValidationError
 import structlog
 import uuid
 
 from app.config import settings
 from app.models import Session, RequestValues, ConversationMessage
+from app.services.serialization import get_serializer
+from app.services.compression import SessionCompressor
+from app.services.session_cache import SessionCache
+from app.services.session_backend import SessionBackend, SessionWrite, StoredSession, get_backend
 
 logger = structlog.get_logger()
 
+class SessionConflictError(Exception):
+    """Raised when a session changed in storage since it was loaded"""
+    
+    def __init__(self, session_id: str, stored_version: int):
+        super().__init__(f"Session {session_id} was modified concurrently (now version {stored_version})")
+        self.session_id = session_id
+        self.stored_version = stored_version
+
 
 class SessionManager:
-    """Manages conversation sessions in Redis"""
+    """Manages conversation sessions in the configured storage backend"""
     
-    def __init__(self):
-        """Initialize Redis connection"""
-        self.redis: Optional[redis.Redis] = None
+    def __init__(self, backend: Optional[SessionBackend] = None):
+        """Initialize with the configured backend (not yet connected)"""
+        self.backend = backend or get_backend(settings.session_backend)
         self.ttl = settings.session_ttl_seconds
+        self.sliding_ttl = settings.session_sliding_ttl
+        self.serializer = get_serializer(settings.session_serializer)
+        self.compressor = SessionCompressor(
+            algorithm=settings.session_compression,
+            threshold=settings.session_compression_threshold,
+            level=settings.session_compression_level
+        )
+        self.cache = SessionCache(
+            max_entries=settings.session_cache_max_entries,
+            max_bytes=settings.session_cache_max_bytes,
+            ttl=settings.session_cache_ttl_seconds
+        )
         
     async def connect(self):
-        """Connect to Redis"""
-        try:
-            self.redis = redis.from_url(
-                settings.effective_redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
-            await self.redis.ping()
-            logger.info("redis_connected", 
-                       host=settings.redis_host,
-                       port=settings.redis_port,
-                       db=settings.redis_db)
-        except Exception as e:
-            logger.error("redis_connection_failed", error=str(e))
-            raise
+        """Connect the storage backend"""
+        await self.backend.connect()
     
     async def disconnect(self):
-        """Disconnect from Redis"""
-        if self.redis:
-            await self.redis.close()
-            logger.info("redis_disconnected")
-    
-    def _get_session_key(self, session_id: str) -> str:
-        """Generate Redis key for session"""
-        if settings.redis_session_prefix:
-            return f"{settings.redis_session_prefix}:{session_id}"
-        else:
-            # No prefix - use session ID directly
-            return session_id
+        """Disconnect the storage backend"""
+        await self.backend.close()
     
-    async def create_session(self, request_values: RequestValues) -> Session:
-        """Create a new session"""
-        session_id = str(uuid.uuid4())
+    def _require_backend(self) -> None:
+        """Fail fast when used before connect"""
+        if not self.backend.connected:
+            raise RuntimeError("Session backend not connected")
+    
+    def _index_score(self, timestamp: datetime) -> float:
+        """Sorted set score for a naive UTC timestamp"""
+        return timestamp.replace(tzinfo=timezone.utc).timestamp()
+    
+    def _serialize_meta(self, session: Session) -> bytes:
+        """Serialize everything except history and payloads"""
+        return self.serializer.dumps(session, exclude={"conversation_history", "payloads"})
+    
+    def _mark_stored(self, session: Session, payloads: Dict[str, bytes], version: int) -> None:
+        """Record what storage now holds for the session"""
+        session._stored_session_id = session.session_id
+        session._stored_version = version
+        session._stored_meta = self._serialize_meta(session)
+        session._stored_history_length = len(session.conversation_history)
+        session._stored_payloads = payloads
+        session._stored_as_blob = False
+    
+    def new_session(self, request_values: RequestValues, session_id: Optional[str] = None) -> Session:
+        """Build a new session without storing it"""
         now = datetime.utcnow()
         
         session = Session(
-            session_id=session_id,
+            session_id=session_id or str(uuid.uuid4()),
             created_at=now,
             last_updated=now,
             request_values=request_values,
@@ -67,95 +89,331 @@ class SessionManager:
             metadata={}
         )
         
-        # Store in Redis
-        await self.save_session(session)
-        
         logger.info("session_created", 
-                   session_id=session_id,
+                   session_id=session.session_id,
                    zone=request_values.zone_name)
         
         return session
     
+    async def create_session(self, request_values: RequestValues, session_id: Optional[str] = None) -> Session:
+        """Create a new session"""
+        session = self.new_session(request_values, session_id)
+        
+        # Store it
+        await self.save_session(session)
+        
+        return session
+    
+    def has_changes(self, session: Session) -> bool:
+        """Whether the session differs from what storage holds"""
+        if session._stored_session_id != session.session_id:
+            return True
+        if len(session.conversation_history) != session._stored_history_length:
+            return True
+        if self._serialize_meta(session) != session._stored_meta:
+            return True
+        if session.payloads.keys() != session._stored_payloads.keys():
+            return True
+        return any(
+            self.serializer.dumps(payload) != session._stored_payloads[payload_key]
+            for payload_key, payload in session.payloads.items()
+        )
+    
+    def unit_of_work(self, session_id: str, retryable: bool = False) -> "SessionUnitOfWork":
+        """Start a request-scoped unit of work for a session
+        
+        Only callers that can safely re-run their whole request on a conflict
+        should pass retryable=True.
+        """
+        return SessionUnitOfWork(self, session_id, retryable)
+    
     async def get_session(self, session_id: str) -> Optional[Session]:
-        """Retrieve session from Redis"""
-        if not self.redis:
-            raise RuntimeError("Redis not connected")
+        """Retrieve a session"""
+        session, _ = await self.get_session_with_ttl(session_id)
+        return session
+    
+    async def get_session_with_ttl(self, session_id: str) -> Tuple[Optional[Session], int]:
+        """Retrieve a session and its remaining TTL in one round trip
         
-        key = self._get_session_key(session_id)
+        With sliding TTL enabled the read also renews the session's expiry,
+        so sessions expire after a period of inactivity rather than at a
+        fixed age. A session cached by this worker is reused when its version
+        still matches the stored one, which skips reading and parsing it.
+        """
+        self._require_backend()
         
+        cached = self.cache.check_out(session_id)
+        if cached is not None:
+            ttl = await self._revalidate(cached)
+            if ttl is not None:
+                self.cache.record_hit()
+                logger.info("session_retrieved", 
+                           session_id=session_id,
+                           messages=len(cached.conversation_history),
+                           cached=True)
+                return cached, ttl
+        
+        fetched = await self._fetch_sessions([session_id], renew=self.sliding_ttl)
+        return fetched[session_id]
+    
+    async def get_sessions(self, session_ids: List[str], renew: bool = False) -> Dict[str, Optional[Session]]:
+        """Retrieve several sessions in one pipelined round trip
+        
+        Bypasses the per-process cache; missing sessions map to None. The
+        TTLs are only renewed when asked, so listing sessions does not keep
+        them alive.
+        """
+        self._require_backend()
+        
+        fetched = await self._fetch_sessions(session_ids, renew=renew and self.sliding_ttl)
+        return {session_id: session for session_id, (session, _) in fetched.items()}
+    
+    async def _fetch_sessions(
+        self,
+        session_ids: List[str],
+        renew: bool
+    ) -> Dict[str, Tuple[Optional[Session], int]]:
+        """Read sessions and their TTLs in a single round trip"""
         try:
-            data = await self.redis.get(key)
-            if not data:
-                logger.warning("session_not_found", session_id=session_id)
-                return None
-            
-            # Parse JSON and reconstruct session
-            session_data = json.loads(data)
-            
-            # Convert datetime strings back to datetime objects
-            session_data['created_at'] = datetime.fromisoformat(session_data['created_at'])
-            session_data['last_updated'] = datetime.fromisoformat(session_data['last_updated'])
-            
-            # Convert conversation history
-            for msg in session_data.get('conversation_history', []):
-                if 'timestamp' in msg:
-                    msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
-            
-            # Reconstruct Session object
-            session = Session(**session_data)
+            stored = await self.backend.read_sessions(session_ids, self.ttl, renew)
+        except Exception as e:
+            logger.error("session_get_error",
+                        session_ids=session_ids,
+                        error=str(e))
+            return {session_id: (None, 0) for session_id in session_ids}
+        
+        return {session_id: self._parse_read(session_id, stored[session_id]) for session_id in session_ids}
+    
+    def _parse_read(self, session_id: str, stored: Optional[StoredSession]) -> Tuple[Optional[Session], int]:
+        """Build a session from its stored parts"""
+        if stored is None:
+            logger.warning("session_not_found", session_id=session_id)
+            return None, 0
+        
+        try:
+            decompress = self.compressor.decompress
+            if stored.blob is not None:
+                # Pre-layout format; the next save moves it to the incremental layout
+                session = self.serializer.loads(Session, decompress(stored.blob))
+                session._stored_as_blob = True
+            else:
+                payloads = {
+                    payload_key: decompress(payload)
+                    for payload_key, payload in stored.payloads.items()
+                }
+                session = self.serializer.load_session(
+                    decompress(stored.meta),
+                    [decompress(message) for message in stored.history],
+                    payloads
+                )
+                self._mark_stored(session, payloads, stored.version)
             
             logger.info("session_retrieved", 
                        session_id=session_id,
                        messages=len(session.conversation_history))
             
-            return session
+            return session, stored.ttl
             
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, ValidationError) as e:
             logger.error("session_decode_error", 
                         session_id=session_id,
                         error=str(e))
-            return None
+            return None, 0
         except Exception as e:
             logger.error("session_get_error",
                         session_id=session_id,
                         error=str(e))
+            return None, 0
+    
+    async def _revalidate(self, session: Session) -> Optional[int]:
+        """Check a cached session against storage; returns its TTL if still current"""
+        try:
+            version, ttl = await self.backend.read_version(session.session_id, self.ttl, self.sliding_ttl)
+        except Exception as e:
+            logger.error("session_version_check_error",
+                        session_id=session.session_id,
+                        error=str(e))
             return None
+        
+        if version != session._stored_version or self.has_changes(session):
+            self.cache.record_stale()
+            return None
+        return ttl
+    
+    def check_in(self, session: Session) -> None:
+        """Hand a session that matches storage back to the per-process cache"""
+        if not self.has_changes(session):
+            self.cache.check_in(session)
     
-    async def save_session(self, session: Session) -> bool:
-        """Save session to Redis"""
-        if not self.redis:
-            raise RuntimeError("Redis not connected")
+    async def save_session(self, session: Session, conflict_policy: Optional[str] = None) -> bool:
+        """Save a session, writing only what changed since it was loaded
         
-        key = self._get_session_key(session.session_id)
+        New history messages are appended, changed payloads are set in the
+        payloads hash and metadata is rewritten only when it changed, so the
+        cost of a save does not grow with the length of the conversation.
         
-        try:
-            # Convert to dict with ISO format datetimes
-            session_dict = session.model_dump()
-            
-            # Convert datetime objects to ISO format strings
-            session_dict['created_at'] = session.created_at.isoformat()
-            session_dict['last_updated'] = session.last_updated.isoformat()
-            
-            # Convert conversation timestamps
-            for msg in session_dict.get('conversation_history', []):
-                if 'timestamp' in msg and isinstance(msg['timestamp'], datetime):
-                    msg['timestamp'] = msg['timestamp'].isoformat()
-            
-            # Store with TTL
-            data = json.dumps(session_dict)
-            await self.redis.setex(key, self.ttl, data)
+        The write only applies if the stored version is still the one the
+        session was loaded at. Otherwise the conflict policy decides: "merge"
+        rebases this session's changes onto the stored one and tries again;
+        "retry" and "reject" raise SessionConflictError for the caller.
+        """
+        self._require_backend()
+        
+        policy = conflict_policy or settings.session_conflict_policy
+        attempts = settings.session_conflict_retries + 1
+        
+        for attempt in range(attempts):
+            try:
+                saved, stored_version = await self._write_session(session)
+            except Exception as e:
+                logger.error("session_save_error",
+                            session_id=session.session_id,
+                            error=str(e))
+                return False
             
-            logger.info("session_saved",
-                       session_id=session.session_id,
-                       ttl=self.ttl)
+            if saved:
+                return True
             
-            return True
+            logger.warning("session_conflict",
+                          session_id=session.session_id,
+                          loaded_version=session._stored_version,
+                          stored_version=stored_version,
+                          policy=policy,
+                          attempt=attempt + 1)
+            if policy != "merge" or attempt + 1 == attempts:
+                raise SessionConflictError(session.session_id, stored_version)
             
-        except Exception as e:
-            logger.error("session_save_error",
-                        session_id=session.session_id,
-                        error=str(e))
-            return False
+            await self._rebase_session(session)
+        
+        return False
+    
+    async def _write_session(self, session: Session) -> Tuple[bool, int]:
+        """Compare-and-set the session's changes; returns (saved, stored version)"""
+        payloads = {
+            payload_key: self.serializer.dumps(payload)
+            for payload_key, payload in session.payloads.items()
+        }
+        meta = self._serialize_meta(session)
+        history = session.conversation_history
+        # Nothing known about storage under this ID (new, renamed or legacy session): write it all
+        full_write = session._stored_session_id != session.session_id
+        expected_version = session._stored_version if not full_write else 0
+        
+        reset_history = full_write or len(history) < session._stored_history_length
+        new_messages = history if reset_history else history[session._stored_history_length:]
+        
+        if full_write:
+            changed = payloads
+            removed = []
+        else:
+            changed = {
+                payload_key: payload for payload_key, payload in payloads.items()
+                if session._stored_payloads.get(payload_key) != payload
+            }
+            removed = [key for key in session._stored_payloads if key not in payloads]
+        
+        # Compress at the storage boundary; snapshots keep the plain bytes
+        compress = self.compressor.compress
+        raw = [meta] if full_write or meta != session._stored_meta else []
+        raw_messages = [self.serializer.dumps(message) for message in new_messages]
+        stored_meta = [compress(value) for value in raw]
+        stored_messages = [compress(message) for message in raw_messages]
+        stored_payloads = {payload_key: compress(payload) for payload_key, payload in changed.items()}
+        raw_bytes = sum(map(len, raw + raw_messages)) + sum(map(len, changed.values()))
+        stored_bytes = (
+            sum(map(len, stored_meta + stored_messages))
+            + sum(map(len, stored_payloads.values()))
+        )
+        
+        saved, version = await self.backend.write_session(
+            SessionWrite(
+                session_id=session.session_id,
+                expected_version=expected_version,
+                reset_history=reset_history,
+                reset_payloads=full_write,
+                meta=stored_meta[0] if stored_meta else None,
+                delete_blob=session._stored_as_blob,
+                history=stored_messages,
+                payloads=stored_payloads,
+                removed=removed,
+                score=self._index_score(session.last_updated),
+                zone=session.request_values.zone_name,
+                operation_id=session.request_values.operation_id
+            ),
+            self.ttl
+        )
+        if not saved:
+            return False, version
+        
+        self._mark_stored(session, payloads, version)
+        
+        logger.info("session_saved",
+                   session_id=session.session_id,
+                   version=version,
+                   new_messages=len(new_messages),
+                   changed_payloads=len(changed),
+                   bytes_raw=raw_bytes,
+                   bytes_stored=stored_bytes,
+                   compression_ratio=round(raw_bytes / stored_bytes, 2) if stored_bytes else 1.0,
+                   ttl=self.ttl)
+        return True, version
+    
+    async def _rebase_session(self, session: Session) -> None:
+        """Re-apply this session's unsaved changes on top of the stored session
+        
+        New history messages are appended after the stored ones, changed and
+        removed payloads override the stored payloads key by key, and changed
+        metadata keys and fields are applied over the stored values. The
+        rolling history summary of the stored session is kept.
+        """
+        latest = await self.get_session(session.session_id)
+        if latest is None:
+            # Deleted meanwhile: write everything as a new session
+            session._stored_session_id = None
+            session._stored_version = 0
+            return
+        
+        new_messages = session.conversation_history[session._stored_history_length:]
+        latest.conversation_history.extend(new_messages)
+        
+        for payload_key, payload in session.payloads.items():
+            if session._stored_payloads.get(payload_key) != self.serializer.dumps(payload):
+                latest.payloads[payload_key] = payload
+        for payload_key in session._stored_payloads:
+            if payload_key not in session.payloads:
+                latest.payloads.pop(payload_key, None)
+        
+        loaded_meta = json.loads(session._stored_meta) if session._stored_meta else {}
+        current_meta = session.model_dump(mode="json", exclude={"conversation_history", "payloads"})
+        for field, value in current_meta.items():
+            if field in ("session_id", "created_at", "history_summary", "summarized_message_count"):
+                continue
+            if loaded_meta.get(field) == value:
+                continue
+            if field == "metadata":
+                loaded_metadata = loaded_meta.get("metadata", {})
+                for key, item in session.metadata.items():
+                    if loaded_metadata.get(key) != value.get(key):
+                        latest.metadata[key] = item
+            elif field == "last_updated":
+                latest.last_updated = max(latest.last_updated, session.last_updated)
+            else:
+                setattr(latest, field, getattr(session, field))
+        
+        # Adopt the merged state in place; callers hold references to session
+        for field in Session.model_fields:
+            setattr(session, field, getattr(latest, field))
+        session._stored_session_id = latest._stored_session_id
+        session._stored_version = latest._stored_version
+        session._stored_meta = latest._stored_meta
+        session._stored_history_length = latest._stored_history_length
+        session._stored_payloads = latest._stored_payloads
+        session._stored_as_blob = latest._stored_as_blob
+        
+        logger.info("session_rebased",
+                   session_id=session.session_id,
+                   version=session._stored_version,
+                   appended_messages=len(new_messages))
     
     async def update_session(self, session: Session) -> bool:
         """Update existing session"""
@@ -164,17 +422,16 @@ class SessionManager:
     
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session"""
-        if not self.redis:
-            raise RuntimeError("Redis not connected")
+        self._require_backend()
         
-        key = self._get_session_key(session_id)
+        self.cache.invalidate(session_id)
         
         try:
-            result = await self.redis.delete(key)
+            result = await self.backend.delete_session(session_id)
             logger.info("session_deleted",
                        session_id=session_id,
-                       existed=bool(result))
-            return bool(result)
+                       existed=result)
+            return result
         except Exception as e:
             logger.error("session_delete_error",
                         session_id=session_id,
@@ -183,13 +440,10 @@ class SessionManager:
     
     async def extend_session_ttl(self, session_id: str) -> bool:
         """Extend session TTL"""
-        if not self.redis:
-            raise RuntimeError("Redis not connected")
-        
-        key = self._get_session_key(session_id)
+        self._require_backend()
         
         try:
-            result = await self.redis.expire(key, self.ttl)
+            result = await self.backend.expire_session(session_id, self.ttl)
             logger.info("session_ttl_extended",
                        session_id=session_id,
                        ttl=self.ttl,
@@ -203,14 +457,10 @@ class SessionManager:
     
     async def get_session_ttl(self, session_id: str) -> int:
         """Get remaining TTL for session"""
-        if not self.redis:
-            raise RuntimeError("Redis not connected")
-        
-        key = self._get_session_key(session_id)
+        self._require_backend()
         
         try:
-            ttl = await self.redis.ttl(key)
-            return ttl if ttl > 0 else 0
+            return await self.backend.session_ttl(session_id)
         except Exception as e:
             logger.error("session_ttl_error",
                         session_id=session_id,
@@ -218,17 +468,12 @@ class SessionManager:
             return 0
     
     async def list_active_sessions(self) -> List[str]:
-        """List all active session IDs"""
-        if not self.redis:
-            raise RuntimeError("Redis not connected")
+        """List all active session IDs, most recently updated first"""
+        self._require_backend()
         
         try:
-            pattern = "infoex:session:*"
-            keys = []
-            async for key in self.redis.scan_iter(match=pattern):
-                # Extract session ID from key
-                session_id = key.split(":")[-1]
-                keys.append(session_id)
+            page, _ = await self.backend.index_page(0, None)
+            keys = [session_id for session_id, _ in page]
             
             logger.info("sessions_listed", count=len(keys))
             return keys
@@ -236,13 +481,162 @@ class SessionManager:
             logger.error("session_list_error", error=str(e))
             return []
     
+    async def list_sessions(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        zone: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, datetime]], int]:
+        """Page through indexed sessions, most recently updated first
+        
+        Filters by zone or operation use the facet index (zone wins if both
+        are given). Returns (session ID, last_updated) pairs and the total
+        count for the filter. Expired sessions stay listed until cleanup.
+        """
+        self._require_backend()
+        
+        members, total = await self.backend.index_page(offset, limit, zone=zone, operation_id=operation_id)
+        page = [
+            (session_id, datetime.fromtimestamp(score, tz=timezone.utc).replace(tzinfo=None))
+            for session_id, score in members
+        ]
+        return page, total
+    
+    async def count_sessions(self, zone: Optional[str] = None, operation_id: Optional[str] = None) -> int:
+        """Number of indexed sessions, optionally for one zone or operation"""
+        self._require_backend()
+        
+        return await self.backend.index_count(zone=zone, operation_id=operation_id)
+    
+    async def remove_from_index(self, session_ids: List[str]) -> None:
+        """Drop sessions from the index and every facet"""
+        await self.backend.index_remove(session_ids)
+    
     async def cleanup_expired_sessions(self) -> int:
-        """Clean up expired sessions (Redis handles this automatically with TTL)"""
-        # This is mainly for logging/monitoring purposes
-        # Redis automatically removes keys when TTL expires
-        active_sessions = await self.list_active_sessions()
-        logger.info("session_cleanup_check", active_count=len(active_sessions))
-        return len(active_sessions)
+        """Remove expired sessions from the index; returns how many were removed
+        
+        Storage expires the sessions themselves; only index entries older
+        than the TTL are checked.
+        """
+        self._require_backend()
+        
+        try:
+            cutoff = self._index_score(datetime.utcnow()) - self.ttl
+            removed, active, empty = await self.backend.index_cleanup(cutoff)
+            
+            logger.info("session_cleanup_check",
+                       active_count=active,
+                       removed=removed,
+                       empty_facets=empty)
+            return removed
+            
+        except Exception as e:
+            logger.error("session_cleanup_error", error=str(e))
+            return 0
+
+
+class SessionUnitOfWork:
+    """Request-scoped session access: one load, one flush
+    
+    Routes load (or create) the session through the unit of work, change it
+    freely, and it is written once when the request finishes, and only if
+    something changed. If the request fails, SESSION_ERROR_POLICY decides:
+    "discard" drops the changes so a retry starts from the stored state,
+    "flush" writes whatever had been applied before the failure.
+    
+    Writes follow SESSION_CONFLICT_POLICY, except that "retry" only applies
+    to retryable units of work; the others merge instead, since their
+    request cannot be safely repeated.
+    
+    Used as an async context manager, commit and rollback happen on exit,
+    followed by close, which returns the session to the per-process cache.
+    """
+    
+    def __init__(self, manager: SessionManager, session_id: str, retryable: bool = False):
+        """Initialize for one session"""
+        self.manager = manager
+        self.session_id = session_id
+        self.session: Optional[Session] = None
+        self.ttl = 0
+        self.error_policy = settings.session_error_policy
+        self.conflict_policy = settings.session_conflict_policy
+        if self.conflict_policy == "retry" and not retryable:
+            self.conflict_policy = "merge"
+    
+    async def load(self) -> Optional[Session]:
+        """Read the session and its TTL from storage (once per unit of work)"""
+        if self.session is None:
+            self.session, self.ttl = await self.manager.get_session_with_ttl(self.session_id)
+        return self.session
+    
+    async def get_or_create(
+        self,
+        request_values: RequestValues,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Session:
+        """Load the session, or start a new one that is stored on commit"""
+        session = await self.load()
+        if session is None:
+            session = self.manager.new_session(request_values, self.session_id)
+            if metadata:
+                session.metadata.update(metadata)
+            self.session = session
+        return session
+    
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes to write"""
+        return self.session is not None and self.manager.has_changes(self.session)
+    
+    async def commit(self, conflict_policy: Optional[str] = None) -> bool:
+        """Write the session if it changed
+        
+        May be called more than once; each call writes what changed since the
+        previous one. Raises SessionConflictError under the retry and reject
+        conflict policies.
+        """
+        if not self.dirty:
+            return True
+        return await self.manager.save_session(self.session, conflict_policy or self.conflict_policy)
+    
+    async def rollback(self) -> None:
+        """Finish after a failure, applying the error policy"""
+        if not self.dirty:
+            return
+        if self.error_policy == "flush":
+            try:
+                await self.manager.save_session(self.session, "merge")
+                logger.info("session_flushed_after_error", session_id=self.session_id)
+            except SessionConflictError as e:
+                logger.error("session_flush_conflict", session_id=self.session_id, error=str(e))
+        else:
+            logger.info("session_changes_discarded", session_id=self.session_id)
+    
+    def close(self) -> None:
+        """End the unit of work, returning a clean session to the cache
+        
+        A session with unsaved (discarded) changes is not cached.
+        """
+        if self.session is not None:
+            self.manager.check_in(self.session)
+            self.session = None
+    
+    async def __aenter__(self) -> "SessionUnitOfWork":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        try:
+            if exc_type is None:
+                await self.commit()
+            elif issubclass(exc_type, SessionConflictError):
+                # The caller retries or reports the conflict; nothing is flushed
+                logger.info("session_changes_discarded", session_id=self.session_id)
+            else:
+                await self.rollback()
+        finally:
+            self.close()
+        return False
 
 
 # Create a singleton instance
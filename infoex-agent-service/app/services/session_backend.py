@@ -0,0 +1,1056 @@
+"""Session storage backends
+
+SessionManager keeps serialization, change tracking, caching and conflict
+handling; a backend only stores the serialized parts of each session (meta,
+history messages, payloads and a version), the session index, and a few
+key-value and queue primitives used by idempotency and archival, and the
+consumer-group streams behind the background submission queue.
+
+"redis" is the shared store for multi-worker deployments. "memory" keeps
+everything in the process: a bounded LRU with TTL for single-node
+deployments and for running the request path without external services.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Type
+import redis.asyncio as redis
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+# A stream entry: (entry ID, fields)
+StreamEntry = Tuple[str, Dict[str, bytes]]
+
+# Compare-and-set write of a session's parts.
+# KEYS: meta, history, payloads, version, blob, then the session index, its zone
+#       and operation facets, and the registry of facet keys
+# ARGV: expected version, ttl, reset history, reset payloads, meta ('' = unchanged),
+#       delete blob, then counted groups: history items, payload key/value pairs,
+#       payload keys to delete; then the index score and session ID
+# A session created (or recreated after a delete or expiry) starts at the server
+# time in microseconds rather than 1, so its versions never repeat an earlier
+# incarnation's and a stale cached copy cannot pass for current.
+SAVE_SESSION_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[4]) or '0')
+if current ~= tonumber(ARGV[1]) then
+    return {0, current}
+end
+if ARGV[3] == '1' then redis.call('DEL', KEYS[2]) end
+if ARGV[4] == '1' then redis.call('DEL', KEYS[3]) end
+if ARGV[5] ~= '' then redis.call('SET', KEYS[1], ARGV[5]) end
+if ARGV[6] == '1' then redis.call('DEL', KEYS[5]) end
+local i = 7
+local n = tonumber(ARGV[i])
+if n > 0 then redis.call('RPUSH', KEYS[2], unpack(ARGV, i + 1, i + n)) end
+i = i + n + 1
+n = tonumber(ARGV[i])
+if n > 0 then redis.call('HSET', KEYS[3], unpack(ARGV, i + 1, i + 2 * n)) end
+i = i + 2 * n + 1
+n = tonumber(ARGV[i])
+if n > 0 then redis.call('HDEL', KEYS[3], unpack(ARGV, i + 1, i + n)) end
+i = i + n + 1
+for k = 6, 8 do redis.call('ZADD', KEYS[k], ARGV[i], ARGV[i + 1]) end
+redis.call('SADD', KEYS[9], KEYS[7], KEYS[8])
+local version
+if current == 0 then
+    local now = redis.call('TIME')
+    version = now[1] .. string.format('%06d', now[2])
+    redis.call('SET', KEYS[4], version)
+    version = tonumber(version)
+else
+    version = redis.call('INCR', KEYS[4])
+end
+local ttl = tonumber(ARGV[2])
+for k = 1, 4 do redis.call('EXPIRE', KEYS[k], ttl) end
+return {1, version}
+"""
+
+
+class StoredSession:
+    """Serialized parts of a session as read from storage
+
+    Sessions written before the incremental layout come back as a single
+    JSON blob instead of meta, history and payloads.
+    """
+
+    __slots__ = ("meta", "history", "payloads", "version", "ttl", "blob")
+
+    def __init__(
+        self,
+        meta: Optional[bytes] = None,
+        history: Optional[List[bytes]] = None,
+        payloads: Optional[Dict[str, bytes]] = None,
+        version: int = 0,
+        ttl: int = 0,
+        blob: Optional[bytes] = None
+    ):
+        self.meta = meta
+        self.history = history or []
+        self.payloads = payloads or {}
+        self.version = version
+        self.ttl = ttl
+        self.blob = blob
+
+
+class SessionWrite:
+    """Changes to apply to a stored session if its version still matches"""
+
+    __slots__ = (
+        "session_id", "expected_version", "reset_history", "reset_payloads", "meta",
+        "delete_blob", "history", "payloads", "removed", "score", "zone", "operation_id"
+    )
+
+    def __init__(
+        self,
+        session_id: str,
+        expected_version: int,
+        reset_history: bool,
+        reset_payloads: bool,
+        meta: Optional[bytes],
+        delete_blob: bool,
+        history: List[bytes],
+        payloads: Dict[str, bytes],
+        removed: List[str],
+        score: float,
+        zone: str,
+        operation_id: str
+    ):
+        self.session_id = session_id
+        self.expected_version = expected_version
+        self.reset_history = reset_history
+        self.reset_payloads = reset_payloads
+        self.meta = meta
+        self.delete_blob = delete_blob
+        self.history = history
+        self.payloads = payloads
+        self.removed = removed
+        self.score = score
+        self.zone = zone
+        self.operation_id = operation_id
+
+
+class SessionBackend:
+    """Storage interface used by SessionManager, idempotency and archival
+
+    Index scores are UTC epoch seconds of a session's last_updated. Facet
+    filters select sessions of one zone or operation (zone wins if both are
+    given). Key-value and queue keys are full key names chosen by callers.
+    """
+
+    name = "base"
+
+    @property
+    def connected(self) -> bool:
+        """Whether the backend is ready for use"""
+        raise NotImplementedError
+
+    async def connect(self) -> None:
+        """Open connections"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release connections"""
+        raise NotImplementedError
+
+    async def ping(self) -> bool:
+        """Health check"""
+        raise NotImplementedError
+
+    async def read_sessions(
+        self,
+        session_ids: List[str],
+        ttl: int,
+        renew: bool
+    ) -> Dict[str, Optional[StoredSession]]:
+        """Read sessions in one round trip, renewing their TTL if asked"""
+        raise NotImplementedError
+
+    async def read_version(self, session_id: str, ttl: int, renew: bool) -> Tuple[int, int]:
+        """Stored version and remaining TTL of a session"""
+        raise NotImplementedError
+
+    async def write_session(self, write: SessionWrite, ttl: int) -> Tuple[bool, int]:
+        """Apply a write atomically; returns (saved, stored version)"""
+        raise NotImplementedError
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session and its index entries; returns whether it existed"""
+        raise NotImplementedError
+
+    async def expire_session(self, session_id: str, ttl: int) -> bool:
+        """Set a session's remaining TTL; returns whether it exists"""
+        raise NotImplementedError
+
+    async def session_ttl(self, session_id: str) -> int:
+        """Remaining TTL of a session (0 if missing)"""
+        raise NotImplementedError
+
+    async def index_page(
+        self,
+        offset: int,
+        limit: Optional[int],
+        zone: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """(session ID, score) pairs, newest first, and the total for the filter"""
+        raise NotImplementedError
+
+    async def index_count(self, zone: Optional[str] = None, operation_id: Optional[str] = None) -> int:
+        """Number of indexed sessions for the filter"""
+        raise NotImplementedError
+
+    async def index_before(self, score: float, after: Optional[float] = None) -> List[str]:
+        """Indexed sessions last updated at or before a score (and after another, if given)"""
+        raise NotImplementedError
+
+    async def index_remove(self, session_ids: List[str]) -> None:
+        """Drop sessions from the index and every facet"""
+        raise NotImplementedError
+
+    async def index_cleanup(self, cutoff: float) -> Tuple[int, int, int]:
+        """Drop expired sessions last updated before cutoff from the index
+
+        Returns (removed, remaining, empty facets dropped).
+        """
+        raise NotImplementedError
+
+    async def kv_get(self, key: str) -> Optional[bytes]:
+        """Value of a key, or None"""
+        raise NotImplementedError
+
+    async def kv_get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """Values of several keys in one round trip"""
+        raise NotImplementedError
+
+    async def kv_set(self, key: str, value: bytes, ttl: int, only_if_absent: bool = False) -> bool:
+        """Set a key with a TTL; returns False if only_if_absent and it exists"""
+        raise NotImplementedError
+
+    async def kv_delete(self, key: str) -> bool:
+        """Delete a key; returns whether it existed"""
+        raise NotImplementedError
+
+    async def queue_add(self, key: str, members: List[str]) -> None:
+        """Queue members in arrival order; members already queued keep their place"""
+        raise NotImplementedError
+
+    async def queue_pop(self, key: str, count: int) -> List[str]:
+        """Take up to count of the oldest queued members"""
+        raise NotImplementedError
+
+    async def stream_add(self, key: str, fields: Dict[str, bytes]) -> str:
+        """Append an entry to a stream; returns its ID"""
+        raise NotImplementedError
+
+    async def stream_read(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        count: int,
+        block_ms: int
+    ) -> List[StreamEntry]:
+        """Deliver up to count new entries to one consumer of a group
+
+        Waits up to block_ms for an entry when there is none. Delivered
+        entries stay pending until acknowledged.
+        """
+        raise NotImplementedError
+
+    async def stream_claim(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        min_idle_ms: int,
+        count: int
+    ) -> List[StreamEntry]:
+        """Take over up to count entries pending for longer than min_idle_ms
+
+        Recovers entries delivered to a consumer that crashed or hung.
+        """
+        raise NotImplementedError
+
+    async def stream_ack(self, key: str, group: str, entry_ids: List[str]) -> None:
+        """Acknowledge entries and remove them from the stream"""
+        raise NotImplementedError
+
+    async def stream_info(self, key: str, group: str) -> Tuple[int, int]:
+        """(entries in the stream, entries delivered but not acknowledged)"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend name and any local counters"""
+        return {"backend": self.name}
+
+
+class RedisSessionBackend(SessionBackend):
+    """Redis storage shared by every worker and instance
+
+    Each session is stored as separate meta, history, payloads and version
+    keys, written by a Lua compare-and-set script. The index is a sorted set
+    per facet.
+    """
+
+    name = "redis"
+
+    def __init__(self):
+        """Initialize without connecting"""
+        self.redis: Optional[redis.Redis] = None
+        self._save_script = None
+        self._groups = set()
+
+    @property
+    def connected(self) -> bool:
+        """Whether connect succeeded"""
+        return self.redis is not None
+
+    async def connect(self) -> None:
+        """Connect to Redis"""
+        try:
+            # Values are JSON bytes; the serializer handles UTF-8 itself
+            self.redis = redis.from_url(
+                settings.effective_redis_url,
+                decode_responses=False
+            )
+            await self.redis.ping()
+            self._save_script = self.redis.register_script(SAVE_SESSION_SCRIPT)
+            logger.info("redis_connected",
+                       host=settings.redis_host,
+                       port=settings.redis_port,
+                       db=settings.redis_db)
+        except Exception as e:
+            logger.error("redis_connection_failed", error=str(e))
+            raise
+
+    async def close(self) -> None:
+        """Disconnect from Redis"""
+        if self.redis:
+            await self.redis.close()
+            logger.info("redis_disconnected")
+
+    async def ping(self) -> bool:
+        """Ping Redis"""
+        return bool(await self.redis.ping())
+
+    def _get_session_key(self, session_id: str) -> str:
+        """Generate Redis key for session"""
+        if settings.redis_session_prefix:
+            return f"{settings.redis_session_prefix}:{session_id}"
+        else:
+            # No prefix - use session ID directly
+            return session_id
+
+    def _get_layout_keys(self, session_id: str) -> Dict[str, str]:
+        """Redis keys of a session's parts
+
+        meta holds the scalar fields as JSON, history is a list with one JSON
+        message per entry, and payloads is a hash of JSON payload statuses keyed
+        by payload key. version counts saves (from a time-based start, see
+        SAVE_SESSION_SCRIPT) and guards them against concurrent writers.
+        Sessions written before this layout live in a single JSON blob under
+        the bare session key.
+        """
+        key = self._get_session_key(session_id)
+        return {
+            "meta": f"{key}:meta",
+            "history": f"{key}:history",
+            "payloads": f"{key}:payloads",
+            "version": f"{key}:version",
+            "blob": key
+        }
+
+    def _get_index_key(self, facet: Optional[str] = None, value: Optional[str] = None) -> str:
+        """Redis key of the session index, or of one of its facets
+
+        The index is a sorted set of session IDs scored by last_updated.
+        Facet sets (by zone and by operation) hold the same members, and
+        the "facets" set records every facet key for cleanup.
+        """
+        base = f"{settings.redis_session_prefix}:index" if settings.redis_session_prefix else "index"
+        if facet is None:
+            return f"{base}:sessions"
+        if value is None:
+            return f"{base}:{facet}"
+        return f"{base}:{facet}:{value}"
+
+    def _get_filter_key(self, zone: Optional[str], operation_id: Optional[str]) -> str:
+        """Index key for a listing filter"""
+        if zone:
+            return self._get_index_key("zone", zone)
+        if operation_id:
+            return self._get_index_key("operation", operation_id)
+        return self._get_index_key()
+
+    def _queue_read(self, pipe: Any, keys: Dict[str, str], ttl: int, renew: bool) -> int:
+        """Queue the commands reading one session; returns how many were queued
+
+        The legacy blob is read alongside the layout keys (it is simply
+        missing for migrated sessions), so either format takes one round
+        trip. The last three results are the meta TTL, the blob and its TTL.
+        """
+        if renew:
+            pipe.getex(keys["meta"], ex=ttl)
+            pipe.lrange(keys["history"], 0, -1)
+            pipe.hgetall(keys["payloads"])
+            pipe.getex(keys["version"], ex=ttl)
+            pipe.expire(keys["history"], ttl)
+            pipe.expire(keys["payloads"], ttl)
+            pipe.ttl(keys["meta"])
+            pipe.getex(keys["blob"], ex=ttl)
+            pipe.ttl(keys["blob"])
+            return 9
+        pipe.get(keys["meta"])
+        pipe.lrange(keys["history"], 0, -1)
+        pipe.hgetall(keys["payloads"])
+        pipe.get(keys["version"])
+        pipe.ttl(keys["meta"])
+        pipe.get(keys["blob"])
+        pipe.ttl(keys["blob"])
+        return 7
+
+    async def read_sessions(
+        self,
+        session_ids: List[str],
+        ttl: int,
+        renew: bool
+    ) -> Dict[str, Optional[StoredSession]]:
+        """Read sessions and their TTLs with a single pipeline"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            counts = [
+                self._queue_read(pipe, self._get_layout_keys(session_id), ttl, renew)
+                for session_id in session_ids
+            ]
+            results = await pipe.execute()
+
+        stored = {}
+        offset = 0
+        for session_id, count in zip(session_ids, counts):
+            meta, history, payloads, version = results[offset:offset + 4]
+            remaining, blob, blob_remaining = results[offset + count - 3:offset + count]
+            offset += count
+            if meta:
+                stored[session_id] = StoredSession(
+                    meta=meta,
+                    history=history,
+                    payloads={payload_key.decode("utf-8"): payload for payload_key, payload in payloads.items()},
+                    version=int(version or 0),
+                    ttl=max(remaining, 0)
+                )
+            elif blob:
+                # Pre-layout format; the next save moves it to the incremental layout
+                stored[session_id] = StoredSession(blob=blob, ttl=max(blob_remaining, 0))
+            else:
+                stored[session_id] = None
+        return stored
+
+    async def read_version(self, session_id: str, ttl: int, renew: bool) -> Tuple[int, int]:
+        """Read the version, renewing every part's TTL if asked"""
+        keys = self._get_layout_keys(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if renew:
+                pipe.getex(keys["version"], ex=ttl)
+                for part in ("meta", "history", "payloads"):
+                    pipe.expire(keys[part], ttl)
+            else:
+                pipe.get(keys["version"])
+            pipe.ttl(keys["meta"])
+            results = await pipe.execute()
+        return int(results[0] or 0), max(results[-1], 0)
+
+    async def write_session(self, write: SessionWrite, ttl: int) -> Tuple[bool, int]:
+        """Run the compare-and-set script"""
+        keys = self._get_layout_keys(write.session_id)
+        args: List[Any] = [
+            write.expected_version,
+            ttl,
+            int(write.reset_history),
+            int(write.reset_payloads),
+            write.meta if write.meta is not None else b"",
+            int(write.delete_blob),
+            len(write.history),
+            *write.history,
+            len(write.payloads),
+            *(part for item in write.payloads.items() for part in item),
+            len(write.removed),
+            *write.removed,
+            write.score,
+            write.session_id
+        ]
+        saved, version = await self._save_script(
+            keys=[
+                keys["meta"], keys["history"], keys["payloads"], keys["version"], keys["blob"],
+                self._get_index_key(),
+                self._get_index_key("zone", write.zone),
+                self._get_index_key("operation", write.operation_id),
+                self._get_index_key("facets")
+            ],
+            args=args
+        )
+        return bool(saved), version
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete every part of the session"""
+        result = await self.redis.delete(*self._get_layout_keys(session_id).values())
+        await self.index_remove([session_id])
+        return bool(result)
+
+    async def expire_session(self, session_id: str, ttl: int) -> bool:
+        """Expire every part of the session"""
+        keys = self._get_layout_keys(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for part in ("meta", "history", "payloads", "version", "blob"):
+                pipe.expire(keys[part], ttl)
+            results = await pipe.execute()
+        # The meta key (or legacy blob) is what makes a session exist
+        return bool(results[0] or results[4])
+
+    async def session_ttl(self, session_id: str) -> int:
+        """TTL of the meta key, or of a legacy blob"""
+        keys = self._get_layout_keys(session_id)
+        ttl = await self.redis.ttl(keys["meta"])
+        if ttl == -2:
+            ttl = await self.redis.ttl(keys["blob"])
+        return ttl if ttl > 0 else 0
+
+    async def index_page(
+        self,
+        offset: int,
+        limit: Optional[int],
+        zone: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """ZREVRANGE and ZCARD of the filter's sorted set in one round trip"""
+        key = self._get_filter_key(zone, operation_id)
+        end = offset + limit - 1 if limit is not None else -1
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(key, offset, end, withscores=True)
+            pipe.zcard(key)
+            members, total = await pipe.execute()
+        return [(member.decode("utf-8"), score) for member, score in members], total
+
+    async def index_count(self, zone: Optional[str] = None, operation_id: Optional[str] = None) -> int:
+        """ZCARD of the filter's sorted set"""
+        return await self.redis.zcard(self._get_filter_key(zone, operation_id))
+
+    async def index_before(self, score: float, after: Optional[float] = None) -> List[str]:
+        """ZRANGEBYSCORE of the main index"""
+        low = f"({after}" if after is not None else "-inf"
+        members = await self.redis.zrangebyscore(self._get_index_key(), low, score)
+        return [member.decode("utf-8") for member in members]
+
+    async def index_remove(self, session_ids: List[str]) -> None:
+        """ZREM from the index and every registered facet"""
+        if not session_ids:
+            return
+        facets = await self.redis.smembers(self._get_index_key("facets"))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(self._get_index_key(), *session_ids)
+            for facet in facets:
+                pipe.zrem(facet, *session_ids)
+            await pipe.execute()
+
+    async def index_cleanup(self, cutoff: float) -> Tuple[int, int, int]:
+        """Check old index entries against their meta keys
+
+        Redis expires the session keys themselves. Only index entries older
+        than the cutoff can belong to expired sessions (a read with sliding
+        TTL may have kept some of them alive), so only those are checked.
+        """
+        facets = await self.redis.smembers(self._get_index_key("facets"))
+        index_keys = [self._get_index_key(), *facets]
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in index_keys:
+                pipe.zrangebyscore(key, "-inf", cutoff)
+            candidate_lists = await pipe.execute()
+        candidates = sorted({member.decode("utf-8") for members in candidate_lists for member in members})
+
+        expired = []
+        if candidates:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for session_id in candidates:
+                    pipe.exists(self._get_layout_keys(session_id)["meta"])
+                exists = await pipe.execute()
+            expired = [session_id for session_id, alive in zip(candidates, exists) if not alive]
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in index_keys:
+                if expired:
+                    pipe.zrem(key, *expired)
+                pipe.zcard(key)
+            results = await pipe.execute()
+
+        # Forget facets that no longer hold any session
+        counts = results[1::2] if expired else results
+        empty = [key for key, count in zip(index_keys[1:], counts[1:]) if count == 0]
+        if empty:
+            await self.redis.srem(self._get_index_key("facets"), *empty)
+        return len(expired), counts[0], len(empty)
+
+    async def kv_get(self, key: str) -> Optional[bytes]:
+        """GET"""
+        return await self.redis.get(key)
+
+    async def kv_get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """MGET"""
+        return await self.redis.mget(keys) if keys else []
+
+    async def kv_set(self, key: str, value: bytes, ttl: int, only_if_absent: bool = False) -> bool:
+        """SET with EX (and NX)"""
+        return bool(await self.redis.set(key, value, ex=ttl, nx=only_if_absent))
+
+    async def kv_delete(self, key: str) -> bool:
+        """DEL"""
+        return bool(await self.redis.delete(key))
+
+    async def queue_add(self, key: str, members: List[str]) -> None:
+        """ZADD NX scored by arrival time"""
+        now = time.time()
+        await self.redis.zadd(key, {member: now for member in members}, nx=True)
+
+    async def queue_pop(self, key: str, count: int) -> List[str]:
+        """ZPOPMIN, so each member goes to one worker"""
+        popped = await self.redis.zpopmin(key, count)
+        return [member.decode("utf-8") for member, _ in popped]
+
+    async def _ensure_group(self, key: str, group: str) -> None:
+        """XGROUP CREATE MKSTREAM once per stream and group"""
+        if (key, group) in self._groups:
+            return
+        try:
+            await self.redis.xgroup_create(key, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add((key, group))
+
+    @staticmethod
+    def _entries(raw: List[Any]) -> List[StreamEntry]:
+        """Decode entry IDs and field names; entries trimmed from the stream are skipped"""
+        return [
+            (entry_id.decode("utf-8"), {name.decode("utf-8"): value for name, value in fields.items()})
+            for entry_id, fields in raw
+            if fields is not None
+        ]
+
+    async def stream_add(self, key: str, fields: Dict[str, bytes]) -> str:
+        """XADD"""
+        entry_id = await self.redis.xadd(key, fields)
+        return entry_id.decode("utf-8")
+
+    async def stream_read(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        count: int,
+        block_ms: int
+    ) -> List[StreamEntry]:
+        """XREADGROUP of new entries (BLOCK 0 would wait forever, so it is omitted)"""
+        await self._ensure_group(key, group)
+        response = await self.redis.xreadgroup(group, consumer, {key: ">"}, count=count, block=block_ms or None)
+        return self._entries(response[0][1]) if response else []
+
+    async def stream_claim(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        min_idle_ms: int,
+        count: int
+    ) -> List[StreamEntry]:
+        """XAUTOCLAIM (Redis 6.2+)"""
+        await self._ensure_group(key, group)
+        response = await self.redis.xautoclaim(key, group, consumer, min_idle_ms, start_id="0-0", count=count)
+        return self._entries(response[1])
+
+    async def stream_ack(self, key: str, group: str, entry_ids: List[str]) -> None:
+        """XACK and XDEL in one round trip"""
+        if not entry_ids:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(key, group, *entry_ids)
+        pipe.xdel(key, *entry_ids)
+        await pipe.execute()
+
+    async def stream_info(self, key: str, group: str) -> Tuple[int, int]:
+        """XLEN and the XPENDING summary"""
+        await self._ensure_group(key, group)
+        length = await self.redis.xlen(key)
+        pending = await self.redis.xpending(key, group)
+        return length, pending["pending"]
+
+
+class _MemoryEntry:
+    """One session held by MemorySessionBackend"""
+
+    __slots__ = ("meta", "history", "payloads", "version", "expires_at")
+
+    def __init__(self):
+        self.meta: Optional[bytes] = None
+        self.history: List[bytes] = []
+        self.payloads: Dict[str, bytes] = {}
+        self.version = 0
+        self.expires_at = 0.0
+
+
+class MemorySessionBackend(SessionBackend):
+    """In-process storage: an LRU of sessions bounded by count, with TTLs
+
+    Nothing is shared between workers, so it suits a single worker process
+    (tests, benchmarks, small single-node deployments). Expired sessions
+    are dropped when touched and by index cleanup; when the LRU is full the
+    least recently used session is evicted.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_sessions: int = 1000):
+        """Initialize empty storage"""
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        # session ID -> (score, zone, operation ID)
+        self._index: Dict[str, Tuple[float, str, str]] = {}
+        self._values: Dict[str, Tuple[bytes, float]] = {}
+        self._queues: Dict[str, Dict[str, float]] = {}
+        # stream key -> entry ID -> fields; one consumer group per stream
+        self._streams: Dict[str, "OrderedDict[str, Dict[str, bytes]]"] = {}
+        # stream key -> entry ID -> (consumer, delivered at); the rest are undelivered
+        self._pending: Dict[str, Dict[str, Tuple[str, float]]] = {}
+        self._stream_events: Dict[str, asyncio.Event] = {}
+        self._stream_sequence = 0
+        # Versions come from one counter so a recreated session never reuses one
+        self._version_sequence = 0
+        self._connected = False
+
+        # Metrics
+        self.evictions = 0
+
+    @property
+    def connected(self) -> bool:
+        """Whether connect was called"""
+        return self._connected
+
+    async def connect(self) -> None:
+        """Nothing to connect to"""
+        self._connected = True
+        logger.info("memory_session_backend_ready", max_sessions=self.max_sessions)
+
+    async def close(self) -> None:
+        """Drop everything"""
+        self._sessions.clear()
+        self._index.clear()
+        self._values.clear()
+        self._queues.clear()
+        self._streams.clear()
+        self._pending.clear()
+        self._stream_events.clear()
+        self._connected = False
+
+    async def ping(self) -> bool:
+        """Always healthy once connected"""
+        return self._connected
+
+    def _live(self, session_id: str, touch: bool = True) -> Optional[_MemoryEntry]:
+        """The session if it has not expired, optionally marking it recently used"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._sessions[session_id]
+            return None
+        if touch:
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    def _remaining(self, entry: _MemoryEntry) -> int:
+        """Whole seconds until an entry expires"""
+        return max(int(entry.expires_at - time.monotonic()), 0)
+
+    async def read_sessions(
+        self,
+        session_ids: List[str],
+        ttl: int,
+        renew: bool
+    ) -> Dict[str, Optional[StoredSession]]:
+        """Copy out the stored parts"""
+        stored = {}
+        for session_id in session_ids:
+            entry = self._live(session_id)
+            if entry is None:
+                stored[session_id] = None
+                continue
+            if renew:
+                entry.expires_at = time.monotonic() + ttl
+            stored[session_id] = StoredSession(
+                meta=entry.meta,
+                history=list(entry.history),
+                payloads=dict(entry.payloads),
+                version=entry.version,
+                ttl=self._remaining(entry)
+            )
+        return stored
+
+    async def read_version(self, session_id: str, ttl: int, renew: bool) -> Tuple[int, int]:
+        """Version and TTL of a live session, (0, 0) otherwise"""
+        entry = self._live(session_id)
+        if entry is None:
+            return 0, 0
+        if renew:
+            entry.expires_at = time.monotonic() + ttl
+        return entry.version, self._remaining(entry)
+
+    async def write_session(self, write: SessionWrite, ttl: int) -> Tuple[bool, int]:
+        """Compare versions and apply the write (atomic: no awaits inside)"""
+        entry = self._live(write.session_id)
+        current = entry.version if entry is not None else 0
+        if current != write.expected_version:
+            return False, current
+
+        if entry is None:
+            entry = _MemoryEntry()
+            self._sessions[write.session_id] = entry
+        if write.reset_history:
+            entry.history = []
+        if write.reset_payloads:
+            entry.payloads = {}
+        if write.meta is not None:
+            entry.meta = write.meta
+        entry.history.extend(write.history)
+        entry.payloads.update(write.payloads)
+        for payload_key in write.removed:
+            entry.payloads.pop(payload_key, None)
+        self._version_sequence += 1
+        entry.version = self._version_sequence
+        entry.expires_at = time.monotonic() + ttl
+        self._index[write.session_id] = (write.score, write.zone, write.operation_id)
+
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._index.pop(evicted, None)
+            self.evictions += 1
+        return True, entry.version
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Drop the session and its index entry"""
+        existed = self._live(session_id, touch=False) is not None
+        self._sessions.pop(session_id, None)
+        self._index.pop(session_id, None)
+        return existed
+
+    async def expire_session(self, session_id: str, ttl: int) -> bool:
+        """Reset the session's expiry"""
+        entry = self._live(session_id, touch=False)
+        if entry is None:
+            return False
+        entry.expires_at = time.monotonic() + ttl
+        return True
+
+    async def session_ttl(self, session_id: str) -> int:
+        """Remaining TTL"""
+        entry = self._live(session_id, touch=False)
+        return self._remaining(entry) if entry is not None else 0
+
+    def _filtered(self, zone: Optional[str], operation_id: Optional[str]) -> List[Tuple[str, float]]:
+        """Index entries for a filter, newest first"""
+        if zone:
+            items = [(session_id, score) for session_id, (score, z, _) in self._index.items() if z == zone]
+        elif operation_id:
+            items = [(session_id, score) for session_id, (score, _, o) in self._index.items() if o == operation_id]
+        else:
+            items = [(session_id, score) for session_id, (score, _, _) in self._index.items()]
+        items.sort(key=lambda item: item[1], reverse=True)
+        return items
+
+    async def index_page(
+        self,
+        offset: int,
+        limit: Optional[int],
+        zone: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """Slice of the sorted index"""
+        items = self._filtered(zone, operation_id)
+        end = offset + limit if limit is not None else None
+        return items[offset:end], len(items)
+
+    async def index_count(self, zone: Optional[str] = None, operation_id: Optional[str] = None) -> int:
+        """Size of the filtered index"""
+        if not zone and not operation_id:
+            return len(self._index)
+        return len(self._filtered(zone, operation_id))
+
+    async def index_before(self, score: float, after: Optional[float] = None) -> List[str]:
+        """Sessions with an index score at or before score (and after after), oldest first"""
+        return [
+            session_id for session_id, item_score in reversed(self._filtered(None, None))
+            if item_score <= score and (after is None or item_score > after)
+        ]
+
+    async def index_remove(self, session_ids: List[str]) -> None:
+        """Drop index entries"""
+        for session_id in session_ids:
+            self._index.pop(session_id, None)
+
+    async def index_cleanup(self, cutoff: float) -> Tuple[int, int, int]:
+        """Drop index entries of expired sessions, and expired key-value entries
+
+        Facets are not stored separately, so none are ever left empty.
+        """
+        expired = [
+            session_id for session_id, (score, _, _) in self._index.items()
+            if score <= cutoff and self._live(session_id, touch=False) is None
+        ]
+        for session_id in expired:
+            del self._index[session_id]
+
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._values.items() if expires_at <= now]:
+            del self._values[key]
+        return len(expired), len(self._index), 0
+
+    async def kv_get(self, key: str) -> Optional[bytes]:
+        """Value if not expired"""
+        item = self._values.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def kv_get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """Values of several keys"""
+        return [await self.kv_get(key) for key in keys]
+
+    async def kv_set(self, key: str, value: bytes, ttl: int, only_if_absent: bool = False) -> bool:
+        """Store a value until its TTL runs out"""
+        if only_if_absent and await self.kv_get(key) is not None:
+            return False
+        self._values[key] = (value, time.monotonic() + ttl)
+        return True
+
+    async def kv_delete(self, key: str) -> bool:
+        """Remove a value"""
+        return self._values.pop(key, None) is not None
+
+    async def queue_add(self, key: str, members: List[str]) -> None:
+        """Add members that are not queued yet"""
+        queue = self._queues.setdefault(key, {})
+        now = time.time()
+        for member in members:
+            queue.setdefault(member, now)
+
+    async def queue_pop(self, key: str, count: int) -> List[str]:
+        """Remove and return the oldest members"""
+        queue = self._queues.get(key, {})
+        oldest = sorted(queue, key=queue.get)[:count]
+        for member in oldest:
+            del queue[member]
+        return oldest
+
+    def _stream_event(self, key: str) -> asyncio.Event:
+        """Event set while a stream has undelivered entries"""
+        event = self._stream_events.get(key)
+        if event is None:
+            event = self._stream_events[key] = asyncio.Event()
+        return event
+
+    async def stream_add(self, key: str, fields: Dict[str, bytes]) -> str:
+        """Append an entry with a Redis-style ID"""
+        self._stream_sequence += 1
+        entry_id = f"{int(time.time() * 1000)}-{self._stream_sequence}"
+        self._streams.setdefault(key, OrderedDict())[entry_id] = dict(fields)
+        self._stream_event(key).set()
+        return entry_id
+
+    async def stream_read(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        count: int,
+        block_ms: int
+    ) -> List[StreamEntry]:
+        """Deliver the oldest undelivered entries, waiting for one if needed (group is ignored)"""
+        deadline = time.monotonic() + block_ms / 1000
+        while True:
+            stream = self._streams.get(key, {})
+            pending = self._pending.setdefault(key, {})
+            undelivered = [entry_id for entry_id in stream if entry_id not in pending][:count]
+            if undelivered:
+                now = time.monotonic()
+                for entry_id in undelivered:
+                    pending[entry_id] = (consumer, now)
+                return [(entry_id, dict(stream[entry_id])) for entry_id in undelivered]
+
+            event = self._stream_event(key)
+            event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return []
+
+    async def stream_claim(
+        self,
+        key: str,
+        group: str,
+        consumer: str,
+        min_idle_ms: int,
+        count: int
+    ) -> List[StreamEntry]:
+        """Redeliver entries pending for longer than min_idle_ms to this consumer"""
+        stream = self._streams.get(key, {})
+        pending = self._pending.get(key, {})
+        now = time.monotonic()
+        stale = [
+            entry_id for entry_id, (_, delivered_at) in pending.items()
+            if now - delivered_at >= min_idle_ms / 1000
+        ][:count]
+        for entry_id in stale:
+            pending[entry_id] = (consumer, now)
+        return [(entry_id, dict(stream[entry_id])) for entry_id in stale if entry_id in stream]
+
+    async def stream_ack(self, key: str, group: str, entry_ids: List[str]) -> None:
+        """Forget acknowledged entries"""
+        stream = self._streams.get(key, {})
+        pending = self._pending.get(key, {})
+        for entry_id in entry_ids:
+            stream.pop(entry_id, None)
+            pending.pop(entry_id, None)
+
+    async def stream_info(self, key: str, group: str) -> Tuple[int, int]:
+        """Entries held and entries delivered"""
+        return len(self._streams.get(key, {})), len(self._pending.get(key, {}))
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy of the in-process store"""
+        return {
+            "backend": self.name,
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "indexed": len(self._index),
+            "evictions": self.evictions,
+        }
+
+
+BACKENDS: Dict[str, Type[SessionBackend]] = {
+    "redis": RedisSessionBackend,
+    "memory": MemorySessionBackend,
+}
+
+
+def get_backend(name: str) -> SessionBackend:
+    """Create the configured session backend"""
+    if name == "memory":
+        return MemorySessionBackend(max_sessions=settings.session_memory_max_sessions)
+    return BACKENDS[name]()
@@ -0,0 +1,124 @@
+"""Per-process cache of deserialized sessions"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import structlog
+
+from app.models import Session
+
+logger = structlog.get_logger()
+
+
+class _CacheEntry:
+    """A cached session with its bookkeeping"""
+
+    __slots__ = ("session", "size", "cached_at")
+
+    def __init__(self, session: Session, size: int):
+        self.session = session
+        self.size = size
+        self.cached_at = time.monotonic()
+
+
+class SessionCache:
+    """LRU of Session objects bounded by entries, approximate bytes and age
+
+    Sessions are checked out: a hit removes the entry, so a request owns its
+    Session object exclusively and concurrent requests on the same worker
+    never share one. The unit of work checks the session back in when the
+    request ends cleanly. Entries carry the stored version they were read or
+    written at; SessionManager compares it with the version in Redis before
+    trusting a hit, which keeps workers coherent.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        """Initialize limits (max_entries 0 disables the cache)"""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache holds anything at all"""
+        return self.max_entries > 0
+
+    def _estimate_size(self, session: Session) -> int:
+        """Approximate memory footprint from the stored representation"""
+        size = len(session._stored_meta or b"")
+        size += sum(len(payload) for payload in session._stored_payloads.values())
+        # Message text plus per-object overhead
+        size += sum(len(message.content) + 200 for message in session.conversation_history)
+        return size
+
+    def _remove(self, session_id: str) -> Optional[_CacheEntry]:
+        """Drop an entry and its size from the totals"""
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def check_out(self, session_id: str) -> Optional[Session]:
+        """Take a session out of the cache, if present and fresh"""
+        entry = self._remove(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry.cached_at > self.ttl:
+            self.misses += 1
+            self.evictions += 1
+            return None
+        return entry.session
+
+    def record_hit(self) -> None:
+        """Count a checked-out session whose version matched storage"""
+        self.hits += 1
+
+    def record_stale(self) -> None:
+        """Count a checked-out session that another worker had updated"""
+        self.stale += 1
+
+    def check_in(self, session: Session) -> None:
+        """Return a session that matches storage to the cache"""
+        if not self.enabled or session._stored_version <= 0:
+            return
+
+        size = self._estimate_size(session)
+        if size > self.max_bytes:
+            return
+
+        self._remove(session.session_id)
+        self._entries[session.session_id] = _CacheEntry(session, size)
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """Forget a session (deleted or known to be outdated)"""
+        self._remove(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit counters"""
+        lookups = self.hits + self.misses + self.stale
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
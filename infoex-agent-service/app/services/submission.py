@@ -0,0 +1,313 @@
+"""InfoEx submission of session payloads, inline or through a background queue
+
+submit_payloads builds, validates and submits payloads of a loaded session
+and records the outcomes on it. With SUBMISSION_MODE=queued the routes only
+enqueue a job and return its ID: workers in every process drain a
+consumer-group stream in the session backend, write the outcomes back to
+the session and keep the job status for /api/jobs/{job_id}.
+
+A job stays pending in the stream until a worker finishes it, so a job held
+by a worker that crashed or hung is taken over by another worker once it
+has been idle for SUBMISSION_CLAIM_IDLE_SECONDS. Payloads already marked
+submitted on the session are not sent again when a job is picked up twice.
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import structlog
+
+from app.config import settings
+from app.models import Session, SubmissionJob
+from app.services.archive import session_archiver
+from app.services.infoex import infoex_client
+from app.services.payload import payload_builder
+from app.services.session import SessionManager, session_manager
+
+logger = structlog.get_logger()
+
+# Consumer group shared by the workers of every process
+WORKER_GROUP = "submitters"
+
+
+async def submit_payloads(
+    session: Session,
+    payload_keys: List[str],
+    submission_state: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Build, validate and submit session payloads, recording the outcomes on the session
+
+    Valid payloads go to InfoEx as one concurrent batch. Returns one result
+    per payload key, in order: validation failures carry "errors", and
+    submissions carry the InfoEx "result" and "elapsed_ms".
+    """
+    built = {}
+    validation_errors = {}
+    for key in payload_keys:
+        payload, errors = payload_builder.build_payload(key, session, submission_state)
+        if errors:
+            validation_errors[key] = errors
+        else:
+            built[key] = payload
+
+    submitted = {}
+    if built:
+        batch = await infoex_client.submit_multiple([
+            (session.payloads[key].observation_type, payload)
+            for key, payload in built.items()
+        ])
+        submitted = dict(zip(built, batch["submissions"]))
+
+    results = []
+    for key in payload_keys:
+        if key in validation_errors:
+            results.append({"observation_type": key, "success": False, "errors": validation_errors[key]})
+            continue
+
+        submission = submitted[key]
+        result = submission["result"]
+        payload_status = session.payloads[key]
+        payload_status.infoex_response = result
+        if submission["success"]:
+            payload_status.status = "submitted"
+            payload_status.infoex_uuid = result.get("uuid")
+        results.append({
+            "observation_type": key,
+            "success": submission["success"],
+            "result": result,
+            "elapsed_ms": submission["elapsed_ms"],
+        })
+    return results
+
+
+class SubmissionQueue:
+    """Durable queue of InfoEx submission jobs and the workers that drain it"""
+
+    def __init__(self, manager: SessionManager):
+        """Initialize without workers"""
+        self.manager = manager
+        self.workers: List[asyncio.Task] = []
+        # How long an idle worker waits on the stream before checking for stale jobs
+        self.block_ms = 5000
+
+        # Metrics
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.redelivered = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether submissions go through the queue"""
+        return settings.submission_mode == "queued"
+
+    def _get_stream_key(self) -> str:
+        """Stream of queued job IDs"""
+        prefix = settings.redis_session_prefix
+        return f"{prefix}:submissions:queue" if prefix else "submissions:queue"
+
+    def _get_job_key(self, job_id: str) -> str:
+        """Status of one job; expires after SUBMISSION_JOB_TTL_SECONDS"""
+        prefix = settings.redis_session_prefix
+        return f"{prefix}:job:{job_id}" if prefix else f"job:{job_id}"
+
+    async def _save_job(self, job: SubmissionJob) -> None:
+        """Store a job's status"""
+        job.updated_at = datetime.utcnow()
+        await self.manager.backend.kv_set(
+            self._get_job_key(job.job_id),
+            job.model_dump_json().encode("utf-8"),
+            settings.submission_job_ttl_seconds
+        )
+
+    async def get_job(self, job_id: str) -> Optional[SubmissionJob]:
+        """A job's status, or None if unknown or expired"""
+        raw = await self.manager.backend.kv_get(self._get_job_key(job_id))
+        return SubmissionJob.model_validate_json(raw) if raw is not None else None
+
+    async def enqueue(
+        self,
+        session_id: str,
+        payload_keys: List[str],
+        submission_state: Optional[str] = None
+    ) -> SubmissionJob:
+        """Queue the submission of session payloads; returns the new job"""
+        job = SubmissionJob(
+            job_id=str(uuid.uuid4()),
+            session_id=session_id,
+            payload_keys=payload_keys,
+            submission_state=submission_state
+        )
+        await self._save_job(job)
+        await self.manager.backend.stream_add(self._get_stream_key(), {"job_id": job.job_id.encode("utf-8")})
+        self.enqueued += 1
+        logger.info("submission_job_queued",
+                   job_id=job.job_id,
+                   session_id=session_id,
+                   payload_keys=payload_keys)
+        return job
+
+    async def _run_job(self, job: SubmissionJob) -> bool:
+        """Submit a job's payloads and record the outcome; returns whether the job is finished
+
+        A job that hit an open InfoEx circuit breaker, or content still being
+        submitted by another request, is left unfinished, so it is picked up
+        again once it has been idle for the claim interval.
+        """
+        async with self.manager.unit_of_work(job.session_id) as uow:
+            session = await uow.load()
+            if session is None:
+                job.status = "failed"
+                job.success = False
+                job.message = "Session not found"
+                return True
+
+            # Payloads submitted by an earlier delivery (or another request) are not sent again
+            to_submit = [
+                key for key in job.payload_keys
+                if key in session.payloads and session.payloads[key].status != "submitted"
+            ]
+            results = dict(zip(to_submit, await submit_payloads(session, to_submit, job.submission_state)))
+            await uow.commit(conflict_policy="merge")
+
+        submissions = []
+        for key in job.payload_keys:
+            if key in results:
+                submissions.append(results[key])
+            elif key in session.payloads:
+                submissions.append({
+                    "observation_type": key,
+                    "success": True,
+                    "result": session.payloads[key].infoex_response,
+                    "already_submitted": True,
+                })
+            else:
+                submissions.append({"observation_type": key, "success": False, "errors": ["Not initialized in session"]})
+        job.submissions = submissions
+
+        await session_archiver.enqueue_if_complete(session)
+
+        deferred = any(
+            (submission.get("result") or {}).get("status") in ("circuit_open", "in_progress")
+            for submission in submissions
+        )
+        if deferred and job.attempts < settings.submission_max_deliveries:
+            job.status = "queued"
+            job.message = "InfoEx is unavailable or the content is being submitted elsewhere; the job will be retried"
+            return False
+
+        failed = sum(1 for submission in submissions if not submission["success"])
+        job.status = "completed"
+        job.success = failed == 0
+        job.message = f"Processed {len(submissions)} submissions. " + (f"{failed} failed." if failed else "All successful!")
+        return True
+
+    async def process(self, entry_id: str, fields: Dict[str, bytes]) -> None:
+        """Run one delivered job, acknowledging it once it is finished"""
+        backend = self.manager.backend
+        stream_key = self._get_stream_key()
+        job = await self.get_job(fields["job_id"].decode("utf-8"))
+        if job is None or job.status in ("completed", "failed"):
+            # Expired, or finished by a worker that died before acknowledging
+            await backend.stream_ack(stream_key, WORKER_GROUP, [entry_id])
+            return
+
+        job.attempts += 1
+        if job.attempts > 1:
+            self.redelivered += 1
+        if job.attempts > settings.submission_max_deliveries:
+            job.status = "failed"
+            job.success = False
+            job.message = f"Gave up after {job.attempts - 1} attempts"
+            await self._save_job(job)
+            await backend.stream_ack(stream_key, WORKER_GROUP, [entry_id])
+            self.failed += 1
+            logger.error("submission_job_abandoned", job_id=job.job_id, attempts=job.attempts - 1)
+            return
+
+        job.status = "running"
+        await self._save_job(job)
+        try:
+            finished = await self._run_job(job)
+        except Exception as e:
+            # Left pending; taken over again after the claim interval
+            job.status = "queued"
+            job.message = f"Attempt {job.attempts} failed: {e}"
+            await self._save_job(job)
+            logger.error("submission_job_error", job_id=job.job_id, attempt=job.attempts, error=str(e))
+            return
+
+        await self._save_job(job)
+        if not finished:
+            logger.warning("submission_job_deferred", job_id=job.job_id, attempt=job.attempts)
+            return
+        await backend.stream_ack(stream_key, WORKER_GROUP, [entry_id])
+        if job.success:
+            self.completed += 1
+        else:
+            self.failed += 1
+        logger.info("submission_job_finished",
+                   job_id=job.job_id,
+                   session_id=job.session_id,
+                   status=job.status,
+                   success=job.success,
+                   attempts=job.attempts)
+
+    async def _work(self, consumer: str) -> None:
+        """Worker loop: take over stale jobs first, otherwise wait for new ones"""
+        backend = self.manager.backend
+        stream_key = self._get_stream_key()
+        claim_idle_ms = int(settings.submission_claim_idle_seconds * 1000)
+        while True:
+            try:
+                entries = await backend.stream_claim(stream_key, WORKER_GROUP, consumer, claim_idle_ms, 1)
+                if not entries:
+                    entries = await backend.stream_read(stream_key, WORKER_GROUP, consumer, 1, self.block_ms)
+                for entry_id, fields in entries:
+                    await self.process(entry_id, fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("submission_worker_error", consumer=consumer, error=str(e))
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        """Start this process's workers (queued mode only)"""
+        if not self.enabled or self.workers:
+            return
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.workers = [
+            asyncio.create_task(self._work(f"{prefix}:{n}"))
+            for n in range(settings.submission_workers)
+        ]
+        logger.info("submission_workers_started", workers=len(self.workers))
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they held are taken over by other workers"""
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue depth and job totals of this process"""
+        stats = {
+            "mode": settings.submission_mode,
+            "workers": len(self.workers),
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "redelivered": self.redelivered,
+        }
+        if self.enabled:
+            length, pending = await self.manager.backend.stream_info(self._get_stream_key(), WORKER_GROUP)
+            stats["queued"] = length - pending
+            stats["in_progress"] = pending
+        return stats
+
+
+# Create singleton instance
+submission_queue = SubmissionQueue(session_manager)
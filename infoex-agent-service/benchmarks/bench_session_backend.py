@@ -0,0 +1,76 @@
+"""Benchmark a conversation turn against the session storage backend
+
+Each turn is what a /api/process-report request does to its session: load
+it through a unit of work, append a user and an assistant message, update
+one payload and commit. Runs against the in-process memory backend, so no
+Redis is needed; set SESSION_BACKEND=redis (and REDIS_URL) to compare.
+
+Run from infoex-agent-service/:
+    python benchmarks/bench_session_backend.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Settings require these; the benchmark never calls Claude or InfoEx
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+os.environ.setdefault("OPERATION_UUID", "benchmark")
+os.environ.setdefault("STAGING_API_KEY", "benchmark")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+from app.models import ConversationMessage, PayloadStatus, RequestValues  # noqa: E402
+from app.services.session import SessionManager  # noqa: E402
+
+SESSIONS = 20
+TURNS = 25
+
+
+async def run_turn(manager: SessionManager, session_id: str, turn: int) -> None:
+    """One request's worth of session work"""
+    async with manager.unit_of_work(session_id) as uow:
+        session = await uow.get_or_create(RequestValues(
+            operation_id="op-uuid",
+            location_uuids=["loc-1"],
+            zone_name="Benchmark Zone",
+            date="01/20/2024"
+        ))
+        session.conversation_history.append(ConversationMessage(role="user", content=f"Turn {turn}: size 2 slab, north aspect"))
+        session.conversation_history.append(ConversationMessage(role="assistant", content="Recorded. What was the trigger?"))
+        session.payloads["avalanche_observation"] = PayloadStatus(
+            observation_type="avalanche_observation",
+            status="incomplete",
+            data={"size": "2", "aspectFrom": "N", "turn": turn},
+            missing_fields=["trigger"]
+        )
+
+
+async def main():
+    manager = SessionManager()
+    await manager.connect()
+
+    latencies = []
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        for i in range(SESSIONS):
+            t0 = time.perf_counter()
+            await run_turn(manager, f"bench-{i}", turn)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    for i in range(SESSIONS):
+        await manager.delete_session(f"bench-{i}")
+    await manager.disconnect()
+
+    latencies.sort()
+    print(f"Backend {manager.backend.name}: {SESSIONS} sessions x {TURNS} turns")
+    print(f"turns/s {len(latencies) / elapsed:10.0f}")
+    print(f"p50 ms  {latencies[len(latencies) // 2] * 1e3:10.3f}")
+    print(f"p99 ms  {latencies[int(len(latencies) * 0.99)] * 1e3:10.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""Benchmark session (de)serialization on 50-message sessions
+
+Compares the original stdlib json path (hand-converted datetimes, one blob,
+Session(**data)) with each serializer backend round-tripping the stored
+meta/history/payload parts. "turn save" is what a typical turn serializes
+with incremental storage: meta, the two new messages and one payload; the
+legacy path re-serializes the whole session every time.
+
+Run from infoex-agent-service/:
+    python benchmarks/bench_session_serialization.py
+"""
+
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Settings require these; the benchmark never talks to any service
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+os.environ.setdefault("OPERATION_UUID", "benchmark")
+
+from app.models import ConversationMessage, PayloadStatus, RequestValues, Session  # noqa: E402
+from app.services.serialization import SERIALIZERS  # noqa: E402
+
+MESSAGES = 50
+ROUNDS = 200
+
+
+def build_session(messages: int = MESSAGES) -> Session:
+    """A session shaped like a long n8n report conversation"""
+    start = datetime(2024, 1, 20, 8, 0, 0)
+    history = []
+    for i in range(messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        content = (
+            "Size 2.5 slab on a north aspect at 2100m, crown 80cm, ran 300m to the "
+            "fan. Trigger natural, likely wind loading overnight. " * 4
+        )
+        history.append(ConversationMessage(role=role, content=content, timestamp=start + timedelta(minutes=i)))
+
+    payloads = {
+        "avalanche_observation": PayloadStatus(
+            observation_type="avalanche_observation",
+            status="incomplete",
+            data={
+                "obTime": "08:30", "size": "2.5", "trigger": "Na", "character": "STORM_SLAB",
+                "aspectFrom": "N", "aspectTo": "NE", "elevationMin": 2000, "elevationMax": 2200,
+                "comments": "Crown 80cm, ran to fan"
+            },
+            missing_fields=["obTime", "numberOfAvalanches"]
+        ),
+        "field_summary": PayloadStatus(
+            observation_type="field_summary",
+            status="ready",
+            data={"tempHigh": -4, "tempLow": -12, "comments": "Clearing in the afternoon"}
+        ),
+    }
+
+    return Session(
+        session_id="benchmark-session",
+        created_at=start,
+        last_updated=start + timedelta(minutes=messages),
+        request_values=RequestValues(
+            operation_id="op-uuid",
+            location_uuids=["loc-1", "loc-2"],
+            zone_name="Benchmark Zone",
+            date="01/20/2024"
+        ),
+        conversation_history=history,
+        payloads=payloads,
+        metadata={"n8n_context": "benchmark"}
+    )
+
+
+def legacy_dumps(session: Session) -> str:
+    """The original save_session serialization"""
+    session_dict = session.model_dump()
+    session_dict['created_at'] = session.created_at.isoformat()
+    session_dict['last_updated'] = session.last_updated.isoformat()
+    for msg in session_dict.get('conversation_history', []):
+        if 'timestamp' in msg and isinstance(msg['timestamp'], datetime):
+            msg['timestamp'] = msg['timestamp'].isoformat()
+    return json.dumps(session_dict)
+
+
+def legacy_loads(data: str) -> Session:
+    """The original get_session deserialization"""
+    session_data = json.loads(data)
+    session_data['created_at'] = datetime.fromisoformat(session_data['created_at'])
+    session_data['last_updated'] = datetime.fromisoformat(session_data['last_updated'])
+    for msg in session_data.get('conversation_history', []):
+        if 'timestamp' in msg:
+            msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
+    return Session(**session_data)
+
+
+def time_per_call(func) -> float:
+    """Best-of-5 microseconds per call"""
+    return min(timeit.repeat(func, number=ROUNDS, repeat=5)) / ROUNDS * 1e6
+
+
+def main():
+    session = build_session()
+    results = {}
+
+    blob = legacy_dumps(session).encode("utf-8")
+    legacy_dump = time_per_call(lambda: legacy_dumps(session).encode("utf-8"))
+    results["legacy json"] = (
+        legacy_dump,
+        time_per_call(lambda: legacy_loads(blob.decode("utf-8"))),
+        legacy_dump
+    )
+
+    for name, serializer_cls in SERIALIZERS.items():
+        serializer = serializer_cls()
+        exclude = {"conversation_history", "payloads"}
+
+        def dump_all():
+            return (
+                serializer.dumps(session, exclude=exclude),
+                [serializer.dumps(message) for message in session.conversation_history],
+                {key: serializer.dumps(payload) for key, payload in session.payloads.items()}
+            )
+
+        def dump_turn():
+            return (
+                serializer.dumps(session, exclude=exclude),
+                [serializer.dumps(message) for message in session.conversation_history[-2:]],
+                serializer.dumps(session.payloads["avalanche_observation"])
+            )
+
+        meta, history, payloads = dump_all()
+        assert serializer.load_session(meta, history, payloads) == session
+        results[name] = (
+            time_per_call(dump_all),
+            time_per_call(lambda: serializer.load_session(meta, history, payloads)),
+            time_per_call(dump_turn)
+        )
+
+    baseline_dump, baseline_load, baseline_turn = results["legacy json"]
+    print(f"Session with {MESSAGES} messages, {ROUNDS} rounds, best of 5 (microseconds per call)")
+    print(f"{'backend':<14}{'dump':>10}{'load':>10}{'round trip':>12}{'speedup':>10}{'turn save':>12}{'speedup':>10}")
+    for name, (dump, load, turn) in results.items():
+        speedup = (baseline_dump + baseline_load) / (dump + load)
+        print(f"{name:<14}{dump:>10.1f}{load:>10.1f}{dump + load:>12.1f}{speedup:>9.2f}x"
+              f"{turn:>12.1f}{baseline_turn / turn:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Shared fixtures
+
+Settings are read from the environment when app.config is first imported,
+so the required values are filled in here before any test imports the app.
+Tests run against the in-process memory session backend.
+"""
+
+import os
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-anthropic-key")
+os.environ.setdefault("OPERATION_UUID", "test-operation")
+os.environ.setdefault("STAGING_API_KEY", "test-infoex-key")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+import pytest
+import pytest_asyncio
+
+from app.models import RequestValues
+from app.services.session import SessionManager, session_manager
+from app.services import session_backend
+from app.services.session_backend import MemorySessionBackend
+
+
+@pytest.fixture
+def request_values() -> RequestValues:
+    """Request values of a typical report"""
+    return RequestValues(
+        operation_id="test-operation",
+        location_uuids=["location-1"],
+        zone_name="Test Zone",
+        date="01/15/2025"
+    )
+
+
+@pytest_asyncio.fixture
+async def manager():
+    """A session manager on its own memory backend"""
+    manager = SessionManager(MemorySessionBackend())
+    await manager.connect()
+    yield manager
+    await manager.disconnect()
+
+
+@pytest_asyncio.fixture
+async def shared_manager():
+    """The app's session manager, connected (services that use the singleton need it)"""
+    await session_manager.connect()
+    yield session_manager
+    await session_manager.disconnect()
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """A fake Redis server shared by every connection the Redis backend makes"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        session_backend.redis,
+        "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server, **kwargs)
+    )
+    return server
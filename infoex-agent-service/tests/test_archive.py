@@ -0,0 +1,154 @@
+"""Archival of sessions into report_capsules rows"""
+
+import base64
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import ConversationMessage, PayloadStatus
+from app.services.archive import TRANSCRIPT_REPORT_TYPE, SessionArchiver
+
+# Columns of an upserted capsule row
+REPORT_TYPE, SEQUENCE, SUBMISSION_STATUS, METADATA = 2, 3, 14, 20
+
+
+class FakeConnection:
+    """asyncpg connection that records upserted rows"""
+
+    def __init__(self):
+        self.rows = []
+        self.failing_sessions = set()
+
+    def transaction(self):
+        return _Context(None)
+
+    async def executemany(self, sql, rows):
+        for row in rows:
+            if json.loads(row[METADATA])["session_id"] in self.failing_sessions:
+                raise ValueError("invalid row")
+        self.rows.extend(rows)
+
+
+class FakePool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def acquire(self):
+        return _Context(self.connection)
+
+
+class _Context:
+    def __init__(self, value):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def connection():
+    return FakeConnection()
+
+
+@pytest.fixture
+def archiver(manager, connection):
+    archiver = SessionArchiver(manager)
+    archiver.pool = FakePool(connection)
+    return archiver
+
+
+async def _session(manager, request_values, session_id, statuses):
+    session = manager.new_session(request_values, session_id)
+    session.conversation_history.append(ConversationMessage(role="user", content="Two slides off the ridge"))
+    for key, status in statuses.items():
+        session.payloads[key] = PayloadStatus(observation_type=key.split("#")[0], status=status)
+    await manager.save_session(session)
+    return session
+
+
+def _metadata(row):
+    return json.loads(row[METADATA])
+
+
+def _transcript(row):
+    return json.loads(gzip.decompress(base64.b64decode(_metadata(row)["transcript_gzip_base64"])))
+
+
+@pytest.mark.asyncio
+async def test_completed_session_becomes_one_row_per_payload(manager, request_values, archiver, connection):
+    session = await _session(manager, request_values, "done", {
+        "avalanche_observation": "submitted",
+        "avalanche_observation#2": "submitted",
+    })
+    await archiver.enqueue_if_complete(session)
+
+    assert await archiver.run_pass() == 1
+
+    first, second = connection.rows
+    assert [row[SEQUENCE] for row in connection.rows] == [1, 2]
+    assert {row[SUBMISSION_STATUS] for row in connection.rows} == {"submitted"}
+    assert _transcript(first)["conversation_history"][0]["content"] == "Two slides off the ridge"
+    assert _metadata(second)["transcript_capsule_uuid"] == str(first[0])
+    # Completed sessions leave hot storage soon after
+    assert await manager.backend.session_ttl("done") <= archiver.completed_ttl
+
+
+@pytest.mark.asyncio
+async def test_unchanged_session_is_not_written_again(manager, request_values, archiver, connection):
+    session = await _session(manager, request_values, "done", {"field_summary": "submitted"})
+    await archiver.enqueue_if_complete(session)
+    await archiver.run_pass()
+    connection.rows.clear()
+
+    await archiver.enqueue(["done"])
+
+    assert await archiver.run_pass() == 0
+    assert connection.rows == []
+
+
+@pytest.mark.asyncio
+async def test_session_without_payloads_keeps_its_transcript(manager, request_values, archiver, connection):
+    await _session(manager, request_values, "chat-only", {})
+    await archiver.enqueue(["chat-only"])
+
+    await archiver.run_pass()
+
+    [row] = connection.rows
+    assert row[REPORT_TYPE] == TRANSCRIPT_REPORT_TYPE
+    assert _transcript(row)["session_id"] == "chat-only"
+
+
+@pytest.mark.asyncio
+async def test_failed_session_is_queued_again(manager, request_values, archiver, connection):
+    for session_id in ("good", "bad"):
+        await _session(manager, request_values, session_id, {"field_summary": "submitted"})
+    connection.failing_sessions.add("bad")
+    await archiver.enqueue(["good", "bad"])
+
+    assert await archiver.archive_batch() == 1
+    assert [_metadata(row)["session_id"] for row in connection.rows] == ["good"]
+    assert archiver.failures == 1
+
+    connection.failing_sessions.clear()
+    assert await archiver.archive_batch() == 1
+    assert _metadata(connection.rows[-1])["session_id"] == "bad"
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_queued_once(manager, request_values, archiver, connection):
+    session = manager.new_session(request_values, "idle")
+    session.last_updated = datetime.utcnow() - timedelta(seconds=manager.ttl)
+    session.payloads["field_summary"] = PayloadStatus(observation_type="field_summary", status="incomplete")
+    await manager.save_session(session)
+
+    assert await archiver.enqueue_expiring() == 1
+    assert await archiver.enqueue_expiring() == 0
+
+    await archiver.archive_batch()
+    [row] = connection.rows
+    assert row[SUBMISSION_STATUS] == "pending"
@@ -0,0 +1,138 @@
+"""Key-value, queue and stream primitives of both session backends"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.services import submission
+from app.services.session import SessionManager
+from app.services.session_backend import MemorySessionBackend, RedisSessionBackend
+from app.services.submission import WORKER_GROUP, SubmissionQueue
+
+STREAM = "submissions:queue"
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def backend(request):
+    """Each backend in turn, connected"""
+    if request.param == "redis":
+        request.getfixturevalue("redis_server")
+        backend = RedisSessionBackend()
+    else:
+        backend = MemorySessionBackend()
+    await backend.connect()
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_value_is_only_set_if_absent_when_asked(backend):
+    assert await backend.kv_set("claim", b"first", 60, only_if_absent=True)
+    assert not await backend.kv_set("claim", b"second", 60, only_if_absent=True)
+    assert await backend.kv_get_many(["claim", "missing"]) == [b"first", None]
+
+    assert await backend.kv_delete("claim")
+    assert await backend.kv_get("claim") is None
+
+
+@pytest.mark.asyncio
+async def test_queue_pops_oldest_members_once(backend):
+    await backend.queue_add("archive", ["a", "b"])
+    await backend.queue_add("archive", ["c", "a"])
+
+    assert await backend.queue_pop("archive", 2) == ["a", "b"]
+    assert await backend.queue_pop("archive", 2) == ["c"]
+    assert await backend.queue_pop("archive", 2) == []
+
+
+@pytest.mark.asyncio
+async def test_stream_entry_is_delivered_to_one_consumer(backend):
+    entry_id = await backend.stream_add(STREAM, {"job_id": b"job-1"})
+
+    assert await backend.stream_read(STREAM, WORKER_GROUP, "worker-a", 10, 0) == [(entry_id, {"job_id": b"job-1"})]
+    assert await backend.stream_read(STREAM, WORKER_GROUP, "worker-b", 10, 0) == []
+    assert (await backend.stream_info(STREAM, WORKER_GROUP))[1] == 1
+
+
+@pytest.mark.asyncio
+async def test_blocked_read_wakes_for_a_new_entry():
+    # fakeredis does not block on XREADGROUP, so only the memory backend is checked
+    backend = MemorySessionBackend()
+    await backend.stream_read(STREAM, WORKER_GROUP, "worker-a", 1, 0)
+    reading = asyncio.create_task(backend.stream_read(STREAM, WORKER_GROUP, "worker-a", 1, 2000))
+    await asyncio.sleep(0.05)
+
+    entry_id = await backend.stream_add(STREAM, {"job_id": b"job-1"})
+
+    assert [delivered for delivered, _ in await asyncio.wait_for(reading, 1)] == [entry_id]
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_claimed_until_acknowledged(backend):
+    entry_id = await backend.stream_add(STREAM, {"job_id": b"job-1"})
+    await backend.stream_read(STREAM, WORKER_GROUP, "worker-a", 1, 0)
+
+    assert await backend.stream_claim(STREAM, WORKER_GROUP, "worker-b", 60_000, 1) == []
+    claimed = await backend.stream_claim(STREAM, WORKER_GROUP, "worker-b", 0, 1)
+    assert [claimed_id for claimed_id, _ in claimed] == [entry_id]
+
+    await backend.stream_ack(STREAM, WORKER_GROUP, [entry_id])
+
+    assert await backend.stream_claim(STREAM, WORKER_GROUP, "worker-b", 0, 1) == []
+    assert await backend.stream_info(STREAM, WORKER_GROUP) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used_sessions(request_values):
+    manager = SessionManager(MemorySessionBackend(max_sessions=2))
+    await manager.connect()
+    for session_id in ("oldest", "touched", "newest"):
+        await manager.create_session(request_values, session_id)
+        if session_id == "touched":
+            await manager.backend.read_sessions(["oldest"], manager.ttl, renew=False)
+
+    assert await manager.backend.session_ttl("touched") == 0
+    assert await manager.backend.session_ttl("oldest") > 0
+    assert manager.backend.stats()["evictions"] == 1
+    assert await manager.backend.index_count() == 2
+    await manager.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_drops_expired_sessions(manager, request_values):
+    await manager.create_session(request_values, "short")
+
+    assert await manager.backend.expire_session("short", 0)
+
+    assert await manager.get_session("short") is None
+    assert await manager.backend.read_version("short", manager.ttl, renew=False) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_worker_drains_the_queue(manager, request_values, monkeypatch):
+    monkeypatch.setattr(submission.settings, "submission_mode", "queued")
+    monkeypatch.setattr(submission.settings, "submission_workers", 1)
+    submitted = asyncio.Event()
+
+    async def submit_payloads(session, payload_keys, submission_state=None):
+        submitted.set()
+        return [{"observation_type": key, "success": True, "result": {}} for key in payload_keys]
+
+    monkeypatch.setattr(submission, "submit_payloads", submit_payloads)
+    queue = SubmissionQueue(manager)
+    await manager.create_session(request_values, "queued")
+    job = await queue.enqueue("queued", ["field_summary"])
+
+    await queue.start()
+    try:
+        await asyncio.wait_for(submitted.wait(), 1)
+        for _ in range(50):
+            if (await queue.get_job(job.job_id)).status == "completed":
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert (await queue.get_job(job.job_id)).status == "completed"
+    assert (await queue.stats())["in_progress"] == 0
@@ -0,0 +1,43 @@
+"""Compression of stored session values"""
+
+import orjson
+
+from app.services.compression import ZLIB_MARKER, SessionCompressor
+
+LARGE = orjson.dumps({"content": "Wind slab on north aspects near ridgetop. " * 100})
+
+
+def test_large_values_round_trip():
+    compressor = SessionCompressor(algorithm="zlib", threshold=1024)
+
+    packed = compressor.compress(LARGE)
+
+    assert packed.startswith(ZLIB_MARKER)
+    assert len(packed) < len(LARGE)
+    assert compressor.decompress(packed) == LARGE
+
+
+def test_small_values_are_stored_plain():
+    compressor = SessionCompressor(algorithm="zlib", threshold=1024)
+    small = orjson.dumps({"content": "ok"})
+
+    assert compressor.compress(small) == small
+
+
+def test_none_disables_compression():
+    compressor = SessionCompressor(algorithm="none", threshold=0)
+
+    assert compressor.compress(LARGE) == LARGE
+
+
+def test_values_written_before_compression_read_unchanged():
+    compressor = SessionCompressor(algorithm="zlib", threshold=0)
+
+    assert compressor.decompress(LARGE) == LARGE
+
+
+def test_incompressible_values_are_stored_plain():
+    compressor = SessionCompressor(algorithm="zlib", threshold=0)
+    noise = bytes(range(256))
+
+    assert compressor.compress(noise) == noise
@@ -0,0 +1,145 @@
+"""Deduplication of InfoEx submissions through the submission ledger"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.infoex import InfoExClient
+from app.services.ledger import SubmissionInProgress, SubmissionLedger, submission_ledger
+
+PAYLOAD = {"obDate": "01/15/2025", "tempHigh": -3, "comments": "Cold and clear"}
+
+
+@pytest.fixture
+def ledger(shared_manager):
+    """A ledger on the connected memory backend that does not wait long"""
+    ledger = SubmissionLedger()
+    ledger.wait_timeout = 0.05
+    ledger.poll_interval = 0.01
+    return ledger
+
+
+def test_content_key_ignores_key_order():
+    ledger = SubmissionLedger()
+    reordered = dict(reversed(list(PAYLOAD.items())))
+
+    assert ledger.content_key("field_summary", PAYLOAD) == ledger.content_key("field_summary", reordered)
+    assert ledger.content_key("field_summary", PAYLOAD) != ledger.content_key("avalanche_summary", PAYLOAD)
+    assert ledger.content_key("field_summary", PAYLOAD) != ledger.content_key(
+        "field_summary", {**PAYLOAD, "comments": "Warming"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_completed_submission_is_returned_for_identical_content(ledger):
+    key = ledger.content_key("field_summary", PAYLOAD)
+
+    assert await ledger.begin(key) is None
+    await ledger.complete(key, {"uuid": "infoex-1"})
+
+    assert await ledger.begin(key) == {"uuid": "infoex-1"}
+    assert ledger.stats()["duplicates"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pending_submission_answers_in_progress_after_a_short_wait(ledger):
+    key = ledger.content_key("field_summary", PAYLOAD)
+    assert await ledger.begin(key) is None
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with pytest.raises(SubmissionInProgress):
+        await ledger.begin(key)
+    assert loop.time() - started < 1.0
+
+
+@pytest.mark.asyncio
+async def test_waiting_submission_gets_the_result_once_recorded(ledger):
+    key = ledger.content_key("field_summary", PAYLOAD)
+    assert await ledger.begin(key) is None
+    ledger.wait_timeout = 1.0
+
+    waiting = asyncio.create_task(ledger.begin(key))
+    await asyncio.sleep(0.02)
+    await ledger.complete(key, {"uuid": "infoex-1"})
+
+    assert await waiting == {"uuid": "infoex-1"}
+
+
+@pytest.mark.asyncio
+async def test_released_submission_can_be_claimed_again(ledger):
+    key = ledger.content_key("field_summary", PAYLOAD)
+    assert await ledger.begin(key) is None
+
+    await ledger.release(key)
+
+    assert await ledger.begin(key) is None
+
+
+@pytest.mark.asyncio
+async def test_ledger_is_skipped_without_a_connected_backend():
+    ledger = SubmissionLedger()
+    key = ledger.content_key("field_summary", PAYLOAD)
+
+    assert not ledger.enabled
+    assert await ledger.begin(key) is None
+    assert await ledger.begin(key) is None
+
+
+@pytest.mark.asyncio
+async def test_identical_observation_is_posted_once(shared_manager):
+    posts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        posts.append(request.url.path)
+        return httpx.Response(200, json={"uuid": f"infoex-{len(posts)}"})
+
+    client = InfoExClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        first_ok, first = await client.submit_observation("field_summary", PAYLOAD)
+        second_ok, second = await client.submit_observation("field_summary", dict(PAYLOAD))
+        changed_ok, changed = await client.submit_observation("field_summary", {**PAYLOAD, "comments": "Warming"})
+    finally:
+        await client.close()
+
+    assert first_ok and second_ok and changed_ok
+    assert len(posts) == 2
+    assert second["uuid"] == first["uuid"] and second["deduplicated"]
+    assert changed["uuid"] != first["uuid"]
+
+
+@pytest.mark.asyncio
+async def test_failed_observation_is_posted_again(shared_manager):
+    responses = [httpx.Response(400, json={"message": "invalid"}), httpx.Response(200, json={"uuid": "infoex-1"})]
+
+    client = InfoExClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+    try:
+        failed_ok, _ = await client.submit_observation("field_summary", PAYLOAD)
+        retried_ok, retried = await client.submit_observation("field_summary", PAYLOAD)
+    finally:
+        await client.close()
+
+    assert not failed_ok
+    assert retried_ok and retried["uuid"] == "infoex-1"
+    assert not responses
+
+
+@pytest.mark.asyncio
+async def test_submission_succeeds_when_the_ledger_cannot_record_it(shared_manager, monkeypatch):
+    async def unavailable(key, result):
+        raise ConnectionError("storage unavailable")
+
+    monkeypatch.setattr(submission_ledger, "complete", unavailable)
+    client = InfoExClient()
+    client.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"uuid": "infoex-1"}))
+    )
+    try:
+        ok, result = await client.submit_observation("field_summary", PAYLOAD)
+    finally:
+        await client.close()
+
+    assert ok and result["uuid"] == "infoex-1"
@@ -0,0 +1,119 @@
+"""Routing of extracted observations to session payloads"""
+
+from types import SimpleNamespace as NS
+
+import pytest
+
+from app.agent.claude_agent import ClaudeAgent
+from app.agent.tools import TARGET_KEY
+
+AVALANCHE = "avalanche_observation"
+
+
+@pytest.fixture(scope="module")
+def agent():
+    return ClaudeAgent()
+
+
+@pytest.fixture
+def session(manager, request_values):
+    return manager.new_session(request_values, "routing")
+
+
+def _record(*docs):
+    """A tool_use block per document, as Claude returns them in tools mode"""
+    return [NS(type="tool_use", name=f"record_{AVALANCHE}", input=doc) for doc in docs]
+
+
+def _reply(agent, session, content, message="Two slides off the ridge today"):
+    """Complete a turn with a canned Claude response"""
+    response = NS(content=content, usage=NS(input_tokens=100, output_tokens=20))
+    return agent._complete_turn(session, message, response)
+
+
+def test_several_observations_open_one_payload_each(agent, session):
+    _reply(agent, session, _record({"size": "2"}, {"size": "3"}))
+
+    assert list(session.payloads) == [AVALANCHE, f"{AVALANCHE}#2"]
+    assert session.payloads[AVALANCHE].data["size"] == "2"
+    assert session.payloads[f"{AVALANCHE}#2"].data["size"] == "3"
+
+
+def test_correction_goes_to_the_payload_it_names(agent, session):
+    _reply(agent, session, _record({"size": "2"}, {"size": "3"}))
+
+    _reply(agent, session, _record({"size": "2.5", TARGET_KEY: f"{AVALANCHE}#2"}), "The second one was bigger")
+
+    assert len(session.payloads) == 2
+    assert session.payloads[AVALANCHE].data["size"] == "2"
+    assert session.payloads[f"{AVALANCHE}#2"].data["size"] == "2.5"
+    assert TARGET_KEY not in session.payloads[f"{AVALANCHE}#2"].data
+
+
+def test_untargeted_observation_fills_the_open_payload(agent, session):
+    _reply(agent, session, _record({"size": "2"}))
+
+    _reply(agent, session, _record({"trigger": "Na"}), "It released naturally")
+
+    assert list(session.payloads) == [AVALANCHE]
+    assert session.payloads[AVALANCHE].data["trigger"] == "Na"
+
+
+def test_untargeted_observation_skips_payloads_targeted_in_the_same_turn(agent, session):
+    _reply(agent, session, _record({"size": "2"}))
+
+    _reply(agent, session, _record({"size": "2.5", TARGET_KEY: AVALANCHE}, {"size": "3"}))
+
+    assert session.payloads[AVALANCHE].data["size"] == "2.5"
+    assert session.payloads[f"{AVALANCHE}#2"].data["size"] == "3"
+
+
+def test_unknown_target_is_treated_as_untargeted(agent, session):
+    _reply(agent, session, _record({"size": "2"}))
+    session.payloads[AVALANCHE].status = "submitted"
+
+    _reply(agent, session, _record({"size": "3", TARGET_KEY: AVALANCHE}))
+
+    # A submitted payload is never changed
+    assert session.payloads[AVALANCHE].data["size"] == "2"
+    assert session.payloads[f"{AVALANCHE}#2"].data["size"] == "3"
+
+
+def test_recorded_fields_are_noted_in_history(agent, session):
+    response_text, _ = _reply(agent, session, _record({"size": "2", TARGET_KEY: AVALANCHE}))
+
+    assert response_text == f"Recorded data for: {AVALANCHE}"
+    assert session.conversation_history[-1].content == f"[Recorded {AVALANCHE}: size]"
+
+
+def test_json_blocks_route_to_their_payloads(agent, session, monkeypatch):
+    _reply(agent, session, _record({"size": "2"}, {"size": "3"}))
+    monkeypatch.setattr(agent, "use_tools", False)
+    text = (
+        "Updated both avalanches.\n"
+        "```json\n"
+        f'[{{"observation_type": "{AVALANCHE}", "{TARGET_KEY}": "{AVALANCHE}#2", "comments": "Wide propagation"}},'
+        f' {{"observation_type": "{AVALANCHE}", "{TARGET_KEY}": "{AVALANCHE}", "comments": "Small pocket"}}]\n'
+        "```"
+    )
+
+    _reply(agent, session, [NS(type="text", text=text)], "Add comments to both")
+
+    assert len(session.payloads) == 2
+    assert session.payloads[AVALANCHE].data["comments"] == "Small pocket"
+    assert session.payloads[f"{AVALANCHE}#2"].data["comments"] == "Wide propagation"
+
+
+def test_record_tools_accept_a_target(agent):
+    for tool in agent.extraction_tools:
+        assert tool["input_schema"]["properties"][TARGET_KEY]["type"] == "string"
+
+
+def test_unstructured_reply_updates_only_the_newest_payload(agent, session):
+    _reply(agent, session, _record({"size": "2"}, {"size": "3"}))
+
+    _reply(agent, session, [NS(type="text", text="Noted.")], "That one was size 2.5, skier triggered")
+
+    assert "trigger" not in session.payloads[AVALANCHE].data
+    assert session.payloads[f"{AVALANCHE}#2"].data["trigger"] == "Sa"
+    assert session.payloads[f"{AVALANCHE}#2"].data["sizeMax"] == 2.5
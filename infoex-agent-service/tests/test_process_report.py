@@ -0,0 +1,79 @@
+"""Replay of retried report requests and turns whose session is not saved"""
+
+from types import SimpleNamespace as NS
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import routes
+from app.models import ProcessReportRequest
+
+
+class FakeMessages:
+    """Claude messages API that counts calls and replies with plain text"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        return NS(
+            content=[NS(type="text", text=f"Reply {self.calls}")],
+            usage=NS(input_tokens=100, output_tokens=20)
+        )
+
+
+@pytest.fixture
+def claude(shared_manager, monkeypatch):
+    messages = FakeMessages()
+    monkeypatch.setattr(routes.claude_agent, "async_client", NS(messages=messages))
+    return messages
+
+
+def _request(request_values, message="Clear skies, light winds") -> ProcessReportRequest:
+    return ProcessReportRequest(
+        session_id="replayed",
+        message=message,
+        request_values=request_values,
+        auto_submit=False
+    )
+
+
+@pytest.mark.asyncio
+async def test_retry_with_the_same_key_is_replayed(claude, request_values):
+    first = await routes.process_report(_request(request_values), idempotency_key="execution-1")
+    retry = await routes.process_report(_request(request_values), idempotency_key="execution-1")
+
+    assert claude.calls == 1
+    assert retry.response == first.response == "Reply 1"
+    session = await routes.session_manager.get_session("replayed")
+    assert len(session.conversation_history) == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_without_a_key_are_not_replayed(claude, request_values):
+    await routes.process_report(_request(request_values), idempotency_key=None)
+    second = await routes.process_report(_request(request_values), idempotency_key=None)
+
+    assert claude.calls == 2
+    assert second.response == "Reply 2"
+
+
+@pytest.mark.asyncio
+async def test_unsaved_turn_is_not_replayed(claude, request_values, shared_manager, monkeypatch):
+    write_session = shared_manager.backend.write_session
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("storage unavailable")
+
+    monkeypatch.setattr(shared_manager.backend, "write_session", unavailable)
+    with pytest.raises(HTTPException) as excinfo:
+        await routes.process_report(_request(request_values), idempotency_key="execution-1")
+    assert excinfo.value.status_code == 503
+
+    # The retry runs the turn again once storage is back
+    monkeypatch.setattr(shared_manager.backend, "write_session", write_session)
+    retry = await routes.process_report(_request(request_values), idempotency_key="execution-1")
+
+    assert claude.calls == 2
+    assert retry.response == "Reply 2"
@@ -0,0 +1,173 @@
+"""Redis session layout and compare-and-set saves (on fakeredis)"""
+
+import pytest
+import pytest_asyncio
+
+from app.models import ConversationMessage, PayloadStatus
+from app.services.session import SessionConflictError, SessionManager
+from app.services.session_backend import RedisSessionBackend
+
+
+@pytest_asyncio.fixture
+async def workers(redis_server):
+    """Session managers of two workers sharing the Redis server"""
+    managers = [SessionManager(RedisSessionBackend()) for _ in range(2)]
+    for manager in managers:
+        await manager.connect()
+    yield managers
+    for manager in managers:
+        await manager.disconnect()
+
+
+def _message(content: str) -> ConversationMessage:
+    return ConversationMessage(role="user", content=content)
+
+
+@pytest.mark.asyncio
+async def test_session_parts_are_stored_under_separate_keys(workers, request_values):
+    manager, _ = workers
+    session = manager.new_session(request_values, "layout")
+    session.conversation_history.extend([_message("Clear skies"), _message("Light winds")])
+    session.payloads["field_summary"] = PayloadStatus(observation_type="field_summary", status="incomplete")
+    await manager.save_session(session)
+
+    backend = manager.backend
+    keys = backend._get_layout_keys("layout")
+    assert await backend.redis.exists(keys["meta"])
+    assert await backend.redis.llen(keys["history"]) == 2
+    assert await backend.redis.hkeys(keys["payloads"]) == [b"field_summary"]
+    assert int(await backend.redis.get(keys["version"])) == session._stored_version
+    assert not await backend.redis.exists(keys["blob"])
+    for part in ("meta", "history", "payloads", "version"):
+        assert 0 < await backend.redis.ttl(keys[part]) <= manager.ttl
+    assert await backend.redis.zscore(backend._get_index_key(), "layout") is not None
+
+
+@pytest.mark.asyncio
+async def test_save_appends_new_messages_only(workers, request_values):
+    manager, _ = workers
+    session = await manager.create_session(request_values, "appended")
+    session.conversation_history.append(_message("Clear skies"))
+    await manager.save_session(session)
+    keys = manager.backend._get_layout_keys("appended")
+    # Appending must not rewrite what is already stored
+    await manager.backend.redis.lset(keys["history"], 0, b"kept")
+
+    session.conversation_history.append(_message("Light winds"))
+    version = session._stored_version
+    await manager.save_session(session)
+
+    assert await manager.backend.redis.lrange(keys["history"], 0, -1) == [
+        b"kept", manager.serializer.dumps(session.conversation_history[1])
+    ]
+    assert session._stored_version == version + 1
+
+
+@pytest.mark.asyncio
+async def test_save_over_a_newer_version_is_rejected(workers, request_values):
+    first, second = workers
+    await first.create_session(request_values, "contended")
+    mine = await first.get_session("contended")
+    theirs = await second.get_session("contended")
+
+    theirs.conversation_history.append(_message("From the other worker"))
+    await second.save_session(theirs)
+    mine.conversation_history.append(_message("From this worker"))
+
+    with pytest.raises(SessionConflictError) as excinfo:
+        await first.save_session(mine, conflict_policy="reject")
+    assert excinfo.value.stored_version == theirs._stored_version
+
+    assert await first.save_session(mine, conflict_policy="merge")
+    stored = await second.get_session("contended")
+    assert [m.content for m in stored.conversation_history] == ["From the other worker", "From this worker"]
+
+
+@pytest.mark.asyncio
+async def test_recreated_session_does_not_match_a_stale_cached_copy(workers, request_values):
+    first, second = workers
+    cached = await first.create_session(request_values, "recreated")
+    first.check_in(cached)
+
+    # Another worker deletes the session and starts a new one under the same ID
+    await second.delete_session("recreated")
+    replacement = second.new_session(request_values, "recreated")
+    replacement.conversation_history.append(_message("New report"))
+    await second.save_session(replacement)
+
+    session = await first.get_session("recreated")
+
+    assert session is not cached
+    assert [m.content for m in session.conversation_history] == ["New report"]
+
+
+@pytest.mark.asyncio
+async def test_reading_a_session_renews_every_part(workers, request_values):
+    writer, reader = workers
+    await writer.create_session(request_values, "sliding")
+    backend = writer.backend
+    keys = backend._get_layout_keys("sliding")
+    for part in ("meta", "history", "payloads", "version"):
+        await backend.redis.expire(keys[part], 30)
+
+    _, ttl = await reader.get_session_with_ttl("sliding")
+
+    assert ttl > 30
+    for part in ("meta", "version"):
+        assert await backend.redis.ttl(keys[part]) > 30
+
+
+@pytest.mark.asyncio
+async def test_listing_sessions_does_not_renew_them(workers, request_values):
+    writer, reader = workers
+    await writer.create_session(request_values, "listed")
+    keys = writer.backend._get_layout_keys("listed")
+    await writer.backend.redis.expire(keys["meta"], 30)
+
+    sessions = await reader.get_sessions(["listed", "missing"])
+
+    assert sessions["missing"] is None
+    assert sessions["listed"].session_id == "listed"
+    assert await writer.backend.redis.ttl(keys["meta"]) <= 30
+
+
+@pytest.mark.asyncio
+async def test_legacy_blob_is_read_in_one_round_trip_and_migrated(workers, request_values, monkeypatch):
+    manager, _ = workers
+    legacy = manager.new_session(request_values, "legacy")
+    legacy.conversation_history.append(_message("Stored before the layout"))
+    keys = manager.backend._get_layout_keys("legacy")
+    await manager.backend.redis.set(keys["blob"], manager.serializer.dumps(legacy), ex=manager.ttl)
+
+    pipelines = []
+    pipeline = manager.backend.redis.pipeline
+    monkeypatch.setattr(
+        manager.backend.redis, "pipeline", lambda *args, **kwargs: pipelines.append(1) or pipeline(*args, **kwargs)
+    )
+    session = await manager.get_session("legacy")
+
+    assert len(pipelines) == 1
+    assert [m.content for m in session.conversation_history] == ["Stored before the layout"]
+
+    await manager.save_session(session)
+
+    assert not await manager.backend.redis.exists(keys["blob"])
+    assert await manager.backend.redis.llen(keys["history"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_index_lists_sessions_newest_first_by_facet(workers, request_values):
+    manager, _ = workers
+    for number, zone in enumerate(["North", "South", "North"]):
+        session = manager.new_session(request_values.model_copy(update={"zone_name": zone}), f"indexed-{number}")
+        session.last_updated = session.last_updated.replace(year=2020, minute=number)
+        await manager.save_session(session)
+
+    backend = manager.backend
+    page, total = await backend.index_page(0, 10, zone="North")
+    assert [session_id for session_id, _ in page] == ["indexed-2", "indexed-0"]
+    assert total == 2 == await backend.index_count(zone="North")
+
+    _, cutoff = (await backend.index_page(1, 1))[0][0]
+    assert await backend.index_before(cutoff) == ["indexed-0", "indexed-1"]
+    assert await backend.index_before(cutoff, after=page[1][1]) == ["indexed-1"]
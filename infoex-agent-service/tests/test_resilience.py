@@ -0,0 +1,122 @@
+"""Circuit breaker states and the InfoEx retry policy"""
+
+import httpx
+import pytest
+
+from app.services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+def _failing(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_breaker_opens_at_the_failure_threshold():
+    breaker = CircuitBreaker("/observation/avalanche", failure_threshold=3, reset_timeout=60)
+
+    _failing(breaker, 2)
+    assert breaker.state == "closed"
+    _failing(breaker, 1)
+    assert breaker.state == "open"
+    assert breaker.times_opened == 1
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.endpoint == "/observation/avalanche"
+    assert 0 < excinfo.value.retry_after <= 60
+    assert breaker.rejected == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("/observation/avalanche", failure_threshold=2, reset_timeout=60)
+
+    _failing(breaker, 1)
+    breaker.before_call()
+    breaker.record_success()
+    _failing(breaker, 1)
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_admits_a_single_trial():
+    breaker = CircuitBreaker("/observation/avalanche", failure_threshold=1, reset_timeout=0)
+    _failing(breaker, 1)
+    assert breaker.state == "half_open"
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_trial_closes_the_breaker():
+    breaker = CircuitBreaker("/observation/avalanche", failure_threshold=1, reset_timeout=0)
+    _failing(breaker, 1)
+
+    breaker.before_call()
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_failed_trial_opens_the_breaker_again():
+    breaker = CircuitBreaker("/observation/avalanche", failure_threshold=5, reset_timeout=60)
+    _failing(breaker, 5)
+    # Skip the cool-down
+    breaker._opened_at -= 60
+    assert breaker.state == "half_open"
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert breaker.times_opened == 1
+
+
+def test_released_trial_lets_another_through():
+    breaker = CircuitBreaker("/observation/avalanche", failure_threshold=1, reset_timeout=0)
+    _failing(breaker, 1)
+
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+
+
+def test_zero_threshold_disables_the_breaker():
+    breaker = CircuitBreaker("/observation/avalanche", failure_threshold=0, reset_timeout=60)
+    _failing(breaker, 20)
+    assert breaker.state == "closed"
+
+
+def test_submissions_retry_only_unsent_or_declined_requests():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=1.0)
+
+    assert policy.should_retry_error(httpx.ConnectError("refused"), idempotent=False)
+    assert policy.should_retry_error(httpx.PoolTimeout("busy"), idempotent=False)
+    assert not policy.should_retry_error(httpx.ReadTimeout("slow"), idempotent=False)
+    assert policy.should_retry_error(httpx.ReadTimeout("slow"), idempotent=True)
+
+    assert policy.should_retry_status(429, idempotent=False)
+    assert policy.should_retry_status(503, idempotent=False)
+    assert not policy.should_retry_status(500, idempotent=False)
+    assert policy.should_retry_status(500, idempotent=True)
+    assert not policy.should_retry_status(400, idempotent=True)
+
+
+def test_delay_backs_off_and_honours_retry_after():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=1.0)
+
+    assert 0 <= policy.delay(1) <= 0.1
+    assert 0 <= policy.delay(2) <= 0.2
+    assert policy.delay(3) is None
+    assert policy.delay(1, retry_after=0.5) >= 0.5
+    # Longer than max_delay is not worth waiting for
+    assert policy.delay(1, retry_after=5.0) is None
+
+
+def test_retry_after_header():
+    response = httpx.Response(429, headers={"Retry-After": "2"})
+    assert RetryPolicy.retry_after(response) == 2.0
+    assert RetryPolicy.retry_after(httpx.Response(429)) is None
+    assert RetryPolicy.retry_after(httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
@@ -0,0 +1,118 @@
+"""Claude call admission: concurrency cap, fair queuing, timeouts and rate budgets"""
+
+import asyncio
+
+import pytest
+
+from app.agent.scheduler import ClaudeCapacityError, ClaudeScheduler
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_the_concurrency_cap():
+    scheduler = ClaudeScheduler(max_concurrency=2, queue_timeout=1.0)
+
+    async with scheduler.slot("a", 100) as first, scheduler.slot("b", 100) as second:
+        assert first.waited == 0.0 and second.waited == 0.0
+        assert scheduler._active == 2
+
+    assert scheduler._active == 0
+    assert scheduler.admitted == 2
+
+
+@pytest.mark.asyncio
+async def test_queued_call_starts_when_a_slot_frees():
+    scheduler = ClaudeScheduler(max_concurrency=1, queue_timeout=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot("a", 100):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(scheduler._acquire("b", 100))
+    await asyncio.sleep(0)
+    assert scheduler._queued == 1 and not waiter.done()
+
+    release.set()
+    await holder
+    ticket = await waiter
+    assert ticket.session_id == "b"
+    assert scheduler._active == 1
+
+
+@pytest.mark.asyncio
+async def test_waiting_sessions_are_served_round_robin():
+    scheduler = ClaudeScheduler(max_concurrency=1, queue_timeout=1.0)
+    order = []
+
+    async def call(session_id):
+        async with scheduler.slot(session_id, 100):
+            order.append(session_id)
+            await asyncio.sleep(0)
+
+    blocker = await scheduler._acquire("blocker", 100)
+    # One session queues three calls before another session queues one
+    tasks = [asyncio.create_task(call(session_id)) for session_id in ("a", "a", "a", "b")]
+    await asyncio.sleep(0)
+    scheduler._release(blocker, 0.0)
+    await asyncio.gather(*tasks)
+
+    assert order == ["a", "b", "a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_times_out_with_retry_after():
+    scheduler = ClaudeScheduler(max_concurrency=1, queue_timeout=0.05)
+
+    async with scheduler.slot("a", 100):
+        with pytest.raises(ClaudeCapacityError) as excinfo:
+            async with scheduler.slot("b", 100):
+                pass
+
+    assert excinfo.value.retry_after >= 1.0
+    assert scheduler.timed_out == 1
+    # The abandoned waiter no longer holds a place in the queue
+    assert scheduler._queued == 0 and not scheduler._queues
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_the_queue_is_full():
+    scheduler = ClaudeScheduler(max_concurrency=1, queue_timeout=1.0, max_queue_depth=1)
+
+    async with scheduler.slot("a", 100):
+        queued = asyncio.create_task(scheduler._acquire("b", 100))
+        await asyncio.sleep(0)
+        with pytest.raises(ClaudeCapacityError):
+            await scheduler._acquire("c", 100)
+        assert scheduler.rejected == 1
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+
+    assert scheduler._queued == 0
+
+
+@pytest.mark.asyncio
+async def test_request_budget_delays_admission():
+    scheduler = ClaudeScheduler(max_concurrency=5, requests_per_period=1, period=0.1, queue_timeout=1.0)
+
+    async with scheduler.slot("a", 100):
+        pass
+    async with scheduler.slot("b", 100) as ticket:
+        assert ticket.waited > 0.05
+
+
+@pytest.mark.asyncio
+async def test_token_budget_uses_recorded_usage():
+    scheduler = ClaudeScheduler(max_concurrency=5, tokens_per_minute=1000, queue_timeout=0.05)
+
+    async with scheduler.slot("a", 900) as ticket:
+        # The call turned out much smaller than estimated
+        ticket.record_usage(100)
+    async with scheduler.slot("b", 800) as ticket:
+        assert ticket.waited == 0.0
+
+    # The budget is now spent for the rest of the window
+    with pytest.raises(ClaudeCapacityError):
+        async with scheduler.slot("c", 500):
+            pass
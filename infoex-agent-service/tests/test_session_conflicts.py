@@ -0,0 +1,116 @@
+"""Concurrent session saves under the merge, retry and reject policies"""
+
+from datetime import datetime
+
+import pytest
+
+from app.models import ConversationMessage, PayloadStatus
+from app.services.session import SessionConflictError
+
+
+def _message(content: str) -> ConversationMessage:
+    return ConversationMessage(role="user", content=content, timestamp=datetime.utcnow())
+
+
+def _payload(status: str = "incomplete", **data) -> PayloadStatus:
+    return PayloadStatus(observation_type="field_summary", status=status, data=data)
+
+
+async def _two_copies(manager, request_values):
+    """Create a session and load it twice, as two concurrent requests would"""
+    session = await manager.create_session(request_values, "conflict")
+    return await manager.get_session(session.session_id), await manager.get_session(session.session_id)
+
+
+@pytest.mark.asyncio
+async def test_save_without_conflict_bumps_version(manager, request_values):
+    session = await manager.create_session(request_values, "plain")
+    version = session._stored_version
+    session.conversation_history.append(_message("hello"))
+
+    assert await manager.save_session(session, conflict_policy="reject")
+    assert session._stored_version == version + 1
+
+    stored = await manager.get_session("plain")
+    assert [m.content for m in stored.conversation_history] == ["hello"]
+
+
+@pytest.mark.asyncio
+async def test_merge_keeps_both_writers_changes(manager, request_values):
+    first, second = await _two_copies(manager, request_values)
+
+    first.conversation_history.append(_message("from first"))
+    first.payloads["field_summary"] = _payload(tempHigh=3)
+    first.metadata["first"] = True
+    await manager.save_session(first, conflict_policy="merge")
+
+    second.conversation_history.append(_message("from second"))
+    second.payloads["avalanche_summary"] = PayloadStatus(observation_type="avalanche_summary", status="incomplete")
+    second.metadata["second"] = True
+    assert await manager.save_session(second, conflict_policy="merge")
+
+    stored = await manager.get_session("conflict")
+    assert [m.content for m in stored.conversation_history] == ["from first", "from second"]
+    assert set(stored.payloads) == {"field_summary", "avalanche_summary"}
+    assert stored.metadata["first"] and stored.metadata["second"]
+    # The merged state is adopted by the caller's session object
+    assert second._stored_version == stored._stored_version
+    assert [m.content for m in second.conversation_history] == ["from first", "from second"]
+
+
+@pytest.mark.asyncio
+async def test_merge_overrides_only_changed_payloads(manager, request_values):
+    session = await manager.create_session(request_values, "conflict")
+    session.payloads["field_summary"] = _payload(tempHigh=1)
+    session.payloads["avalanche_summary"] = PayloadStatus(observation_type="avalanche_summary", status="incomplete")
+    await manager.save_session(session)
+
+    first = await manager.get_session("conflict")
+    second = await manager.get_session("conflict")
+    first.payloads["field_summary"] = _payload(status="submitted", tempHigh=1)
+    await manager.save_session(first, conflict_policy="merge")
+
+    second.payloads["avalanche_summary"].status = "ready"
+    await manager.save_session(second, conflict_policy="merge")
+
+    stored = await manager.get_session("conflict")
+    assert stored.payloads["field_summary"].status == "submitted"
+    assert stored.payloads["avalanche_summary"].status == "ready"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["retry", "reject"])
+async def test_retry_and_reject_raise_on_conflict(manager, request_values, policy):
+    first, second = await _two_copies(manager, request_values)
+    first.conversation_history.append(_message("from first"))
+    await manager.save_session(first, conflict_policy=policy)
+
+    second.conversation_history.append(_message("from second"))
+    with pytest.raises(SessionConflictError) as excinfo:
+        await manager.save_session(second, conflict_policy=policy)
+    assert excinfo.value.stored_version == first._stored_version
+
+    # The first writer's state is left as it was
+    stored = await manager.get_session("conflict")
+    assert [m.content for m in stored.conversation_history] == ["from first"]
+
+
+def test_unit_of_work_only_retries_when_retryable(manager, monkeypatch):
+    monkeypatch.setattr("app.services.session.settings.session_conflict_policy", "retry")
+
+    assert manager.unit_of_work("conflict").conflict_policy == "merge"
+    assert manager.unit_of_work("conflict", retryable=True).conflict_policy == "retry"
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_commits_changes(manager, request_values):
+    await manager.create_session(request_values, "uow")
+
+    async with manager.unit_of_work("uow") as uow:
+        session = await uow.load()
+        session.conversation_history.append(_message("hello"))
+        assert uow.dirty
+        assert await uow.commit()
+
+    stored = await manager.get_session("uow")
+    assert len(stored.conversation_history) == 1
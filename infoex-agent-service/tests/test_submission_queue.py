@@ -0,0 +1,125 @@
+"""Queued InfoEx submissions: delivery, takeover of stale jobs and redelivery limits"""
+
+import pytest
+
+from app.models import PayloadStatus
+from app.services import submission
+from app.services.submission import WORKER_GROUP, SubmissionQueue
+
+
+@pytest.fixture
+def queue(manager):
+    return SubmissionQueue(manager)
+
+
+async def _session_with_payload(manager, request_values):
+    session = await manager.create_session(request_values, "queued")
+    session.payloads["field_summary"] = PayloadStatus(observation_type="field_summary", status="ready")
+    await manager.save_session(session)
+    return session
+
+
+async def _pending(manager, queue) -> int:
+    """Jobs delivered to a worker but not yet acknowledged"""
+    _, pending = await manager.backend.stream_info(queue._get_stream_key(), WORKER_GROUP)
+    return pending
+
+
+def _fake_submit(outcomes):
+    """submit_payloads stand-in that raises or succeeds in turn"""
+    async def submit_payloads(session, payload_keys, submission_state=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        results = []
+        for key in payload_keys:
+            session.payloads[key].status = "submitted"
+            results.append({"observation_type": key, "success": True, "result": {"uuid": "infoex-1"}})
+        return results
+    return submit_payloads
+
+
+@pytest.mark.asyncio
+async def test_job_runs_and_is_acknowledged(manager, request_values, queue, monkeypatch):
+    await _session_with_payload(manager, request_values)
+    monkeypatch.setattr(submission, "submit_payloads", _fake_submit([None]))
+    stream_key = queue._get_stream_key()
+
+    job = await queue.enqueue("queued", ["field_summary"])
+    [(entry_id, fields)] = await manager.backend.stream_read(stream_key, WORKER_GROUP, "worker-a", 1, 0)
+    await queue.process(entry_id, fields)
+
+    stored = await queue.get_job(job.job_id)
+    assert stored.status == "completed" and stored.success
+    assert stored.attempts == 1
+    assert await _pending(manager, queue) == 0
+    assert (await manager.get_session("queued")).payloads["field_summary"].status == "submitted"
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_taken_over_by_another_worker(manager, request_values, queue, monkeypatch):
+    await _session_with_payload(manager, request_values)
+    monkeypatch.setattr(submission, "submit_payloads", _fake_submit([RuntimeError("worker crashed"), None]))
+    stream_key = queue._get_stream_key()
+
+    job = await queue.enqueue("queued", ["field_summary"])
+    [(entry_id, fields)] = await manager.backend.stream_read(stream_key, WORKER_GROUP, "worker-a", 1, 0)
+    await queue.process(entry_id, fields)
+
+    # Left pending for another worker
+    assert (await queue.get_job(job.job_id)).status == "queued"
+    assert await _pending(manager, queue) == 1
+
+    claimed = await manager.backend.stream_claim(stream_key, WORKER_GROUP, "worker-b", 0, 1)
+    assert [claimed_id for claimed_id, _ in claimed] == [entry_id]
+    await queue.process(*claimed[0])
+
+    stored = await queue.get_job(job.job_id)
+    assert stored.status == "completed" and stored.attempts == 2
+    assert queue.redelivered == 1
+    assert await _pending(manager, queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_finished_job_delivered_again_is_only_acknowledged(manager, request_values, queue, monkeypatch):
+    await _session_with_payload(manager, request_values)
+    monkeypatch.setattr(submission, "submit_payloads", _fake_submit([None]))
+    stream_key = queue._get_stream_key()
+
+    job = await queue.enqueue("queued", ["field_summary"])
+    [(entry_id, fields)] = await manager.backend.stream_read(stream_key, WORKER_GROUP, "worker-a", 1, 0)
+    await queue.process(entry_id, fields)
+    # A second delivery must not submit again (the fake has no outcome left)
+    await queue.process(entry_id, fields)
+
+    assert (await queue.get_job(job.job_id)).attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_job_is_abandoned_after_max_deliveries(manager, request_values, queue, monkeypatch):
+    await _session_with_payload(manager, request_values)
+    monkeypatch.setattr(submission.settings, "submission_max_deliveries", 2)
+    monkeypatch.setattr(submission, "submit_payloads", _fake_submit([RuntimeError("down"), RuntimeError("down")]))
+    stream_key = queue._get_stream_key()
+
+    job = await queue.enqueue("queued", ["field_summary"])
+    [(entry_id, fields)] = await manager.backend.stream_read(stream_key, WORKER_GROUP, "worker-a", 1, 0)
+    for _ in range(3):
+        await queue.process(entry_id, fields)
+
+    stored = await queue.get_job(job.job_id)
+    assert stored.status == "failed" and not stored.success
+    assert queue.failed == 1
+    assert await _pending(manager, queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_job_for_a_missing_session_fails(manager, queue):
+    stream_key = queue._get_stream_key()
+
+    job = await queue.enqueue("missing", ["field_summary"])
+    [(entry_id, fields)] = await manager.backend.stream_read(stream_key, WORKER_GROUP, "worker-a", 1, 0)
+    await queue.process(entry_id, fields)
+
+    stored = await queue.get_job(job.job_id)
+    assert stored.status == "failed" and stored.message == "Session not found"